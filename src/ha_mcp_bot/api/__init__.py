@@ -1,18 +1,26 @@
 from .retrieval import RetrievalService
 from .action import ActionService
+from .scheduler import CommandScheduler
 from .custom_api import HomeAssistantAPI, get_default_api
 from .client import HAClient
+from .executor import AnalyticsExecutor, get_default_executor
+from .websocket import HAWebSocketClient, HAWebSocketError, get_default_ws
 from .templates import HomeAssistantTemplates, build_payload
 
 
 __all__ = [
     "RetrievalService",
     "ActionService",
+    "CommandScheduler",
     "HomeAssistantAPI",
     "get_default_api",
     "HAClient",
+    "AnalyticsExecutor",
+    "get_default_executor",
+    "HAWebSocketClient",
+    "HAWebSocketError",
+    "get_default_ws",
     "HomeAssistantTemplates",
     "build_payload",
 ]
 
-
@@ -1,40 +1,167 @@
-import asyncio 
+import asyncio
+import httpx
 import ha_mcp_bot.schemas as schemas
 import logging
-from typing import Optional
+from collections import defaultdict
+from typing import Dict, List, Optional
+from ha_mcp_bot.config import config
+from ha_mcp_bot.live.hub import LiveHub, get_default_hub
 from .custom_api import HomeAssistantAPI, get_default_api
 
 logger = logging.getLogger(__name__)
 
+# Domains where 'on' shows as one of several states (an HVAC mode, 'playing', ...):
+# any state outside these counts as on.
+_INACTIVE_STATES = {
+    "climate": frozenset({"off", "unavailable", "unknown"}),
+    "media_player": frozenset({"off", "standby", "unavailable", "unknown"}),
+}
+
 
 class ActionService:
     """Domain-level action methods that use a HomeAssistantAPI instance."""
 
-    def __init__(self, api: Optional[HomeAssistantAPI] = None):
+    def __init__(
+        self,
+        api: Optional[HomeAssistantAPI] = None,
+        hub: Optional[LiveHub] = None,
+        confirm_timeout: float = config.ACTION_CONFIRM_TIMEOUT,
+    ):
         self.api = api or get_default_api()
+        self.hub = hub or (get_default_hub() if config.LIVE_EVENTS else None)
+        self.confirm_timeout = confirm_timeout
+
+    @staticmethod
+    def _to_state(data: dict) -> schemas.State:
+        # Older HA versions omit last_reported from event payloads.
+        if data.get('last_reported') is None:
+            data = {**data, 'last_reported': data.get('last_updated')}
+        return schemas.State(**data)
+
+    @staticmethod
+    def _changed_states(response: httpx.Response) -> Dict[str, dict]:
+        """Indexes the states HA reports as changed by the service call."""
+        try:
+            changed = response.json()
+        except ValueError:
+            return {}
+        if not isinstance(changed, list):
+            return {}
+        return {s['entity_id']: s for s in changed if isinstance(s, dict) and s.get('entity_id')}
+
+    def _settled_state(self, entity_id: str, command: schemas.SwitchCommand) -> Optional[dict]:
+        """Mirrored state when the entity was already in the requested state (no event will follow)."""
+        if command == schemas.SwitchCommand.TOGGLE or not self.hub.mirror.loaded:
+            return None
+        current = self.hub.mirror.get(entity_id)
+        if current is None:
+            return None
+        inactive = _INACTIVE_STATES.get(entity_id.split('.')[0])
+        if inactive is None or command == schemas.SwitchCommand.OFF:
+            settled = current.state == command.value
+        else:
+            settled = current.state not in inactive
+        return current.to_dict() if settled else None
 
     async def trigger_service(self, entity_id: str, command: schemas.SwitchCommand) -> Optional[schemas.State]:
+        """
+        Calls the on/off/toggle service for an entity and returns its confirmed state.
+
+        Confirmation comes from the states HA returns for the service call, or else
+        from the entity's next 'state_changed' event (up to 'confirm_timeout' seconds).
+        Without the live event stream, or when no change is observed in time, the
+        state is read back from the REST API.
+        """
+        states = await self.trigger_bulk([entity_id], command)
+        return states.get(entity_id)
+
+    async def trigger_bulk(self, entity_ids: List[str], command: schemas.SwitchCommand) -> Dict[str, schemas.State]:
+        """
+        Applies one command to many entities with a single service call per domain.
+
+        Targets are grouped by domain and each group is sent as one
+        'services/<domain>/<action>' POST with an entity_id list; the groups run
+        concurrently and all resulting states are confirmed concurrently, the same
+        way trigger_service() confirms a single entity.
+
+        Returns:
+            Dict[str, schemas.State]: Confirmed states by entity ID. Entities whose
+            call failed or whose state could not be read are missing.
+        """
         if not isinstance(command, schemas.SwitchCommand):
             logger.error(f"Invalid command type: {type(command)}")
-            return None
+            return {}
 
-        try:
-            domain = entity_id.split('.')[0]
-        except (ValueError, AttributeError, IndexError):
-            logger.error(f"Invalid entity_id format: {entity_id}")
-            return None
+        by_domain: Dict[str, List[str]] = defaultdict(list)
+        for entity_id in dict.fromkeys(entity_ids):
+            if not isinstance(entity_id, str) or '.' not in entity_id:
+                logger.error(f"Invalid entity_id format: {entity_id}")
+                continue
+            by_domain[entity_id.split('.')[0]].append(entity_id)
+        if not by_domain:
+            return {}
 
         service_action = "toggle" if command == schemas.SwitchCommand.TOGGLE else f"turn_{command.value}"
-        service_endpoint = f"services/{domain}/{service_action}"
+        live = self.hub is not None and self.hub.ready
+        waiters = {
+            entity_id: self.hub.wait_for_change(entity_id)
+            for targets in by_domain.values() for entity_id in targets
+        } if live else {}
 
         try:
-            await self.api.post(service_endpoint, json_data={"entity_id": entity_id})
-            await asyncio.sleep(1) 
-            response = await self.api.get(f"states/{entity_id}")
-            data = response.json()
-            logger.info(f"Successfully executed {service_action} on {entity_id}")
-            return schemas.State(**data)
+            results = await asyncio.gather(*(
+                self._call_service(domain, service_action, targets) for domain, targets in by_domain.items()
+            ))
+            changed: Dict[str, dict] = {}
+            targets: List[str] = []
+            for domain_targets, domain_changed in zip(by_domain.values(), results):
+                if domain_changed is not None:
+                    targets += domain_targets
+                    changed.update(domain_changed)
+
+            confirmed = await asyncio.gather(*(
+                self._confirm(entity_id, command, changed.get(entity_id), waiters.get(entity_id))
+                for entity_id in targets
+            ))
+            return {entity_id: state for entity_id, state in zip(targets, confirmed) if state is not None}
+        finally:
+            for entity_id, waiter in waiters.items():
+                self.hub.discard_waiter(entity_id, waiter)
 
+    async def _call_service(self, domain: str, service_action: str, entity_ids: List[str]) -> Optional[Dict[str, dict]]:
+        """Sends one service call; returns the changed states, or None if the call failed."""
+        target = entity_ids[0] if len(entity_ids) == 1 else entity_ids
+        try:
+            response = await self.api.post(f"services/{domain}/{service_action}", json_data={"entity_id": target})
+            logger.info(f"Successfully executed {service_action} on {', '.join(entity_ids)}")
+            return self._changed_states(response)
         except Exception as e:
-            logger.exception(f"Unexpected error in trigger_service: {e}")
-            return None
\ No newline at end of file
+            logger.exception(f"Unexpected error calling {domain}.{service_action}: {e}")
+            return None
+
+    async def _confirm(
+        self,
+        entity_id: str,
+        command: schemas.SwitchCommand,
+        data: Optional[dict],
+        waiter: Optional[asyncio.Future],
+    ) -> Optional[schemas.State]:
+        try:
+            if data is None and waiter is not None:
+                data = self._settled_state(entity_id, command)
+                if data is None:
+                    try:
+                        data = await asyncio.wait_for(waiter, self.confirm_timeout)
+                    except asyncio.TimeoutError:
+                        logger.warning(f"No state change for {entity_id} within {self.confirm_timeout}s")
+
+            if data is None:
+                return await self.read_state(entity_id)
+            return self._to_state(data)
+        except Exception as e:
+            logger.exception(f"Unexpected error confirming {entity_id}: {e}")
+            return None
+
+    async def read_state(self, entity_id: str) -> schemas.State:
+        response = await self.api.get(f"states/{entity_id}")
+        return self._to_state(response.json())
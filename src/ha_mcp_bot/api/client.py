@@ -1,5 +1,8 @@
 import httpx
 import logging
+import time
+from ha_mcp_bot.metrics import endpoint_label, get_default_metrics
+from ha_mcp_bot.tracing import span
 from .base import BaseClient
 from typing import Optional
 
@@ -29,13 +32,27 @@ class HAClient(BaseClient):
         return self._client
 
     async def get(self, endpoint: str, params=None):
-        response = await self.client.get(endpoint.lstrip('/'), params=params)
-        response.raise_for_status()
-        return response
+        return await self._request("GET", endpoint, params=params)
 
     async def post(self, endpoint: str, json_data=None):
-        response = await self.client.post(endpoint.lstrip('/'), json=json_data)
-        response.raise_for_status()
+        return await self._request("POST", endpoint, json=json_data)
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Sends a request, recording its latency, failures and response size by route."""
+        metrics = get_default_metrics()
+        labels = {"method": method, "endpoint": endpoint_label(endpoint)}
+        started = time.perf_counter()
+        with span(f"http {method}", **labels) as current:
+            try:
+                response = await self.client.request(method, endpoint.lstrip('/'), **kwargs)
+                current.set(status_code=response.status_code, bytes=len(response.content))
+                response.raise_for_status()
+            except Exception:
+                metrics.upstream_errors.inc(**labels)
+                raise
+            finally:
+                metrics.upstream_duration.observe(time.perf_counter() - started, **labels)
+        metrics.upstream_response_bytes.inc(len(response.content), **labels)
         return response
     
     async def close(self):
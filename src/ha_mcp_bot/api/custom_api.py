@@ -1,19 +1,60 @@
+import asyncio
 import json
 import logging
+import time
 import httpx
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
 from ha_mcp_bot.config import config
+from ha_mcp_bot.metrics import get_default_metrics
+from ha_mcp_bot.tracing import span
 from .base import BaseClient
 from .client import HAClient
+from .templates import template_name
+from .websocket import HAWebSocketClient, HAWebSocketError, get_default_ws
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_template_result(result_data: Any) -> Any:
+    if isinstance(result_data, str):
+        try:
+            return json.loads(result_data)
+        except json.JSONDecodeError:
+            return result_data
+    return result_data
+
+
+class _LiveTemplate:
+    """Latest result of a 'render_template' subscription."""
+
+    __slots__ = ("handle", "result", "failed", "rendered", "last_used")
+
+    def __init__(self):
+        self.handle: Optional[int] = None
+        self.result: Any = None
+        self.failed = False
+        self.rendered = asyncio.Event()
+        self.last_used = time.monotonic()
+
+    def on_event(self, event: dict) -> None:
+        if "result" in event:
+            self.result = _parse_template_result(event["result"])
+            self.rendered.set()
+        elif "error" in event:
+            logger.warning(f"Live template error: {event.get('error')}")
+            if not self.rendered.is_set():
+                self.failed = True
+                self.rendered.set()
+
 
 class HomeAssistantAPI:
 
-    def __init__(self, client: Optional[BaseClient] = None):
+    def __init__(self, client: Optional[BaseClient] = None, ws: Optional[HAWebSocketClient] = None):
         self._client = client or HAClient(config.HA_URL, config.HA_TOKEN)
+        self._ws = ws or (get_default_ws() if config.LIVE_EVENTS else None)
+        self._live_templates: "OrderedDict[str, _LiveTemplate]" = OrderedDict()
+        self._unsubscribing: Set[asyncio.Task] = set()
 
     async def post(self, endpoint: str, json_data: Optional[dict] = None) -> httpx.Response:
         return await self._client.post(endpoint, json_data)
@@ -21,24 +62,121 @@ class HomeAssistantAPI:
     async def get(self, endpoint: str, params: Optional[dict] = None) -> httpx.Response:
         return await self._client.get(endpoint, params=params)
 
-    async def get_HA_template_data(self, payload: Dict[str, Any]) -> Any:
+    async def get_HA_template_data(self, payload: Dict[str, Any], live: bool = False) -> Any:
+        """
+        Renders a template and returns its parsed JSON result.
+
+        With live=True the template is kept as a 'render_template' WebSocket
+        subscription: HA re-renders it only when something it depends on changes,
+        and repeat calls return the latest pushed result without a round trip.
+        Falls back to the REST endpoint when the WebSocket is not connected.
+        """
+        name = template_name(payload.get("template", ""))
+        with span("ha.template", template=name) as current:
+            return await self._render_template(payload, live, name, current)
+
+    async def _render_template(self, payload: Dict[str, Any], live: bool, name: str, current: Any) -> Any:
+        metrics = get_default_metrics()
+        started = time.perf_counter()
+        if live and self._ws is not None and self._ws.connected:
+            result = await self._get_live_template_data(payload["template"])
+            if result is not None:
+                metrics.template_duration.observe(time.perf_counter() - started, template=name, source="live")
+                current.set(source="live")
+                return self._count_records(result, current)
+
         try:
             response = await self._client.post("template", payload)
-            result_data = response.json()
-            
-            if isinstance(result_data, str):
-                try:
-                    return json.loads(result_data)
-                except json.JSONDecodeError:
-                    return result_data
-            return result_data
+            result = _parse_template_result(response.json())
+            metrics.template_duration.observe(time.perf_counter() - started, template=name, source="rest")
+            current.set(source="rest")
+            return self._count_records(result, current)
 
         except httpx.RequestError as e: # Updated exception type
             logger.exception(f"Connection Error: {e}")
-            return None
         except Exception as e:
             logger.exception(f"An unexpected error occurred: {e}")
+        metrics.template_errors.inc(template=name)
+        current.set(failed=True)
+        return None
+
+    @staticmethod
+    def _count_records(result: Any, current: Any) -> Any:
+        if isinstance(result, list):
+            get_default_metrics().records_parsed.inc(len(result), kind="template")
+            current.set(records=len(result))
+        return result
+
+    async def _get_live_template_data(self, template: str) -> Any:
+        self._evict_idle_templates()
+        live = self._live_templates.get(template)
+        if live is None:
+            live = _LiveTemplate()
+            self._live_templates[template] = live
+            try:
+                live.handle = await self._ws.subscribe(
+                    {"type": "render_template", "template": template, "report_errors": True}, live.on_event
+                )
+            except HAWebSocketError as e:
+                logger.warning(f"Live template subscription rejected, rendering over REST: {e}")
+                # Readers that found the entry meanwhile stop waiting too.
+                live.failed = True
+                live.rendered.set()
+                if self._live_templates.get(template) is live:
+                    del self._live_templates[template]
+                return None
+            while len(self._live_templates) > config.TEMPLATE_SUBSCRIPTIONS:
+                _, evicted = self._live_templates.popitem(last=False)
+                await self._ws.unsubscribe(evicted.handle)
+        else:
+            self._live_templates.move_to_end(template)
+        live.last_used = time.monotonic()
+
+        try:
+            await asyncio.wait_for(live.rendered.wait(), config.TEMPLATE_RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Live template did not render in time; dropping subscription")
+            live.failed = True
+
+        if live.failed:
+            if self._live_templates.get(template) is live:
+                del self._live_templates[template]
+                await self._ws.unsubscribe(live.handle)
             return None
+        return live.result
+
+    def invalidate_live_templates(self) -> None:
+        """
+        Drops every live template subscription, so the next read renders afresh.
+
+        HA only re-renders a template when an entity state it reads changes; area,
+        label and device lookups read registries, so registry edits must be
+        followed by a call to this.
+        """
+        while self._live_templates:
+            _, live = self._live_templates.popitem(last=False)
+            self._unsubscribe_later(live.handle)
+
+    def _evict_idle_templates(self) -> None:
+        """Drops subscriptions that have not been read for TEMPLATE_SUBSCRIPTION_IDLE seconds."""
+        cutoff = time.monotonic() - config.TEMPLATE_SUBSCRIPTION_IDLE
+        while self._live_templates:
+            template, oldest = next(iter(self._live_templates.items()))
+            if oldest.last_used >= cutoff:
+                break
+            del self._live_templates[template]
+            self._unsubscribe_later(oldest.handle)
+
+    def _unsubscribe_later(self, handle: Optional[int]) -> None:
+        # Referenced until done, so the task is not garbage-collected mid-flight.
+        task = asyncio.create_task(self._ws.unsubscribe(handle))
+        self._unsubscribing.add(task)
+        task.add_done_callback(self._on_unsubscribed)
+
+    def _on_unsubscribed(self, task: asyncio.Task) -> None:
+        self._unsubscribing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Error dropping live template subscription: {task.exception()}")
 
     async def close(self) -> None:
         try:
@@ -0,0 +1,93 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from ha_mcp_bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsExecutor:
+    """
+    Runs CPU-heavy analytics off the event loop, choosing where by payload size.
+
+    Jobs under 'thread_above' points run inline (handing them to a pool costs more
+    than the work). Up to 'process_above' they go to a thread pool: the analytics
+    are NumPy kernels that release the GIL, and arguments are shared, not copied.
+    Larger jobs go to a process pool so a long analysis cannot stall other sessions.
+    Jobs sent to processes must be module-level functions over compact inputs
+    (series with NumPy arrays) that return arrays or plain values; pydantic models
+    are built back on the event loop.
+    """
+
+    def __init__(
+        self,
+        thread_above: int = config.ANALYTICS_THREAD_POINTS,
+        process_above: int = config.ANALYTICS_PROCESS_POINTS,
+        max_workers: int = config.ANALYTICS_WORKERS,
+    ):
+        self.thread_above = thread_above
+        self.process_above = process_above
+        self.max_workers = max(max_workers, 1)
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.max_workers, thread_name_prefix="analytics")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # 'spawn' avoids forking a process that holds sockets and event loop threads.
+            self._processes = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+    def pool_for(self, size: int) -> Optional[Executor]:
+        """The executor for a job over 'size' points; None means run inline."""
+        if size < self.thread_above:
+            return None
+        if size >= self.process_above:
+            return self._process_pool()
+        return self._thread_pool()
+
+    async def run(self, size: int, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs func(*args, **kwargs) where its payload size calls for.
+
+        Args:
+            size: Number of points the job processes (e.g., total series length).
+            func: The job; must be picklable (module-level) for process offload.
+        """
+        pool = self.pool_for(size)
+        if pool is None:
+            return func(*args, **kwargs)
+
+        job = functools.partial(func, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, job)
+        except BrokenProcessPool:
+            # A crashed worker takes the pool down; run this job on a thread and rebuild later.
+            logger.exception(f"Analytics process pool failed running {getattr(func, '__name__', func)}")
+            self._processes = None
+            return await loop.run_in_executor(self._thread_pool(), job)
+
+    def shutdown(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+_DEFAULT_EXECUTOR_INSTANCE: Optional['AnalyticsExecutor'] = None
+
+def get_default_executor() -> AnalyticsExecutor:
+    """Global access to the analytics executor."""
+    global _DEFAULT_EXECUTOR_INSTANCE
+    if _DEFAULT_EXECUTOR_INSTANCE is None:
+        _DEFAULT_EXECUTOR_INSTANCE = AnalyticsExecutor()
+    return _DEFAULT_EXECUTOR_INSTANCE
@@ -1,9 +1,19 @@
+import asyncio
 import logging
+import ha_mcp_bot.helpers as helpers
 import ha_mcp_bot.schemas as schemas
-from typing import List, Optional, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from .templates import HomeAssistantTemplates, build_payload
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from .custom_api import HomeAssistantAPI, get_default_api
+from .executor import AnalyticsExecutor, get_default_executor
+from ha_mcp_bot.config import config
+from ha_mcp_bot.helpers.series import EPOCH, to_micros_delta
+from ha_mcp_bot.live.hub import LiveHub, get_default_hub
+from ha_mcp_bot.live.query import StateQuery
+from ha_mcp_bot.live.records import StateRecord
+from ha_mcp_bot.metrics import get_default_metrics
+from ha_mcp_bot.tracing import span, traced
 
 
 logger = logging.getLogger(__name__)
@@ -12,8 +22,32 @@ logger = logging.getLogger(__name__)
 class RetrievalService:
     """Domain-level retrieval methods that use a HomeAssistantAPI instance."""
 
-    def __init__(self, api: Optional[HomeAssistantAPI] = None):
+    def __init__(
+        self,
+        api: Optional[HomeAssistantAPI] = None,
+        hub: Optional[LiveHub] = None,
+        executor: Optional[AnalyticsExecutor] = None,
+    ):
         self.api = api or get_default_api()
+        self.hub = hub or (get_default_hub() if config.LIVE_EVENTS else None)
+        self.executor = executor or get_default_executor()
+
+    @property
+    def _mirror_ready(self) -> bool:
+        return self.hub is not None and self.hub.ready and self.hub.mirror.loaded
+
+    def _state_core(self, record: StateRecord) -> schemas.StateCore:
+        """Builds a StateCore from a state record, adding the area from the live directory."""
+        entity = self.hub.directory.get(record.entity_id) if self.hub is not None else None
+        return record.to_state_core(entity.area if entity else None)
+
+    @staticmethod
+    def _parse(schema, rows, key: str = "entity_id") -> list:
+        """schemas.parse_many() inside a tracing span."""
+        with span("parse", schema=schema.__name__) as current:
+            items = schemas.parse_many(schema, rows, key=key)
+            current.set(records=len(items))
+            return items
 
     @staticmethod
     def is_valid_datetime(date_string: str, format_string: str) -> bool:
@@ -33,6 +67,39 @@ class RetrievalService:
         except (ValueError, TypeError):
             return False
 
+    @staticmethod
+    def parse_window(
+        start_time: Optional[str],
+        end_time: Optional[str],
+        time_format: str = "%Y-%m-%dT%H:%M:%S%z",
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Parses a history window, defaulting to the last 24 hours. Bounds that do not
+        match 'time_format' are read as ISO 8601 (e.g., with fractional seconds), but
+        must carry a UTC offset.
+
+        Returns:
+            Optional[Tuple[datetime, datetime]]: (start, end), or None if a bound is not a valid timestamp.
+        """
+        def parse(value: str) -> Optional[datetime]:
+            try:
+                return datetime.strptime(value, time_format)
+            except (ValueError, TypeError):
+                pass
+            try:
+                parsed = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                return None
+            return parsed if parsed.tzinfo is not None else None
+
+        now = datetime.now(timezone.utc)
+        start = parse(start_time) if start_time else now - timedelta(days=1)
+        end = parse(end_time) if end_time else now
+        if start is None or end is None:
+            return None
+        return start, end
+
+    @traced()
     async def get_labels(self) -> List[schemas.Label]:
         """
         Retrieves all user-defined labels in Home Assistant. Labels are used to 
@@ -42,16 +109,11 @@ class RetrievalService:
         Returns:
             List[schemas.Label]: A list of label objects containing id, name and description of each.
         """
-        labels = []
         template_payload = build_payload(HomeAssistantTemplates.LIST_LABELS)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                labels.append(schemas.Label(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing label {data.get('label_id')}: {e}")
-        return labels
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Label, response, key='label_id')
 
+    @traced()
     async def get_areas(self) -> List[schemas.Area]:
         """
         Retrieves all defined area names (rooms or zones) in Home Assistant.
@@ -60,18 +122,13 @@ class RetrievalService:
         Returns:
             List[schemas.Area]: A list of area objects containing id and name.
         """
-        areas = []
         template_payload = build_payload(HomeAssistantTemplates.LIST_AREAS)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                areas.append(schemas.Area(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing area {data.get('area_id')}: {e}")
-        return areas
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Area, response, key='area_id')
 
     ### GET DEVICES per AREA or LABEL
 
+    @traced()
     async def get_area_devices(self, area_name: str) -> List[schemas.Device]:
         """
         Lists all hardware devices located within a specific area and includes their 
@@ -84,16 +141,11 @@ class RetrievalService:
             List[schemas.Device]: A list of Device objects, each containing its
             labels and entities with their current states.
         """
-        devices = []
         template_payload = build_payload(HomeAssistantTemplates.AREA_DEVICES, area_name)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                devices.append(schemas.Device(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing device {data.get('device_id')}: {e}")
-        return devices
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Device, response, key='device_id')
 
+    @traced()
     async def get_label_devices(self, label_name: str) -> List[schemas.Device]:
         """
         Retrieves all devices tagged with a specific label, regardless of which 
@@ -106,18 +158,13 @@ class RetrievalService:
             List[schemas.Device]: A list of Device objects associated with the label, 
             each containing its area and entities with their current states.
         """
-        devices = []
         template_payload = build_payload(HomeAssistantTemplates.LABEL_DEVICES, label_name)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                devices.append(schemas.Device(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing device {data.get('device_id')}: {e}")
-        return devices
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Device, response, key='device_id')
 
     # GET ENTITIES per AREA or LABEL
 
+    @traced()
     async def get_area_entities(self, area_name: str) -> List[schemas.Entity]:
         """
         Lists all entities belonging to a device located within a specific area 
@@ -129,16 +176,11 @@ class RetrievalService:
             List[schemas.Entity]: A list of Entity objects, each containing its
             labels.
         """
-        entities = []
         template_payload = build_payload(HomeAssistantTemplates.AREA_ENTITIES, area_name)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                entities.append(schemas.Entity(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing entity {data.get('entity_id')}: {e}")
-        return entities
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Entity, response)
 
+    @traced()
     async def get_label_entities(self, label_name: str) -> List[schemas.Entity]:
         """
         Retrieves all entities that belong to a device tagged with a specific label, 
@@ -150,18 +192,13 @@ class RetrievalService:
         Returns:
             List[schemas.Entity]: A list of Entity objects associated with the label
         """
-        entities = []
         template_payload = build_payload(HomeAssistantTemplates.LABEL_ENTITIES, label_name)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                entities.append(schemas.Entity(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing entity {data.get('entity_id')}: {e}")
-        return entities
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Entity, response)
 
     # GET ENTITY or ENTITIES
 
+    @traced()
     async def get_entity_info(self, entity_id: str) -> Optional[schemas.Entity]:
         """
         Retrieves comprehensive metadata for a specific entity, including its 
@@ -183,6 +220,7 @@ class RetrievalService:
             return None
 
 
+    @traced()
     async def get_device_entities(self, device_id: str) -> List[schemas.Entity]:
         """
         Retrieves all functional entities (sensors, switches, etc.) belonging to 
@@ -194,17 +232,12 @@ class RetrievalService:
         Returns:
             List[schemas.Entity]: A list of entities associated with the device.
         """
-        entities = []
         template_payload = build_payload(HomeAssistantTemplates.DEVICE_ENTITIES, device_id)
-        response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                entities.append(schemas.Entity(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing entity {data.get('entity_id')}: {e}")
-        return entities
+        response = await self.api.get_HA_template_data(template_payload, live=True) or []
+        return self._parse(schemas.Entity, response)
 
 
+    @traced()
     async def get_all_entities(self) -> List[schemas.Entity]:
         """
         Retrieves all entities.
@@ -215,18 +248,51 @@ class RetrievalService:
         Returns:
             List[schemas.Entity]: A list of entities associated with the device.
         """
-        entities = []
         template_payload = build_payload(HomeAssistantTemplates.ALL_ENTITITES)
         response = await self.api.get_HA_template_data(template_payload) or []
-        for data in response:
-            try:
-                entities.append(schemas.Entity(**data))
-            except Exception as e:
-                logger.exception(f"Error parsing entity {data.get('entity_id')}: {e}")
-        return entities
+        return self._parse(schemas.Entity, response)
+
+    @traced()
+    async def resolve_entity_ids(self, area: Optional[str] = None, label: Optional[str] = None) -> List[str]:
+        """
+        Resolves the entity IDs located in an area and/or tagged with a label.
+        Uses the live entity directory when available, otherwise the area and
+        label templates.
+
+        Args:
+            area: Area name or ID.
+            label: Label name or ID. When both are given, only entities matching
+                both are returned.
+
+        Returns:
+            List[str]: Matching entity IDs.
+        """
+        if not area and not label:
+            return []
+
+        if self.hub is not None and self.hub.ready and len(self.hub.directory):
+            directory = self.hub.directory
+            return [
+                entity.id for entity in directory.entities()
+                if (not area or directory.in_area(entity.id, area))
+                and (not label or directory.has_label(entity.id, label))
+            ]
+
+        selected = None
+        if area:
+            selected = [entity.id for entity in await self.get_area_entities(area)]
+        if label:
+            label_ids = [entity.id for entity in await self.get_label_entities(label)]
+            if selected is None:
+                selected = label_ids
+            else:
+                labelled = set(label_ids)
+                selected = [e for e in selected if e in labelled]
+        return list(dict.fromkeys(selected))
 
     ### GET STATES or STATES
 
+    @traced()
     async def get_states_by_condition(self, condition: Optional[str] = None) -> List[schemas.StateCore]:
         """
         Queries Home Assistant for all entities currently matching a specific state 
@@ -239,17 +305,16 @@ class RetrievalService:
         Returns:
             List[schemas.StateCore]: A list of matching entity states.
         """
-        states = []
-        if condition:
-            template_payload = build_payload(HomeAssistantTemplates.STATES_BY_CONDITION, condition)
-            response = await self.api.get_HA_template_data(template_payload) or []
-            for data in response:
-                try:
-                    states.append(schemas.StateCore(**data))
-                except Exception as e:
-                    logger.exception(f"Error parsing state {data.get('state_id')}: {e}")
-        return states
+        if condition and self._mirror_ready:
+            return await self.query_states(states=[condition])
 
+        if not condition:
+            return []
+        template_payload = build_payload(HomeAssistantTemplates.STATES_BY_CONDITION, condition)
+        response = await self.api.get_HA_template_data(template_payload) or []
+        return self._parse(schemas.StateCore, response)
+
+    @traced()
     async def get_entity_state(self, entity_id: str) -> Optional[schemas.State]:
         """
         Fetches the current state, last updated time, and all attributes for a 
@@ -272,6 +337,7 @@ class RetrievalService:
             logger.exception(f"An unexpected error occurred: {e}")
             return None
 
+    @traced()
     async def get_states(self, cheaper: bool = False) -> Union[List[schemas.State], List[schemas.StateCore]]:
         """
         Snapshots the current state of every entity in the Home Assistant instance.
@@ -287,19 +353,134 @@ class RetrievalService:
             True: schemas.StateCore,
             False: schemas.State
         }
-        states = []
         try:
             response = await self.api.get("states")
             response.raise_for_status()
-            data = response.json()
-            for state in data:
-                states.append(schema[cheaper](**state))
+            return self._parse(schema[cheaper], response.json())
         except Exception as e:
             logger.exception(f"An unexpected error occurred in get_states: {e}")
-        return states
+        return []
+
+    @traced()
+    async def get_state_snapshot(self, version: Optional[str] = None) -> schemas.StateSnapshot:
+        """
+        Snapshots every entity's core state from the live state mirror, or only what
+        changed since a version token returned by a previous call.
+
+        Args:
+            version: Token from a previous snapshot. If it is unknown or too old
+                to compute a delta, a full snapshot is returned instead.
+
+        Returns:
+            schemas.StateSnapshot: The states (all or changed/added), removed entity IDs
+            and the token for the current version. Without the live mirror, a full
+            snapshot without token is fetched from Home Assistant.
+        """
+        if not self._mirror_ready:
+            return schemas.StateSnapshot(states=await self.get_states(cheaper=True))
+
+        mirror = self.hub.mirror
+        since = mirror.parse_token(version)
+        if since is None:
+            changed, removed = mirror.states(), []
+        else:
+            changed, removed = mirror.changes_since(since)
+
+        states = [self._state_core(record) for record in changed]
+        return schemas.StateSnapshot(version=mirror.token, full=since is None, states=states, removed=removed)
+
+    @traced()
+    async def get_state_records(
+        self, version: Optional[str] = None
+    ) -> Tuple[schemas.StateSnapshot, List[Union[StateRecord, schemas.StateCore]]]:
+        """
+        Same as get_state_snapshot(), but the states are returned apart, sorted by
+        entity ID, and left as live mirror records where possible so that callers
+        serving them in pages build StateCores (see state_core()) for one page only.
+
+        Returns:
+            (snapshot, states): The snapshot without its 'states', and the states.
+        """
+        if not self._mirror_ready:
+            snapshot = await self.get_state_snapshot(version)
+            states, snapshot.states = sorted(snapshot.states, key=lambda state: state.entity_id), []
+            return snapshot, states
+
+        mirror = self.hub.mirror
+        token = mirror.token
+        since = mirror.parse_token(version)
+        changed, removed = (mirror.states(), []) if since is None else mirror.changes_since(since)
+        changed.sort(key=lambda record: record.entity_id)
+        return schemas.StateSnapshot(version=token, full=since is None, removed=removed), changed
+
+    def state_core(self, state: Union[StateRecord, schemas.StateCore]) -> schemas.StateCore:
+        """A StateCore for an item returned by get_state_records()."""
+        return state if isinstance(state, schemas.StateCore) else self._state_core(state)
+
+    @traced()
+    async def query_states(
+        self,
+        states: Optional[List[str]] = None,
+        domain: Optional[str] = None,
+        device_class: Optional[str] = None,
+        area: Optional[str] = None,
+        label: Optional[str] = None,
+        attribute: Optional[str] = None,
+        above: Optional[float] = None,
+        below: Optional[float] = None,
+        changed_within: Optional[float] = None,
+        unchanged_for: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[schemas.StateCore]:
+        """
+        Filters entity states locally in a single pass, without rendering templates.
+
+        Runs against the live state mirror when available; otherwise a single
+        /states snapshot is fetched and filtered the same way (area and label
+        filters are then resolved through the area/label templates).
+
+        Args:
+            states: Accepted state values (e.g., ['on', 'open']).
+            domain: Entity domain (e.g., 'sensor').
+            device_class: Device class attribute (e.g., 'temperature').
+            area: Area name or ID.
+            label: Label name or ID.
+            attribute: Attribute compared by 'above'/'below' instead of the state.
+            above: Numeric value must be strictly greater than this.
+            below: Numeric value must be strictly lower than this.
+            changed_within: Only states changed in the last N seconds.
+            unchanged_for: Only states that have not changed for N seconds.
+            limit: Max number of results.
+
+        Returns:
+            List[schemas.StateCore]: The matching entity states.
+        """
+        filters = dict(
+            states=states, domain=domain, device_class=device_class, attribute=attribute, above=above, below=below,
+            changed_within=changed_within, unchanged_for=unchanged_for,
+        )
+        if self._mirror_ready:
+            query = StateQuery(area=area, label=label, directory=self.hub.directory, **filters)
+            rows = query.run(self.hub.mirror.states(), limit)
+        else:
+            try:
+                response = await self.api.get("states")
+                response.raise_for_status()
+                rows = [StateRecord.from_dict(data) for data in response.json() if data.get('entity_id')]
+                get_default_metrics().records_parsed.inc(len(rows), kind="states")
+            except Exception as e:
+                logger.exception(f"An unexpected error occurred in query_states: {e}")
+                return []
+            if area or label:
+                allowed = set(await self.resolve_entity_ids(area=area, label=label))
+                rows = [row for row in rows if row.entity_id in allowed]
+            rows = StateQuery(**filters).run(rows, limit)
+
+        return [self._state_core(record) for record in rows]
 
     #### GET ENTITY' STATE HISTORY 
 
+    @traced()
     async def get_history(
         self,
         entity_id: str, 
@@ -310,6 +491,8 @@ class RetrievalService:
         """
         Retrieves the historical states of an entity over a period of time. 
         Useful for analyzing trends or finding when a device was last used.
+        Windows covered by the live per-entity buffers are served from memory
+        instead of querying the recorder.
 
         Args:
             entity_id: The entity to query.
@@ -324,42 +507,270 @@ class RetrievalService:
                 HistoryState(state='213.1', last_changed=datetime.datetime(2026, 1, 3, 21, 31, 20, 928893, tzinfo=TzInfo(0)), state_class='measurement', unit_of_measurement='W', device_class='power')
             ]
         """
+        series = await self.get_history_series(entity_id, start_time, end_time)
+        if series is None:
+            return []
+        return series.tail(limit).records()
+
+    @traced()
+    async def get_history_series(
+        self,
+        entity_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> Optional[helpers.Series]:
+        """
+        Same as get_history(), but returns the compact columnar series: metadata is
+        stored once per series and timestamps are parsed in bulk into epoch
+        microseconds. Pydantic records are only built by series.records().
+
+        Returns:
+            Optional[helpers.Series]: A NumericSeries or CategoricalSeries, or None
+            if there is no history or it could not be fetched.
+        """
         time_format = "%Y-%m-%dT%H:%M:%S%z"
+
+        buffered = self._get_buffered_history(entity_id, start_time, end_time, time_format)
+        if buffered is not None:
+            return buffered
+
+        history_endpoint, params = self._history_request(entity_id, start_time, end_time, time_format)
+        try:
+            response = await self.api.get(history_endpoint, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            if not data or not isinstance(data, list) or not data[0]:
+                return None
+            get_default_metrics().records_parsed.inc(len(data[0]), kind="history")
+            return helpers.build_series(entity_id, data[0])
+        except Exception as e:
+            logger.exception(f"Error fetching history for {entity_id}: {e}")
+        return None
+
+    @traced()
+    async def get_history_series_many(
+        self,
+        entity_ids: List[str],
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        batch_size: int = 100,
+    ) -> Dict[str, helpers.Series]:
+        """
+        Same as get_history_series() for several entities. Windows held by the live
+        buffers are served from memory; the rest are fetched from the recorder
+        'batch_size' entities per request, HISTORY_FETCH_CONCURRENCY requests at a time.
+
+        Returns:
+            Dict[str, helpers.Series]: Series by entity ID; entities without history are left out.
+        """
+        time_format = "%Y-%m-%dT%H:%M:%S%z"
+        result: Dict[str, helpers.Series] = {}
+        missing = []
+        for entity_id in dict.fromkeys(entity_ids):
+            buffered = self._get_buffered_history(entity_id, start_time, end_time, time_format)
+            if buffered is not None:
+                result[entity_id] = buffered
+            else:
+                missing.append(entity_id)
+
+        semaphore = asyncio.Semaphore(max(config.HISTORY_FETCH_CONCURRENCY, 1))
+
+        async def fetch(batch: List[str]) -> None:
+            history_endpoint, params = self._history_request(",".join(batch), start_time, end_time, time_format)
+            requested = set(batch)
+            try:
+                async with semaphore:
+                    response = await self.api.get(history_endpoint, params=params)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                logger.exception(f"Error fetching history for {len(batch)} entities: {e}")
+                return
+            for rows in data if isinstance(data, list) else []:
+                # With minimal_response only the first row of each entity carries its ID.
+                entity_id = rows[0].get("entity_id") if rows else None
+                if entity_id in requested:
+                    get_default_metrics().records_parsed.inc(len(rows), kind="history")
+                    result[entity_id] = helpers.build_series(entity_id, rows)
+
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        await asyncio.gather(*(fetch(batch) for batch in batches))
+        return result
+
+    def _history_request(
+        self,
+        entity_filter: str,
+        start_time: Optional[str],
+        end_time: Optional[str],
+        time_format: str,
+    ) -> Tuple[str, dict]:
+        """Endpoint and query parameters of a recorder history request."""
         history_endpoint = "history/period"
         
         if start_time and self.is_valid_datetime(start_time, time_format):
             history_endpoint = f"{history_endpoint}/{start_time}"
 
         params = {
-            "filter_entity_id": entity_id,
+            "filter_entity_id": entity_filter,
             "minimal_response": "",
             "significant_changes_only": ""
         }
 
         if end_time and self.is_valid_datetime(end_time, time_format):
             params["end_time"] = end_time
+        return history_endpoint, params
+
+    def get_energy_summary(
+        self,
+        entity_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> Optional[schemas.EnergySummary]:
+        """
+        Answers consumption questions from the local hourly/daily rollups kept for
+        energy and power sensors, without querying the recorder. The window is
+        widened to whole hours.
 
+        Args:
+            entity_id: An energy or power sensor.
+            start_time: Start of the period in ISO 8601 format (defaults to 24 hours ago).
+            end_time: End of the period in ISO 8601 format (defaults to now).
+
+        Returns:
+            Optional[schemas.EnergySummary]: The summary, or None if the rollups do not
+            cover the window (use the recorder history instead).
+        """
+        window = self.parse_window(start_time, end_time)
+        if self.hub is None or window is None:
+            return None
+        start, end = window
         try:
-            response = await self.api.get(history_endpoint, params=params)
-            response.raise_for_status()
-            data = response.json()
+            summary = self.hub.rollups.summary(entity_id, start.timestamp(), end.timestamp(), live=self.hub.ready)
+            if summary is None:
+                return None
+            unit = self.hub.rollups.unit(entity_id)
+        except Exception as e:
+            logger.exception(f"Error reading energy rollups for {entity_id}: {e}")
+            return None
 
-            if not data or not isinstance(data, list):
-                return []
+        return schemas.EnergySummary(
+            entity_id=entity_id,
+            start=datetime.fromtimestamp(summary["start"], timezone.utc),
+            end=datetime.fromtimestamp(summary["end"], timezone.utc),
+            delta=summary["delta"],
+            mean=summary["mean"],
+            min=summary["min"],
+            max=summary["max"],
+            unit_of_measurement=unit,
+        )
+
+    async def iter_history_chunks(
+        self,
+        entity_id: str,
+        start: datetime,
+        end: datetime,
+        chunk: timedelta = timedelta(hours=config.HISTORY_CHUNK_HOURS),
+        concurrency: int = config.HISTORY_FETCH_CONCURRENCY,
+    ) -> AsyncIterator[Tuple[int, datetime, Optional[helpers.Series]]]:
+        """
+        Fetches a history window as consecutive time chunks, 'concurrency' at a time,
+        and yields (chunk index, chunk start, series) in completion order.
+        """
+        bounds = []
+        chunk_start = start
+        while chunk_start < end:
+            bounds.append((chunk_start, min(chunk_start + chunk, end)))
+            chunk_start += chunk
+
+        time_format = "%Y-%m-%dT%H:%M:%SZ"
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def fetch(index: int, chunk_start: datetime, chunk_end: datetime):
+            async with semaphore:
+                series = await self.get_history_series(
+                    entity_id, chunk_start.strftime(time_format), chunk_end.strftime(time_format)
+                )
+            return index, chunk_start, series
+
+        tasks = [asyncio.create_task(fetch(i, s, e)) for i, (s, e) in enumerate(bounds)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @traced()
+    async def accumulate_history(
+        self,
+        entity_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> Optional[helpers.Accumulator]:
+        """
+        Summarizes an entity's history without holding all of its points: the window
+        is fetched in concurrent time chunks, each chunk is reduced to a streaming
+        accumulator as soon as it arrives, and the accumulators are merged in time order.
 
-            raw_records = data[0]
-            attrs = raw_records[0].get('attributes', {})
+        Args:
+            entity_id: The entity to analyze.
+            start_time: Start of the period in ISO 8601 format (defaults to 24 hours ago).
+            end_time: End of the period in ISO 8601 format (defaults to now).
 
-            is_numeric = (
-                attrs.get('state_class') == 'measurement' or 
-                attrs.get('unit_of_measurement') is not None
-            )
-            SchemaCls = schemas.HistoryNumericState if is_numeric else schemas.HistoryCategoricalState
+        Returns:
+            Optional[helpers.Accumulator]: The merged accumulator (see its summary()),
+            or None if no history was found.
+        """
+        window = self.parse_window(start_time, end_time)
+        if window is None:
+            logger.warning(f"Invalid history window {start_time} - {end_time} for {entity_id}")
+            return None
+        start, end = window
+
+        pending = {}
+        next_index = 0
+        result: Optional[helpers.Accumulator] = None
+        async for index, chunk_start, series in self.iter_history_chunks(entity_id, start, end):
+            carried = to_micros_delta(chunk_start - EPOCH) if index else None
+            if series is not None:
+                pending[index] = await self.executor.run(len(series), helpers.accumulate, series, carried)
+            else:
+                pending[index] = None
+            # Merge only adjacent chunks so the runs spanning chunk boundaries are stitched correctly.
+            while next_index in pending:
+                part = pending.pop(next_index)
+                next_index += 1
+                if part is None:
+                    continue
+                if result is not None and type(part) is not type(result):
+                    logger.warning(f"History of {entity_id} changed between numeric and text states; summarizing from chunk {next_index - 1}")
+                    result = None
+                result = part if result is None else result.merge(part)
+        return result
+
+    def _get_buffered_history(
+        self,
+        entity_id: str,
+        start_time: Optional[str],
+        end_time: Optional[str],
+        time_format: str,
+    ) -> Optional[helpers.Series]:
+        """
+        Serves a history window from the live per-entity buffers when the whole
+        window lies inside the buffered span. Returns None to fall back to the recorder.
+        """
+        if self.hub is None or not self.hub.ready:
+            return None
 
-            return [
-                SchemaCls(**(record | attrs)) 
-                for record in raw_records[-limit:]
-            ]
-        except Exception as e:
-            logger.exception(f"Error fetching history for {entity_id}: {e}")
-        return []
\ No newline at end of file
+        bounds = self.parse_window(start_time, end_time, time_format)
+        if bounds is None:
+            return None
+
+        start, end = bounds
+        window = self.hub.buffers.window(entity_id, start.timestamp(), end.timestamp())
+        if not window or not window.samples:
+            return None
+
+        meta = helpers.SeriesMeta(entity_id, window.device_class, window.unit_of_measurement, window.state_class)
+        return helpers.series_from_samples(meta, window.numeric, window.samples)
@@ -0,0 +1,186 @@
+import asyncio
+import contextlib
+import logging
+import ha_mcp_bot.schemas as schemas
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+from ha_mcp_bot.config import config
+from .action import ActionService
+
+logger = logging.getLogger(__name__)
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class _PendingCommand:
+    __slots__ = ("command", "futures", "first_at", "timer")
+
+    def __init__(self, command: Optional[schemas.SwitchCommand], first_at: float):
+        self.command = command
+        self.futures: List[asyncio.Future] = []
+        self.first_at = first_at
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class _EntityLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class CommandScheduler:
+    """
+    Async command queue in front of ActionService.trigger_service.
+
+    Commands for the same entity submitted within 'window' seconds of each other
+    are collapsed into the one net command (an on/off/on burst sends a single 'on',
+    two toggles cancel out), delayed by at most 'max_delay'. Dispatched calls are
+    spaced per integration according to 'rate_limit' (calls per second), and calls
+    for one entity never overlap. Bulk commands (run_bulk) are not coalesced but
+    share the same rate limits and per-entity locks.
+    """
+
+    def __init__(
+        self,
+        action: Optional[ActionService] = None,
+        window: float = config.ACTION_COALESCE_WINDOW,
+        rate_limit: float = config.ACTION_RATE_LIMIT,
+        integration_of: Optional[Callable[[str], str]] = None,
+    ):
+        self.action = action or ActionService()
+        self.window = window
+        self.max_delay = 4 * window
+        self.rate_limit = rate_limit
+        self.integration_of = integration_of or self._default_integration
+        self._pending: Dict[str, _PendingCommand] = {}
+        self._locks: Dict[str, _EntityLock] = {}
+        self._limiters: Dict[str, _RateLimiter] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _default_integration(self, entity_id: str) -> str:
+        hub = self.action.hub
+        if hub is not None:
+            return hub.directory.integration(entity_id)
+        return entity_id.split('.')[0]
+
+    @staticmethod
+    def _combine(
+        current: Optional[schemas.SwitchCommand], new: schemas.SwitchCommand
+    ) -> Optional[schemas.SwitchCommand]:
+        """Net effect of running 'current' then 'new'; None means no-op."""
+        if new != schemas.SwitchCommand.TOGGLE:
+            return new
+        if current is None:
+            return new
+        if current == schemas.SwitchCommand.TOGGLE:
+            return None
+        return schemas.SwitchCommand.OFF if current == schemas.SwitchCommand.ON else schemas.SwitchCommand.ON
+
+    def submit(self, entity_id: str, command: schemas.SwitchCommand) -> asyncio.Future:
+        """
+        Queues a command for an entity.
+
+        Returns:
+            asyncio.Future: Resolves with the entity's confirmed state once the
+            collapsed command has run (or None if it could not be confirmed).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = loop.time()
+
+        pending = self._pending.get(entity_id)
+        if pending is None:
+            pending = _PendingCommand(command, now)
+            self._pending[entity_id] = pending
+        else:
+            pending.command = self._combine(pending.command, command)
+            pending.timer.cancel()
+        pending.futures.append(future)
+
+        delay = max(0.0, min(self.window, pending.first_at + self.max_delay - now))
+        pending.timer = loop.call_later(delay, self._dispatch, entity_id)
+        return future
+
+    async def run(self, entity_id: str, command: schemas.SwitchCommand) -> Optional[schemas.State]:
+        return await self.submit(entity_id, command)
+
+    async def run_bulk(self, entity_ids: List[str], command: schemas.SwitchCommand) -> Dict[str, schemas.State]:
+        """
+        Runs one command for many entities through ActionService.trigger_bulk.
+
+        Every integration involved takes one slot of its rate limit before the
+        calls go out, and the entities' locks are held so the bulk call does not
+        overlap queued commands for the same entities.
+        """
+        targets = sorted(set(entity_ids))
+        async with contextlib.AsyncExitStack() as stack:
+            # Locks are always taken in sorted order, so concurrent bulk calls cannot deadlock.
+            for entity_id in targets:
+                await stack.enter_async_context(self._entity_lock(entity_id))
+            integrations = sorted({self.integration_of(entity_id) for entity_id in targets})
+            await asyncio.gather(*(self._limiter(integration).acquire() for integration in integrations))
+            return await self.action.trigger_bulk(entity_ids, command)
+
+    def _limiter(self, integration: str) -> _RateLimiter:
+        limiter = self._limiters.get(integration)
+        if limiter is None:
+            limiter = self._limiters[integration] = _RateLimiter(self.rate_limit)
+        return limiter
+
+    @contextlib.asynccontextmanager
+    async def _entity_lock(self, entity_id: str) -> AsyncIterator[None]:
+        """Holds the entity's lock; locks are dropped once nobody holds or waits for them."""
+        entry = self._locks.get(entity_id)
+        if entry is None:
+            entry = self._locks[entity_id] = _EntityLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if not entry.users:
+                del self._locks[entity_id]
+
+    def _dispatch(self, entity_id: str) -> None:
+        pending = self._pending.pop(entity_id, None)
+        if pending is None:
+            return
+        task = asyncio.create_task(self._execute(entity_id, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, entity_id: str, pending: _PendingCommand) -> None:
+        try:
+            async with self._entity_lock(entity_id):
+                if pending.command is None:
+                    state = await self.action.read_state(entity_id)
+                else:
+                    await self._limiter(self.integration_of(entity_id)).acquire()
+                    state = await self.action.trigger_service(entity_id, pending.command)
+        except Exception as e:
+            logger.exception(f"Error executing queued command for {entity_id}: {e}")
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if len(pending.futures) > 1:
+            logger.info(f"Collapsed {len(pending.futures)} commands for {entity_id} into '{getattr(pending.command, 'value', 'no-op')}'")
+        for future in pending.futures:
+            if not future.done():
+                future.set_result(state)
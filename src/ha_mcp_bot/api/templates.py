@@ -58,8 +58,7 @@ class HomeAssistantTemplates:
             {% set ns_devices.all = ns_devices.all + [{
                 'device_name': device_name(device),
                 'device_id': device,
-                'area_id': '$target',
-                'area_name': area_name('$target'),
+                'area': {'area_id': '$target', 'area_name': area_name('$target')},
                 'entities': ns_entities.current,
                 'labels': ns_labels.current,
             }] %}
@@ -95,8 +94,7 @@ class HomeAssistantTemplates:
                 'device_id': device,
                 'labels': ns_labels.current,
                 'entities': ns_entities.current,
-                'area_name': area_name(device),
-                'area_id': area_id(device)
+                'area': ({'area_id': area_id(device), 'area_name': area_name(device)} if area_id(device) else none)
             }] %}
                              
         {% endfor %}
@@ -111,8 +109,7 @@ class HomeAssistantTemplates:
                 {% set ns.on_entities = ns.on_entities + [{
                     'entity_id': state.entity_id,
                     'name': state.attributes.friendly_name | default(state.entity_id),
-                    'area_name': area_name(state.entity_id) | default('Unassigned'),
-                    'area_id': area_id(state.entity_id) | default('Unassigned'),
+                    'area': ({'area_id': area_id(state.entity_id), 'area_name': area_name(state.entity_id)} if area_id(state.entity_id) else none),
                     'last_changed': state.last_changed | string,
                     'state': state.state
                 }] %}
@@ -130,8 +127,7 @@ class HomeAssistantTemplates:
                 'device_name': device_name('$target'),
                 'entity_id': entity,
                 'entity_state': states(entity),
-                'area_id': area_id(entity),
-                'area_name': area_name(entity)
+                'area': ({'area_id': area_id(entity), 'area_name': area_name(entity)} if area_id(entity) else none)
             }] %}
         {% endfor %}
         {{ ns_entities.all | tojson }}
@@ -167,8 +163,7 @@ class HomeAssistantTemplates:
             'id': ent,
             'state': states(ent),
             'name': state_attr(ent, 'friendly_name') or '',
-            'area_id': area_id(ent),
-            'area_name': area_name(ent),
+            'area': ({'area_id': area_id(ent), 'area_name': area_name(ent)} if area_id(ent) else none),
             'labels': ns_labels.current,
             'device_id': dev_id,
             'device_name': device_name(dev_id),
@@ -194,8 +189,7 @@ class HomeAssistantTemplates:
                 'entity_id': state.entity_id,
                 'entity_state': state.state,
                 'name': state_attr(state.entity_id, 'friendly_name') or '',
-                'area_name': area_name(state.entity_id),
-                'area_id': area_id(state.entity_id),
+                'area': ({'area_id': area_id(state.entity_id), 'area_name': area_name(state.entity_id)} if area_id(state.entity_id) else none),
                 'labels': ns_labels.current
             }] %}
 
@@ -222,12 +216,8 @@ class HomeAssistantTemplates:
                     'device_name': device_name(device),
                     'entity_id': entity,
                     'entity_state': states(entity),
-                    'area_id': area_id(entity),
-                    'area_name': area_name(entity),
-                    'labels': ns_labels.current,
+                    'area': ({'area_id': area_id(entity), 'area_name': area_name(entity)} if area_id(entity) else none),
                     'name': state_attr(entity, 'friendly_name'),
-                    'area_name': area_name(entity),
-                    'area_id': area_id(entity),
                     'labels': ns_labels.current
                 }] %}
                              
@@ -255,12 +245,8 @@ class HomeAssistantTemplates:
                     'device_name': device_name(device),
                     'entity_id': entity,
                     'entity_state': states(entity),
-                    'area_id': area_id(entity),
-                    'area_name': area_name(entity),
-                    'labels': ns_labels.current,
+                    'area': ({'area_id': area_id(entity), 'area_name': area_name(entity)} if area_id(entity) else none),
                     'name': state_attr(entity, 'friendly_name'),
-                    'area_name': area_name(entity),
-                    'area_id': area_id(entity),
                     'labels': ns_labels.current
                 }] %}
                               
@@ -270,6 +256,15 @@ class HomeAssistantTemplates:
     """)
 
 
+_TEMPLATE_NAMES = {
+    id(value): name for name, value in vars(HomeAssistantTemplates).items()
+    if not name.startswith("_") and isinstance(value, (str, Template))
+}
+# Rendered template text -> template name, for metrics labels.
+_RENDERED_NAMES = {}
+_RENDERED_NAMES_LIMIT = 512
+
+
 def build_payload(template_obj, target_value=None):
     """
     Sends a Jinja template to Home Assistant and returns parsed JSON data.
@@ -277,4 +272,16 @@ def build_payload(template_obj, target_value=None):
     rendered_template = template_obj
     if isinstance(template_obj, Template):
         rendered_template = template_obj.safe_substitute(target=target_value)
-    return {"template": rendered_template.strip()}
\ No newline at end of file
+    rendered_template = rendered_template.strip()
+
+    name = _TEMPLATE_NAMES.get(id(template_obj))
+    if name is not None and rendered_template not in _RENDERED_NAMES:
+        if len(_RENDERED_NAMES) >= _RENDERED_NAMES_LIMIT:
+            _RENDERED_NAMES.clear()
+        _RENDERED_NAMES[rendered_template] = name
+    return {"template": rendered_template}
+
+
+def template_name(template: str) -> str:
+    """Name of the HomeAssistantTemplates entry a payload was built from, or 'custom'."""
+    return _RENDERED_NAMES.get(template, "custom")
\ No newline at end of file
@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from websockets.asyncio.client import connect, ClientConnection
+from ha_mcp_bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+EventCallback = Callable[[dict], None]
+
+
+class HAWebSocketError(Exception):
+    """Raised when Home Assistant rejects a WebSocket command or the connection is lost."""
+
+
+@dataclass
+class _Subscription:
+    message: dict
+    callback: EventCallback
+    remote_id: Optional[int] = None
+
+
+class HAWebSocketClient:
+    """
+    Persistent connection to the Home Assistant WebSocket API.
+
+    The connection is kept alive by a background task that re-authenticates and
+    replays every active subscription after a disconnect. Subscriptions are
+    addressed by a local handle that stays valid across reconnects.
+    """
+
+    def __init__(self, url: str, token: str, reconnect_delay: float = 5.0):
+        self.url = url
+        self.token = token
+        self.reconnect_delay = reconnect_delay
+        self._ws: Optional[ClientConnection] = None
+        self._ids = itertools.count(1)
+        self._handles = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._subscriptions: Dict[int, _Subscription] = {}
+        self._remote: Dict[int, int] = {}
+        self._on_connect: List[Callable[[], Awaitable[None]]] = []
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @staticmethod
+    def url_from_rest(base_url: str) -> str:
+        """Derives the WebSocket endpoint from the REST API base URL."""
+        parts = urlsplit(base_url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        return urlunsplit((scheme, parts.netloc, "/api/websocket", "", ""))
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def on_connect(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Registers a coroutine to run after every successful (re)connection."""
+        self._on_connect.append(callback)
+
+    async def start(self) -> None:
+        """Starts the background connection loop. Safe to call more than once."""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="ha-websocket")
+
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def send_command(self, message: dict, timeout: float = 10.0) -> Any:
+        """
+        Sends a single command and waits for its result.
+
+        Raises:
+            HAWebSocketError: If not connected, the command fails or no result arrives in time.
+        """
+        if self._ws is None:
+            raise HAWebSocketError("WebSocket is not connected")
+
+        msg_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self._ws.send(json.dumps({**message, "id": msg_id}))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise HAWebSocketError(f"Timed out waiting for '{message.get('type')}' result")
+        finally:
+            self._pending.pop(msg_id, None)
+
+    async def subscribe(self, message: dict, callback: EventCallback) -> int:
+        """
+        Registers a subscription command (e.g. 'subscribe_events', 'render_template').
+
+        The callback receives each pushed event payload. When disconnected, the
+        subscription is sent as soon as the connection is (re)established.
+
+        Returns:
+            int: A local handle to pass to unsubscribe().
+
+        Raises:
+            HAWebSocketError: If connected and Home Assistant rejects the subscription
+                (or does not answer); it is then not kept.
+        """
+        handle = next(self._handles)
+        subscription = _Subscription(message=message, callback=callback)
+        self._subscriptions[handle] = subscription
+        if self.connected:
+            try:
+                await self._send_subscription(handle, subscription)
+            except HAWebSocketError:
+                self._subscriptions.pop(handle, None)
+                raise
+        return handle
+
+    async def unsubscribe(self, handle: int) -> None:
+        subscription = self._subscriptions.pop(handle, None)
+        if subscription is None or subscription.remote_id is None:
+            return
+        self._remote.pop(subscription.remote_id, None)
+        if self.connected:
+            try:
+                await self.send_command({"type": "unsubscribe_events", "subscription": subscription.remote_id})
+            except HAWebSocketError as e:
+                logger.warning(f"Error unsubscribing {subscription.message.get('type')}: {e}")
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _send_subscription(self, handle: int, subscription: _Subscription) -> None:
+        msg_id = next(self._ids)
+        subscription.remote_id = msg_id
+        self._remote[msg_id] = handle
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self._ws.send(json.dumps({**subscription.message, "id": msg_id}))
+            await asyncio.wait_for(future, 10.0)
+        except Exception as e:
+            self._remote.pop(msg_id, None)
+            subscription.remote_id = None
+            logger.error(f"Subscription '{subscription.message.get('type')}' failed: {e}")
+            raise HAWebSocketError(f"Subscription '{subscription.message.get('type')}' failed: {e}") from e
+        finally:
+            self._pending.pop(msg_id, None)
+
+    async def _authenticate(self, ws: ClientConnection) -> None:
+        greeting = json.loads(await ws.recv())
+        if greeting.get("type") != "auth_required":
+            raise HAWebSocketError(f"Unexpected greeting: {greeting.get('type')}")
+        await ws.send(json.dumps({"type": "auth", "access_token": self.token}))
+        reply = json.loads(await ws.recv())
+        if reply.get("type") != "auth_ok":
+            raise HAWebSocketError(f"Authentication failed: {reply.get('message', reply.get('type'))}")
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                async with connect(self.url, max_size=None) as ws:
+                    await self._authenticate(ws)
+                    self._ws = ws
+                    reader = asyncio.create_task(self._read(ws))
+                    self._connected.set()
+                    for handle, subscription in list(self._subscriptions.items()):
+                        if subscription.remote_id is None:
+                            try:
+                                await self._send_subscription(handle, subscription)
+                            except HAWebSocketError:
+                                # Already logged; the subscription is retried on the next reconnect.
+                                pass
+                    logger.info(f"Connected to Home Assistant WebSocket at {self.url}")
+                    for callback in self._on_connect:
+                        try:
+                            await callback()
+                        except Exception:
+                            logger.exception("Error in WebSocket on_connect callback")
+                    await reader
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket connection error: {e}")
+            finally:
+                self._drop_connection()
+
+            if not self._closing:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _read(self, ws: ClientConnection) -> None:
+        async for raw in ws:
+            message = json.loads(raw)
+            kind = message.get("type")
+            if kind == "event":
+                handle = self._remote.get(message.get("id"))
+                subscription = self._subscriptions.get(handle)
+                if subscription is None:
+                    continue
+                try:
+                    subscription.callback(message.get("event", {}))
+                except Exception:
+                    logger.exception(f"Error handling '{subscription.message.get('type')}' event")
+            elif kind == "result":
+                future = self._pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if message.get("success"):
+                    future.set_result(message.get("result"))
+                else:
+                    error = message.get("error") or {}
+                    future.set_exception(HAWebSocketError(error.get("message", "Command failed")))
+
+    def _drop_connection(self) -> None:
+        self._ws = None
+        self._connected.clear()
+        self._remote.clear()
+        for subscription in self._subscriptions.values():
+            subscription.remote_id = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(HAWebSocketError("WebSocket connection lost"))
+        self._pending.clear()
+
+
+_DEFAULT_WS_INSTANCE: Optional['HAWebSocketClient'] = None
+
+def get_default_ws() -> HAWebSocketClient:
+    """Global access to the WebSocket client."""
+    global _DEFAULT_WS_INSTANCE
+    if _DEFAULT_WS_INSTANCE is None:
+        url = config.HA_WS_URL or HAWebSocketClient.url_from_rest(config.HA_URL)
+        _DEFAULT_WS_INSTANCE = HAWebSocketClient(url, config.HA_TOKEN)
+    return _DEFAULT_WS_INSTANCE
@@ -14,10 +14,61 @@ class Config:
     OAUTH_STRICT: bool = os.getenv("OAUTH_STRICT", "false").lower() in ("true", "1", "yes")
     TRANSPORT: str = os.getenv("TRANSPORT", "streamable-http")
     DEBUG: str = os.getenv("DEBUG", "true") == 'true'
+    METRICS_PATH: str = os.getenv("METRICS_PATH", "/metrics")
 
     # API Configuration
     HA_URL: str = os.getenv('HA_URL', "http://homeassistant.local:8123/api/")
     HA_TOKEN: str = os.getenv('HA_TOKEN')
+    HA_WS_URL: str = os.getenv('HA_WS_URL')
+
+    # Live event stream (WebSocket subscription)
+    LIVE_EVENTS: bool = os.getenv("LIVE_EVENTS", "true").lower() in ("true", "1", "yes")
+    CHANGE_FEED_SIZE: int = int(os.getenv("CHANGE_FEED_SIZE", "5000"))
+    HISTORY_BUFFER_SIZE: int = int(os.getenv("HISTORY_BUFFER_SIZE", "720"))
+    HISTORY_BUFFER_MAX_BYTES: int = int(os.getenv("HISTORY_BUFFER_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    TEMPLATE_SUBSCRIPTIONS: int = int(os.getenv("TEMPLATE_SUBSCRIPTIONS", "32"))
+    TEMPLATE_SUBSCRIPTION_IDLE: float = float(os.getenv("TEMPLATE_SUBSCRIPTION_IDLE", "3600"))
+    TEMPLATE_RENDER_TIMEOUT: float = float(os.getenv("TEMPLATE_RENDER_TIMEOUT", "10"))
+
+    # Tool responses: compact JSON capped at RESPONSE_MAX_BYTES; larger lists continue through
+    # cursors held for RESPONSE_CURSOR_TTL seconds (at most RESPONSE_CURSORS results).
+    RESPONSE_MAX_BYTES: int = int(os.getenv("RESPONSE_MAX_BYTES", "65536"))
+    RESPONSE_CURSOR_TTL: float = float(os.getenv("RESPONSE_CURSOR_TTL", "900"))
+    RESPONSE_CURSORS: int = int(os.getenv("RESPONSE_CURSORS", "64"))
+
+    # Actions
+    ACTION_CONFIRM_TIMEOUT: float = float(os.getenv("ACTION_CONFIRM_TIMEOUT", "5"))
+    ACTION_COALESCE_WINDOW: float = float(os.getenv("ACTION_COALESCE_WINDOW", "0.25"))
+    ACTION_RATE_LIMIT: float = float(os.getenv("ACTION_RATE_LIMIT", "5"))
+
+    # History analysis
+    HISTORY_CHUNK_HOURS: float = float(os.getenv("HISTORY_CHUNK_HOURS", "6"))
+    HISTORY_FETCH_CONCURRENCY: int = int(os.getenv("HISTORY_FETCH_CONCURRENCY", "4"))
+
+    # Analytics executor: inline below ANALYTICS_THREAD_POINTS, thread pool below
+    # ANALYTICS_PROCESS_POINTS, process pool above.
+    ANALYTICS_THREAD_POINTS: int = int(os.getenv("ANALYTICS_THREAD_POINTS", "50000"))
+    ANALYTICS_PROCESS_POINTS: int = int(os.getenv("ANALYTICS_PROCESS_POINTS", "500000"))
+    ANALYTICS_WORKERS: int = int(os.getenv("ANALYTICS_WORKERS", "2"))
+
+    # Energy rollups (hourly/daily aggregates of energy and power sensors, kept in SQLite)
+    ENERGY_ROLLUPS_PATH: str = os.getenv("ENERGY_ROLLUPS_PATH", "energy_rollups.sqlite3")
+    ENERGY_ROLLUPS_FLUSH: float = float(os.getenv("ENERGY_ROLLUPS_FLUSH", "60"))
+
+    # Tracing: fraction of tool calls traced (0 disables), exported to TRACE_PATH ('jsonl')
+    # or an OTLP/HTTP collector ('otlp').
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "jsonl")
+    TRACE_PATH: str = os.getenv("TRACE_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+
+    # Profiling: fraction of tool calls profiled (0 disables); collapsed stacks go to PROFILE_DIR,
+    # which keeps the newest PROFILE_MAX_FILES profiles.
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_MAX_FILES: int = int(os.getenv("PROFILE_MAX_FILES", "200"))
 
 
     def validate(self) -> None:
@@ -1,11 +1,35 @@
 from .search import *
 from .analytics import *
 from .tokenization import *
+from .series import *
+from .anomalies import *
+from .correlation import *
 
 __all__ = [
     'search_entities_by_keywords',
     'format_entity_results',
     'get_history_analytics',
     'tokenizer',
-    'StateAnalytics'
+    'TokenCache',
+    'StateAnalytics',
+    'SeriesMeta',
+    'NumericSeries',
+    'CategoricalSeries',
+    'Series',
+    'build_series',
+    'series_from_samples',
+    'parse_timestamps',
+    'QuantileDigest',
+    'NumericAccumulator',
+    'CategoricalAccumulator',
+    'Accumulator',
+    'accumulate',
+    'time_grid',
+    'find_anomalies',
+    'ANOMALY_METHODS',
+    'anomaly_windows',
+    'build_anomalies',
+    'correlate',
+    'correlation_arrays',
+    'build_correlation',
 ]
\ No newline at end of file
@@ -1,47 +1,330 @@
-from typing import List
-from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+from collections import Counter, defaultdict
+import numpy as np
 from ha_mcp_bot.schemas import HistoryNumericState, HistoryCategoricalState, HistoryState
+from .series import EPOCH, CategoricalSeries, NumericSeries, Series, SeriesMeta, from_micros, to_micros_delta
+
+
+History = Union[Series, List[HistoryState]]
+
+
+def as_series(history: History) -> Series:
+    """Accepts a series as is, or converts a list of history records into one."""
+    if isinstance(history, (NumericSeries, CategoricalSeries)):
+        return history
+    first = history[0]
+    meta = SeriesMeta('', first.device_class, first.unit_of_measurement, first.state_class)
+    timestamps = np.array([to_micros_delta(record.last_changed - EPOCH) for record in history], dtype=np.int64)
+    if isinstance(first, HistoryNumericState):
+        return NumericSeries(meta, timestamps, np.array([record.state for record in history], dtype=np.float64))
+    return CategoricalSeries(meta, timestamps, [record.state for record in history])
 
 
 class StateAnalytics:
-    
+    """Summaries computed directly on the int64 timestamps and value arrays of a series."""
+
     @staticmethod
-    def numeric_summary(instances: List[HistoryNumericState]) -> dict:
-        if not instances: return {}
-        vals = [i.state for i in instances]
+    def numeric_summary(instances: History) -> dict:
+        if not len(instances): return {}
+        series = as_series(instances)
+        vals = series.values
         return {
-            "avg": sum(vals) / len(vals),
-            "max": max(vals),
-            "min": min(vals),
-            "unit": instances[0].unit_of_measurement
+            "avg": float(vals.mean()),
+            "max": float(vals.max()),
+            "min": float(vals.min()),
+            "unit": series.meta.unit_of_measurement
         }
 
     @staticmethod
-    def categorical_summary(instances: List[HistoryCategoricalState]) -> dict:
-        if not instances: return {}
-        counts = Counter(i.state for i in instances)
+    def categorical_summary(instances: History) -> dict:
+        if not len(instances): return {}
+        series = as_series(instances)
+        distribution = series.distribution()
         return {
-            "most_common": counts.most_common(1)[0][0],
-            "total_changes": len(instances),
-            "distribution": dict(counts)
+            "most_common": max(distribution, key=distribution.get),
+            "total_changes": len(series) - 1,
+            "distribution": distribution,
+            "transitions": {f"{old} -> {new}": n for (old, new), n in series.transitions.items()},
         }
     
     @staticmethod
-    def state_durations(instances: List[HistoryCategoricalState]) -> dict[str, float]:
+    def state_durations(instances: History) -> Dict[str, float]:
         """Returns total seconds spent in each state."""
-        durations = {}
-        
-        for i in range(len(instances) - 1):
-            state_label = instances[i].state
-            duration = (instances[i+1].last_changed - instances[i].last_changed).total_seconds()
-            
-            durations[state_label] = durations.get(state_label, 0) + duration
-            
-        return durations
+        return as_series(instances).state_durations()
+
+    @staticmethod
+    def last_change_index(instances: History) -> int:
+        """Index of the last record (or run) whose state differs from the current one (0 if none)."""
+        series = as_series(instances)
+        if not series.numeric:
+            last = series.last_change()
+            return 0 if last is None else last
+        values = series.values
+        changed = np.flatnonzero(values != values[-1])
+        return int(changed[-1]) if len(changed) else 0
     
 
+class QuantileDigest:
+    """
+    Mergeable quantile sketch in the style of a merging t-digest.
+
+    Values are kept as weighted centroids; with the arcsine scale function each
+    centroid covers at most one unit of 'compression / 2' over the quantile range,
+    so centroids are small near the tails and the sketch stays O(compression).
+    """
+
+    __slots__ = ("compression", "means", "weights", "minimum", "maximum")
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def add(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._compress(np.concatenate((self.means, values)), np.concatenate((self.weights, np.ones(len(values)))))
+
+    def merge(self, other: "QuantileDigest") -> "QuantileDigest":
+        merged = QuantileDigest(self.compression)
+        merged.minimum = min(self.minimum, other.minimum)
+        merged.maximum = max(self.maximum, other.maximum)
+        merged._compress(np.concatenate((self.means, other.means)), np.concatenate((self.weights, other.weights)))
+        return merged
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        if not len(means):
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        middle = (np.cumsum(weights) - weights / 2) / total
+        scale = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * middle - 1)).astype(np.int64)
+        starts = np.flatnonzero(np.diff(scale, prepend=scale[0] - 1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.means):
+            return None
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(
+            q * total,
+            np.concatenate(([0.0], centers, [total])),
+            np.concatenate(([self.minimum], self.means, [self.maximum])),
+        ))
+
+
+class NumericAccumulator:
+    """
+    Streaming, mergeable summary of a numeric history.
+
+    Count, mean and variance are combined with Chan's parallel form of Welford's
+    algorithm, quantiles come from a QuantileDigest, and the current value and
+    last change are tracked, so accumulators of consecutive time chunks can be
+    merged without keeping their points.
+    """
+
+    numeric = True
+
+    __slots__ = ("unit", "count", "mean", "m2", "digest", "first", "last", "change")
+
+    def __init__(self, unit: Optional[str] = None, compression: float = 100.0):
+        self.unit = unit
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digest = QuantileDigest(compression)
+        # (timestamp, value) pairs; 'change' is the last sample differing from the current value.
+        self.first: Optional[Tuple[int, float]] = None
+        self.last: Optional[Tuple[int, float]] = None
+        self.change: Optional[Tuple[int, float]] = None
+
+    @classmethod
+    def from_series(cls, series: NumericSeries, start: Optional[int] = None) -> "NumericAccumulator":
+        """
+        Summarizes one chunk. Samples at or before 'start' (the state HA carries
+        into a chunk that does not begin the window) are dropped.
+        """
+        accumulator = cls(series.meta.unit_of_measurement)
+        timestamps, values = series.timestamps, series.values
+        if start is not None:
+            keep = timestamps > start
+            timestamps, values = timestamps[keep], values[keep]
+        if not len(values):
+            return accumulator
+
+        accumulator.count = len(values)
+        accumulator.mean = float(values.mean())
+        accumulator.m2 = float(((values - accumulator.mean) ** 2).sum())
+        accumulator.digest.add(values)
+        accumulator.first = (int(timestamps[0]), float(values[0]))
+        accumulator.last = (int(timestamps[-1]), float(values[-1]))
+        changed = np.flatnonzero(values != values[-1])
+        if len(changed):
+            accumulator.change = (int(timestamps[changed[-1]]), float(values[changed[-1]]))
+        return accumulator
+
+    def merge(self, other: "NumericAccumulator") -> "NumericAccumulator":
+        """Combines two accumulators of non-overlapping time ranges (in either order)."""
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        earlier, later = (self, other) if self.first[0] <= other.first[0] else (other, self)
+
+        merged = NumericAccumulator(earlier.unit or later.unit, earlier.digest.compression)
+        merged.count = earlier.count + later.count
+        delta = later.mean - earlier.mean
+        merged.mean = earlier.mean + delta * later.count / merged.count
+        merged.m2 = earlier.m2 + later.m2 + delta ** 2 * earlier.count * later.count / merged.count
+        merged.digest = earlier.digest.merge(later.digest)
+        merged.first, merged.last = earlier.first, later.last
+        if later.change is not None:
+            merged.change = later.change
+        elif earlier.last[1] != later.last[1]:
+            merged.change = earlier.last
+        else:
+            merged.change = earlier.change
+        return merged
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {}
+        change = self.change or self.first
+        return {
+            "avg": self.mean,
+            "max": self.digest.maximum,
+            "min": self.digest.minimum,
+            "std": self.variance ** 0.5,
+            "median": self.digest.quantile(0.5),
+            "p95": self.digest.quantile(0.95),
+            "unit": self.unit,
+            "current_state": {"state": self.last[1], "timestamp": from_micros(self.last[0])},
+            "last_state_change": {"state": change[1], "timestamp": from_micros(change[0])},
+        }
+
+
+class CategoricalAccumulator:
+    """
+    Streaming, mergeable summary of a categorical history: time spent in each
+    state, times each state was entered, transition counts and the last change.
+    Merging two consecutive chunks stitches the run that spans their boundary.
+    """
+
+    numeric = False
+
+    __slots__ = ("runs", "durations", "entries", "transitions", "first", "state", "run_start", "end", "change")
+
+    def __init__(self):
+        self.runs = 0
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.entries: Counter = Counter()
+        self.transitions: Counter = Counter()
+        self.first: Optional[Tuple[int, str]] = None
+        self.state: Optional[str] = None
+        self.run_start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.change: Optional[Tuple[int, str]] = None
+
+    @classmethod
+    def from_series(cls, series: CategoricalSeries, start: Optional[int] = None) -> "CategoricalAccumulator":
+        """Summarizes one chunk; runs starting before 'start' are clamped to it."""
+        accumulator = cls()
+        if not len(series):
+            return accumulator
+        starts, end = series.starts, series.end
+        if start is not None and starts[0] < start:
+            starts = np.maximum(starts, start)
+            end = max(end, start)
+            series = CategoricalSeries._from_runs(series.meta, series.labels, starts, series.ids, end)
+
+        labels, ids = series.labels, series.ids
+        accumulator.runs = len(series)
+        accumulator.durations.update({k: v for k, v in series.state_durations().items() if v})
+        accumulator.entries.update({k: v for k, v in series.distribution().items() if v})
+        accumulator.transitions.update(series.transitions)
+        accumulator.first = (int(starts[0]), labels[ids[0]])
+        accumulator.state = labels[ids[-1]]
+        accumulator.run_start = int(starts[-1])
+        accumulator.end = int(end)
+        if len(series) > 1:
+            accumulator.change = (int(starts[-2]), labels[ids[-2]])
+        return accumulator
+
+    def merge(self, other: "CategoricalAccumulator") -> "CategoricalAccumulator":
+        """Combines two accumulators of non-overlapping time ranges (in either order)."""
+        if not other.runs:
+            return self
+        if not self.runs:
+            return other
+        earlier, later = (self, other) if self.first[0] <= other.first[0] else (other, self)
+        continued = earlier.state == later.first[1]
+
+        merged = CategoricalAccumulator()
+        merged.runs = earlier.runs + later.runs - continued
+        for source in (earlier, later):
+            for state, seconds in source.durations.items():
+                merged.durations[state] += seconds
+        merged.durations[earlier.state] += (later.first[0] - earlier.end) / 1e6
+        merged.entries = earlier.entries + later.entries
+        merged.transitions = earlier.transitions + later.transitions
+        if continued:
+            merged.entries[earlier.state] -= 1
+        else:
+            merged.transitions[(earlier.state, later.first[1])] += 1
+
+        merged.first, merged.state, merged.end = earlier.first, later.state, later.end
+        if later.runs == 1:
+            merged.run_start = earlier.run_start if continued else later.run_start
+            merged.change = earlier.change if continued else (earlier.run_start, earlier.state)
+        else:
+            merged.run_start = later.run_start
+            merged.change = later.change
+            if later.runs == 2 and continued:
+                merged.change = (earlier.run_start, earlier.state)
+        return merged
+
+    def summary(self) -> dict:
+        if not self.runs:
+            return {}
+        change = self.change or self.first
+        return {
+            "most_common": max(self.entries, key=self.entries.get),
+            "total_changes": self.runs - 1,
+            "distribution": dict(self.entries),
+            "transitions": {f"{old} -> {new}": n for (old, new), n in self.transitions.items()},
+            "durations": dict(self.durations),
+            "current_state": {"state": self.state, "timestamp": from_micros(self.run_start)},
+            "last_state_change": {"state": change[1], "timestamp": from_micros(change[0])},
+        }
+
+
+Accumulator = Union[NumericAccumulator, CategoricalAccumulator]
+
+
+def accumulate(series: Series, start: Optional[int] = None) -> Accumulator:
+    """Builds the accumulator matching a series (see the from_series() methods for 'start')."""
+    if series.numeric:
+        return NumericAccumulator.from_series(series, start)
+    return CategoricalAccumulator.from_series(series, start)
+
+
 def get_history_analytics(
-    state_history: List[HistoryState],
+    state_history: History,
     ) -> dict:
     """
     Performs statistical analysis on a sequence of Home Assistant state records.
@@ -50,8 +333,9 @@ def get_history_analytics(
     or categorical (labels/states) and returns the appropriate statistical summary.
 
     Args:
-        state_history: A list of state objects retrieved from Home Assistant. 
-            Should be either all HistoryNumericState or all HistoryCategoricalState.
+        state_history: A NumericSeries/CategoricalSeries, or a list of state objects
+            retrieved from Home Assistant (either all HistoryNumericState or all
+            HistoryCategoricalState).
 
     Returns:
         dict: A dictionary containing the analysis results.
@@ -60,45 +344,22 @@ def get_history_analytics(
             - 'avg' (float): The mean value across all records.
             - 'max' (float): The highest value recorded.
             - 'min' (float): The lowest value recorded.
+            - 'std' (float): The standard deviation.
+            - 'median', 'p95' (float): Approximate quantiles.
             - 'unit' (str): The unit of measurement (e.g., '°C', 'W').
 
         If the input is Categorical (e.g., On/Off, Open/Closed):
             - 'most_common' (str): The state the entity was in most frequently.
             - 'total_changes' (int): The number of times the state changed.
-            - 'distribution' (dict): A mapping of state labels to occurrence counts.
+            - 'distribution' (dict): A mapping of state labels to the number of times
+              the entity entered that state.
+            - 'transitions' (dict): Counts per 'old -> new' state transition.
             - 'durations' (dict): A mapping of state labels to total seconds spent 
               in that state (time-weighted).
             - 'current state': actual state of entity with timestamp
             - 'last_status_change': state and timestamp of last entity status change.
     """
-    if not state_history:
+    if not len(state_history):
         return {}
-    
-    if isinstance(state_history[0], HistoryNumericState):
-        stats = StateAnalytics.numeric_summary(state_history)
-    
-    if isinstance(state_history[0], HistoryCategoricalState):
-        stats = StateAnalytics.categorical_summary(state_history)
-        durations = StateAnalytics.state_durations(state_history)
-        stats.update({'durations': durations})
-
-    last_state = state_history[-1]
-    for state in state_history[::-1]:
-        if state.state != last_state.state:
-            break
-    
-    last_state_change = {
-        'state': state.state,
-        'timestamp': state.last_changed
-    }
-    current_state = {
-        'state': last_state.state,
-        'timestamp': last_state.last_changed,
-    }
-    stats.update({
-            'current_state': current_state,
-            'last_state_change': last_state_change
-            
-    })
-    return stats
+    return accumulate(as_series(state_history)).summary()
     
\ No newline at end of file
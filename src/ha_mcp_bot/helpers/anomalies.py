@@ -0,0 +1,199 @@
+import logging
+import warnings
+import numpy as np
+from typing import List, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from ha_mcp_bot.schemas import AnomalyWindow, EntityAnomalies
+from .series import NumericSeries, SeriesMeta, from_micros, time_grid
+
+logger = logging.getLogger(__name__)
+
+# Scale of a normal distribution's MAD, so MAD scores read like z-scores.
+_MAD_SCALE = 1.4826
+# Median absolute difference of two independent normal samples, in standard deviations.
+_STEP_SCALE = 0.9539
+ANOMALY_METHODS = ("ewma", "mad")
+
+
+def _noise_floor(matrix: np.ndarray) -> np.ndarray:
+    """
+    Per-row noise level estimated from the non-zero steps between consecutive bins.
+    Used as the minimum spread, so a short rolling window that happens to be calm,
+    or a flat quantized sensor (a thermostat moving 20.0 -> 20.1), does not turn
+    ordinary noise into huge scores.
+    """
+    steps = np.abs(np.diff(matrix, axis=1))
+    steps[steps == 0] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        floor = np.nanmedian(steps, axis=1)
+    return np.nan_to_num(floor / _STEP_SCALE, nan=0.0) + 1e-9
+
+
+def ewma_scores(matrix: np.ndarray, span: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores every bin against the exponentially weighted mean and variance of the
+    bins before it. Rows are entities and are updated together, one column at a time.
+
+    Returns:
+        (scores, expected): z-scores (0 during warm-up or where data is missing)
+        and the EWMA baseline for each bin.
+    """
+    rows, columns = matrix.shape
+    alpha = 2.0 / (span + 1)
+    warmup = max(span // 2, 3)
+    floor = _noise_floor(matrix)
+
+    scores = np.zeros_like(matrix)
+    expected = np.full_like(matrix, np.nan)
+    mean = np.zeros(rows)
+    variance = np.zeros(rows)
+    seen = np.zeros(rows, dtype=np.int64)
+
+    for column in range(columns):
+        x = matrix[:, column]
+        valid = ~np.isnan(x)
+        first = valid & (seen == 0)
+        mean[first] = x[first]
+
+        deviation = np.where(valid, x - mean, 0.0)
+        scored = valid & (seen >= warmup)
+        scores[scored, column] = deviation[scored] / np.maximum(np.sqrt(variance[scored]), floor[scored])
+        expected[:, column] = np.where(seen > 0, mean, np.nan)
+
+        update = valid & ~first
+        step = alpha * deviation
+        mean[update] += step[update]
+        variance[update] = (1 - alpha) * (variance[update] + deviation[update] * step[update])
+        seen += valid
+    return scores, expected
+
+
+def mad_scores(matrix: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores every bin against the median and MAD of the 'window' bins before it.
+    More robust than the EWMA to earlier spikes, at the cost of a sort per window.
+
+    Returns:
+        (scores, expected): robust z-scores (0 where fewer than half of the window
+        has data) and the rolling median for each bin.
+    """
+    rows, columns = matrix.shape
+    padded = np.concatenate((np.full((rows, window), np.nan), matrix), axis=1)
+    windows = sliding_window_view(padded, window, axis=1)[:, :columns]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - median[:, :, None]), axis=2) * _MAD_SCALE
+
+    enough = (~np.isnan(windows)).sum(axis=2) >= max(window // 2, 3)
+    scale = np.maximum(np.nan_to_num(mad), _noise_floor(matrix)[:, None])
+    scores = np.where(enough & ~np.isnan(matrix), (matrix - median) / scale, 0.0)
+    return np.nan_to_num(scores), median
+
+
+ANOMALY_WINDOW_DTYPE = np.dtype([
+    ("row", np.int32), ("start", np.int64), ("end", np.int64),
+    ("value", np.float64), ("expected", np.float64), ("score", np.float64),
+])
+
+
+def anomaly_windows(
+    series: Sequence[NumericSeries],
+    start: int,
+    end: int,
+    step: int,
+    method: str = "ewma",
+    threshold: float = 5.0,
+    window: int = 24,
+) -> np.ndarray:
+    """
+    Array core of find_anomalies(); safe to run in a worker process.
+
+    Returns:
+        np.ndarray: One ANOMALY_WINDOW_DTYPE record per flagged window: the series
+        index, window bounds (epoch microseconds), and value, baseline and score at its peak.
+    """
+    if method not in ANOMALY_METHODS:
+        raise ValueError(f"Unknown anomaly method '{method}', expected one of {ANOMALY_METHODS}")
+    if not series:
+        return np.zeros(0, dtype=ANOMALY_WINDOW_DTYPE)
+
+    edges = time_grid(start, end, step)
+    matrix = np.vstack([s.resample(edges) for s in series])
+    if method == "ewma":
+        scores, expected = ewma_scores(matrix, window)
+    else:
+        scores, expected = mad_scores(matrix, window)
+
+    flagged = np.abs(scores) > threshold
+    padded = np.pad(flagged, ((0, 0), (1, 1))).astype(np.int8)
+    changes = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(changes == 1)
+    _, run_ends = np.nonzero(changes == -1)
+
+    windows = np.zeros(len(run_rows), dtype=ANOMALY_WINDOW_DTYPE)
+    magnitude = np.abs(scores)
+    for i, (row, first, last) in enumerate(zip(run_rows.tolist(), run_starts.tolist(), run_ends.tolist())):
+        peak = first + int(np.argmax(magnitude[row, first:last]))
+        windows[i] = (row, edges[first], edges[last], matrix[row, peak], expected[row, peak], scores[row, peak])
+    logger.debug(f"Anomaly scan flagged {len(windows)} windows in {len(series)} series over {len(edges) - 1} bins")
+    return windows
+
+
+def build_anomalies(metas: Sequence[SeriesMeta], windows: np.ndarray) -> List[EntityAnomalies]:
+    """Turns anomaly_windows() records into per-entity results, highest score first."""
+    results = {}
+    for row, start, end, value, expected, score in windows.tolist():
+        results.setdefault(row, []).append(AnomalyWindow(
+            start=from_micros(start),
+            end=from_micros(end),
+            value=round(value, 3),
+            expected=round(expected, 3),
+            score=round(score, 2),
+        ))
+    anomalies = [
+        EntityAnomalies(
+            entity_id=metas[row].entity_id,
+            unit_of_measurement=metas[row].unit_of_measurement,
+            score=max(abs(w.score) for w in entity_windows),
+            windows=entity_windows,
+        )
+        for row, entity_windows in results.items()
+    ]
+    anomalies.sort(key=lambda a: a.score, reverse=True)
+    return anomalies
+
+
+def find_anomalies(
+    series: Sequence[NumericSeries],
+    start: int,
+    end: int,
+    step: int,
+    method: str = "ewma",
+    threshold: float = 5.0,
+    window: int = 24,
+) -> List[EntityAnomalies]:
+    """
+    Scans numeric series for outliers in one batch.
+
+    Every series is resampled onto the same grid (time-weighted bin means, see
+    NumericSeries.resample) and stacked into an (entities x bins) matrix, which
+    is scored with ewma_scores() or mad_scores(). Consecutive bins whose absolute
+    score exceeds 'threshold' form one window.
+
+    Args:
+        series: Numeric histories to scan.
+        start: Grid start (epoch microseconds).
+        end: Grid end (epoch microseconds).
+        step: Bin width (microseconds).
+        method: 'ewma' (rolling mean / standard deviation) or 'mad' (rolling median / MAD).
+        threshold: Minimum absolute score to flag a bin.
+        window: EWMA span or MAD window, in bins.
+
+    Returns:
+        List[EntityAnomalies]: Flagged entities only, highest score first.
+    """
+    windows = anomaly_windows(series, start, end, step, method, threshold, window)
+    return build_anomalies([s.meta for s in series], windows)
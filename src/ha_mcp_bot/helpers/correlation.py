@@ -0,0 +1,144 @@
+import logging
+import warnings
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from ha_mcp_bot.schemas import CorrelationMatrix
+from .series import CategoricalSeries, Series, SeriesMeta, time_grid
+
+logger = logging.getLogger(__name__)
+
+# States counted as 'inactive' when categorical entities are compared.
+INACTIVE_STATES = frozenset({
+    "off", "closed", "idle", "standby", "paused", "not_home", "away", "clear", "unavailable", "unknown", "none",
+})
+
+
+def activity(series: CategoricalSeries, edges: np.ndarray) -> np.ndarray:
+    """1.0 where the entity is in an active state at the start of each bin, 0.0 when inactive, NaN before its history."""
+    ids = series.resample(edges[:-1])
+    active = np.array([label.lower() not in INACTIVE_STATES for label in series.labels] + [False], dtype=np.float64)
+    return np.where(ids >= 0, active[ids], np.nan)
+
+
+def _matrix(rows: List[List[float]], digits: int) -> List[List[Optional[float]]]:
+    return [[None if np.isnan(value) else round(value, digits) for value in row] for row in rows]
+
+
+def lagged_correlations(matrix: np.ndarray, max_lag: int, min_overlap: int = 3) -> np.ndarray:
+    """
+    Pearson correlation of every pair of rows at every lag in [-max_lag, max_lag] bins.
+
+    Rows are standardized once over their own valid bins; each lag is then a few
+    matrix products over the bins both rows have data for, normalized over that
+    overlap so values stay within [-1, 1].
+
+    Returns:
+        np.ndarray: Shape (2 * max_lag + 1, rows, rows); [max_lag + l, i, j] correlates
+        row i with row j shifted 'l' bins later. NaN where undefined.
+    """
+    rows, columns = matrix.shape
+    valid = ~np.isnan(matrix)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(matrix, axis=1, keepdims=True)
+        std = np.nanstd(matrix, axis=1, keepdims=True)
+    valid &= std > 0
+    standardized = np.where(valid, (matrix - mean) / np.where(std > 0, std, 1.0), 0.0)
+    weights = valid.astype(np.float64)
+    squares = standardized ** 2
+
+    result = np.full((2 * max_lag + 1, rows, rows), np.nan)
+    for lag in range(min(max_lag, columns - 1) + 1):
+        early, late = slice(0, columns - lag), slice(lag, columns)
+        products = standardized[:, early] @ standardized[:, late].T
+        norms = (squares[:, early] @ weights[:, late].T) * (weights[:, early] @ squares[:, late].T)
+        overlap = weights[:, early] @ weights[:, late].T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = np.where((overlap >= min_overlap) & (norms > 0), products / np.sqrt(norms), np.nan)
+        result[max_lag + lag] = np.clip(correlation, -1.0, 1.0)
+        result[max_lag - lag] = result[max_lag + lag].T
+    return result
+
+
+def correlation_arrays(
+    series: Sequence[Series],
+    start: int,
+    end: int,
+    step: int,
+    max_lag: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Array core of correlate(); safe to run in a worker process.
+
+    Returns:
+        Dict[str, np.ndarray]: 'correlation', 'lag_seconds' and 'lag_correlation'
+        (entities x entities), 'categorical' (indexes of categorical series) and
+        'co_active' (their pairwise active seconds).
+    """
+    edges = time_grid(start, end, step)
+    widths = np.diff(edges) / 1e6
+    matrix = np.vstack([s.resample(edges) if s.numeric else activity(s, edges) for s in series])
+
+    lagged = lagged_correlations(matrix, max_lag)
+    magnitude = np.nan_to_num(np.abs(lagged), nan=-1.0)
+    best = np.argmax(magnitude, axis=0)
+    best_correlation = np.take_along_axis(lagged, best[None], axis=0)[0]
+
+    categorical = np.array([i for i, s in enumerate(series) if not s.numeric], dtype=np.int64)
+    active = np.nan_to_num(matrix[categorical])
+    logger.debug(f"Correlated {len(series)} series over {len(widths)} bins and {2 * max_lag + 1} lags")
+    return {
+        "correlation": lagged[max_lag],
+        "lag_seconds": np.where(np.isnan(best_correlation), np.nan, (best - max_lag) * step / 1e6),
+        "lag_correlation": best_correlation,
+        "categorical": categorical,
+        "co_active": (active * widths) @ active.T,
+    }
+
+
+def build_correlation(
+    metas: Sequence[SeriesMeta],
+    step: int,
+    max_lag: int,
+    arrays: Dict[str, np.ndarray],
+) -> CorrelationMatrix:
+    """Turns correlation_arrays() output into the rounded, JSON-friendly matrix."""
+    categorical = arrays["categorical"].tolist()
+    return CorrelationMatrix(
+        entity_ids=[meta.entity_id for meta in metas],
+        bin_seconds=step / 1e6,
+        correlation=_matrix(arrays["correlation"].tolist(), 3),
+        lag_seconds=_matrix(arrays["lag_seconds"].tolist(), 0) if max_lag else None,
+        lag_correlation=_matrix(arrays["lag_correlation"].tolist(), 3) if max_lag else None,
+        categorical_ids=[metas[i].entity_id for i in categorical] or None,
+        co_active_seconds=_matrix(arrays["co_active"].tolist(), 0) if categorical else None,
+    )
+
+
+def correlate(
+    series: Sequence[Series],
+    start: int,
+    end: int,
+    step: int,
+    max_lag: int = 0,
+) -> CorrelationMatrix:
+    """
+    Aligns several series on a common time grid and compares every pair.
+
+    Numeric series are resampled to time-weighted bin means; categorical ones to
+    an active/inactive indicator (see INACTIVE_STATES), so mixed pairs get a
+    point-biserial correlation. For categorical pairs the time both were active
+    is also reported, at the resolution of the grid.
+
+    Args:
+        series: Histories to compare, in output order.
+        start: Grid start (epoch microseconds).
+        end: Grid end (epoch microseconds).
+        step: Bin width (microseconds).
+        max_lag: Largest shift, in bins, tried for the cross-correlation.
+
+    Returns:
+        CorrelationMatrix: Matrices indexed like 'entity_ids'.
+    """
+    arrays = correlation_arrays(series, start, end, step, max_lag)
+    return build_correlation([s.meta for s in series], step, max_lag, arrays)
@@ -4,6 +4,9 @@ from ha_mcp_bot.schemas import Entity, SearchEntity
 from .tokenization import tokenizer
 
 
+_WORDS = re.compile(r'\w+')
+
+
 def search_entities_by_keywords(entities: List[Entity], description: str) -> Optional[List[SearchEntity]]:
     """Search for entities matching a natural language description.
     
@@ -14,7 +17,7 @@ def search_entities_by_keywords(entities: List[Entity], description: str) -> Opt
     Returns:
         A list of matching entity objects sorted by relevance score
     """
-    keywords = set(re.findall(r'\w+', description.lower()))
+    keywords = set(_WORDS.findall(description.lower()))
     matches = []
  
     for entity in entities:
@@ -22,7 +25,7 @@ def search_entities_by_keywords(entities: List[Entity], description: str) -> Opt
         score = 0
         for keyword in keywords:
             for token in tokens:
-                if keyword.lower() == token:
+                if keyword == token:
                     score += 2
                 elif token in keyword:
                     score += 1
@@ -0,0 +1,349 @@
+import logging
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+from ha_mcp_bot.schemas import HistoryNumericState, HistoryCategoricalState
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+_POOL_LIMIT = 50_000
+_pool: Dict[str, str] = {}
+
+
+def shared_string(value: str) -> str:
+    """Returns one shared copy of a repeated string; the pool stops growing at _POOL_LIMIT."""
+    shared = _pool.get(value)
+    if shared is not None:
+        return shared
+    if len(_pool) < _POOL_LIMIT:
+        _pool[value] = value
+    return value
+
+
+def to_micros(value: Optional[str]) -> Optional[int]:
+    """Converts an ISO 8601 timestamp into integer microseconds since the epoch."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return to_micros_delta(parsed - EPOCH)
+
+
+def to_micros_delta(delta: timedelta) -> int:
+    return delta // _MICROSECOND
+
+
+def from_micros(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else EPOCH + timedelta(microseconds=value)
+
+
+# Layout of HA's timestamps: 'YYYY-MM-DDTHH:MM:SS[.ffffff]+HH:MM' (25 or 32 characters).
+_SHORT, _LONG = 25, 32
+_DATE_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARATORS = ((4, ord('-')), (7, ord('-')), (13, ord(':')), (16, ord(':')))
+
+
+def _number(digits: np.ndarray, start: int, width: int) -> np.ndarray:
+    value = digits[:, start].astype(np.int64)
+    for i in range(start + 1, start + width):
+        value = value * 10 + digits[:, i]
+    return value
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 for proleptic Gregorian dates (H. Hinnant's algorithm)."""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def parse_timestamps(values: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    Parses ISO 8601 timestamps into an int64 array of epoch microseconds.
+
+    Timestamps in HA's fixed layout are decoded in one vectorized pass over their
+    bytes; anything else goes through datetime.fromisoformat(). Unparseable
+    values are stored as 0.
+    """
+    count = len(values)
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        raw = np.array(values, dtype=f'S{_LONG}')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        return np.array([to_micros(value) or 0 for value in values], dtype=np.int64)
+
+    chars = raw.view(np.uint8).reshape(count, _LONG)
+    lengths = np.char.str_len(raw)
+    fractional = lengths == _LONG
+    # Non-digit characters wrap around to values above 9.
+    digits = chars - np.uint8(ord('0'))
+    offset = np.where(fractional[:, None], chars[:, 26:32], chars[:, 19:25])
+    offset_digits = offset[:, [1, 2, 4, 5]] - np.uint8(ord('0'))
+
+    valid = (lengths == _SHORT) | fractional
+    valid &= (chars[:, 10] == ord('T')) | (chars[:, 10] == ord(' '))
+    for position, separator in _SEPARATORS:
+        valid &= chars[:, position] == separator
+    valid &= (digits[:, _DATE_DIGITS] <= 9).all(axis=1)
+    valid &= ~fractional | ((chars[:, 19] == ord('.')) & (digits[:, 20:26] <= 9).all(axis=1))
+    valid &= ((offset[:, 0] == ord('+')) | (offset[:, 0] == ord('-'))) & (offset[:, 3] == ord(':'))
+    valid &= (offset_digits <= 9).all(axis=1)
+
+    days = _days_from_civil(_number(digits, 0, 4), _number(digits, 5, 2), _number(digits, 8, 2))
+    seconds = ((days * 24 + _number(digits, 11, 2)) * 60 + _number(digits, 14, 2)) * 60 + _number(digits, 17, 2)
+    offset_minutes = _number(offset_digits, 0, 2) * 60 + _number(offset_digits, 2, 2)
+    offset_minutes = np.where(offset[:, 0] == ord('-'), -offset_minutes, offset_minutes)
+    result = (seconds - offset_minutes * 60) * 1_000_000 + np.where(fractional, _number(digits, 20, 6), 0)
+
+    for index in np.flatnonzero(~valid):
+        result[index] = to_micros(values[index]) or 0
+    return result
+
+
+def is_numeric_series(attributes: dict) -> bool:
+    """A history is numeric if the entity is a measurement or has a unit."""
+    return attributes.get('state_class') == 'measurement' or attributes.get('unit_of_measurement') is not None
+
+
+class SeriesMeta:
+    """Metadata shared by every record of one entity's history."""
+
+    __slots__ = ("entity_id", "device_class", "unit_of_measurement", "state_class")
+
+    def __init__(self, entity_id: str, device_class: Optional[str] = None,
+                 unit_of_measurement: Optional[str] = None, state_class: Optional[str] = None):
+        self.entity_id = shared_string(entity_id)
+        self.device_class = device_class and shared_string(device_class)
+        self.unit_of_measurement = unit_of_measurement and shared_string(unit_of_measurement)
+        self.state_class = state_class and shared_string(state_class)
+
+    @classmethod
+    def from_attributes(cls, entity_id: str, attributes: dict) -> "SeriesMeta":
+        return cls(entity_id, attributes.get('device_class'), attributes.get('unit_of_measurement'),
+                   attributes.get('state_class'))
+
+
+class NumericSeries:
+    """Numeric history as parallel int64 (epoch microseconds) and float64 arrays."""
+
+    numeric = True
+
+    __slots__ = ("meta", "timestamps", "values")
+
+    def __init__(self, meta: SeriesMeta, timestamps: np.ndarray, values: np.ndarray):
+        self.meta = meta
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def tail(self, limit: int) -> "NumericSeries":
+        if len(self) <= limit:
+            return self
+        return NumericSeries(self.meta, self.timestamps[-limit:], self.values[-limit:])
+
+    def resample(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Time-weighted mean of the value in each bin [edges[i], edges[i + 1]) (epoch
+        microseconds), treating the series as a step function. A short spike still
+        moves the mean of its bin. Bins that end before the first sample are NaN.
+        """
+        bins = np.full(max(len(edges) - 1, 0), np.nan)
+        if not len(self.timestamps) or not len(bins):
+            return bins
+        origin = self.timestamps[0]
+        times = (self.timestamps - origin) / 1e6
+        values = self.values
+        area = np.concatenate(([0.0], np.cumsum(values[:-1] * np.diff(times))))
+
+        clipped = (np.maximum(edges, origin) - origin) / 1e6
+        last = np.searchsorted(times, clipped, side='right') - 1
+        integral = area[last] + values[last] * (clipped - times[last])
+        widths = np.diff(clipped)
+        covered = widths > 0
+        bins[covered] = np.diff(integral)[covered] / widths[covered]
+        return bins
+
+    def records(self) -> List[HistoryNumericState]:
+        """Builds the pydantic records; only used when raw rows are returned."""
+        meta = self.meta
+        return [
+            HistoryNumericState.model_construct(
+                state=value,
+                last_changed=from_micros(timestamp),
+                device_class=meta.device_class,
+                unit_of_measurement=meta.unit_of_measurement,
+                state_class=meta.state_class,
+            )
+            for timestamp, value in zip(self.timestamps.tolist(), self.values.tolist())
+        ]
+
+
+class CategoricalSeries:
+    """
+    Run-length encoded categorical history.
+
+    Consecutive records with the same state are stored as one run: its start
+    (epoch microseconds) and an index into a small state dictionary ('labels').
+    Time spent per state, run counts and transition counts are computed once
+    when the series is built; the state at a given time is found by binary search.
+    The last run lasts until 'end', the timestamp of the last record.
+    """
+
+    numeric = False
+
+    __slots__ = ("meta", "labels", "starts", "ids", "end", "durations", "run_counts", "transitions")
+
+    def __init__(self, meta: SeriesMeta, timestamps: np.ndarray, states: Sequence[str]):
+        labels: List[str] = []
+        index: Dict[str, int] = {}
+        for state in states:
+            if state not in index:
+                index[state] = len(labels)
+                labels.append(shared_string(state))
+        ids = np.fromiter((index[state] for state in states), dtype=np.int32, count=len(states))
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        run_at = np.flatnonzero(np.diff(ids)) + 1 if len(ids) else np.zeros(0, dtype=np.int64)
+        run_at = np.concatenate(([0], run_at)) if len(ids) else run_at
+        end = int(timestamps[-1]) if len(timestamps) else 0
+        self._set_runs(meta, labels, timestamps[run_at], ids[run_at], end)
+
+    @classmethod
+    def _from_runs(cls, meta: SeriesMeta, labels: List[str], starts: np.ndarray, ids: np.ndarray,
+                   end: int) -> "CategoricalSeries":
+        series = cls.__new__(cls)
+        series._set_runs(meta, labels, starts, ids, end)
+        return series
+
+    def _set_runs(self, meta: SeriesMeta, labels: List[str], starts: np.ndarray, ids: np.ndarray, end: int) -> None:
+        self.meta = meta
+        self.labels = labels
+        self.starts = starts
+        self.ids = ids
+        self.end = end
+
+        size = len(labels)
+        lengths = np.diff(np.append(starts, end)) / 1e6 if len(starts) else np.zeros(0)
+        self.durations = np.bincount(ids, weights=lengths, minlength=size)
+        self.run_counts = np.bincount(ids, minlength=size)
+        pairs = ids[:-1].astype(np.int64) * size + ids[1:]
+        codes, counts = np.unique(pairs, return_counts=True)
+        self.transitions = {(labels[code // size], labels[code % size]): int(n) for code, n in zip(codes.tolist(), counts.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Start of each run."""
+        return self.starts
+
+    @property
+    def states(self) -> List[str]:
+        """State of each run."""
+        labels = self.labels
+        return [labels[i] for i in self.ids.tolist()]
+
+    def state_durations(self) -> Dict[str, float]:
+        """Seconds spent in each state."""
+        return {label: float(seconds) for label, seconds in zip(self.labels, self.durations.tolist())}
+
+    def distribution(self) -> Dict[str, int]:
+        """Number of runs (times entered) of each state."""
+        return {label: int(n) for label, n in zip(self.labels, self.run_counts.tolist())}
+
+    def last_change(self) -> Optional[int]:
+        """Index of the run before the current one, or None if the state never changed."""
+        return len(self.starts) - 2 if len(self.starts) > 1 else None
+
+    def state_at(self, timestamp: int) -> Optional[str]:
+        """State at a time (epoch microseconds), or None before the series starts."""
+        run = int(np.searchsorted(self.starts, timestamp, side='right')) - 1
+        return self.labels[self.ids[run]] if run >= 0 else None
+
+    def resample(self, edges: np.ndarray) -> np.ndarray:
+        """Label index in effect at each edge (epoch microseconds); -1 before the series starts."""
+        runs = np.searchsorted(self.starts, edges, side='right') - 1
+        return np.where(runs >= 0, self.ids[np.maximum(runs, 0)], -1) if len(self.starts) else np.full(len(edges), -1)
+
+    def tail(self, limit: int) -> "CategoricalSeries":
+        if len(self) <= limit:
+            return self
+        return CategoricalSeries._from_runs(self.meta, self.labels, self.starts[-limit:], self.ids[-limit:], self.end)
+
+    def records(self) -> List[HistoryCategoricalState]:
+        """Builds the pydantic records (one per run); only used when raw rows are returned."""
+        meta = self.meta
+        return [
+            HistoryCategoricalState.model_construct(
+                state=state,
+                last_changed=from_micros(timestamp),
+                device_class=meta.device_class,
+                unit_of_measurement=meta.unit_of_measurement,
+                state_class=meta.state_class,
+            )
+            for timestamp, state in zip(self.starts.tolist(), self.states)
+        ]
+
+
+Series = Union[NumericSeries, CategoricalSeries]
+
+
+def build_series(entity_id: str, raw_records: List[dict]) -> Series:
+    """
+    Builds a series from a /history/period response for one entity.
+
+    Metadata is taken once from the first record (the only one carrying attributes
+    with 'minimal_response'). Numeric series skip non-numeric states such as
+    'unavailable'.
+    """
+    attributes = (raw_records[0].get('attributes') if raw_records else None) or {}
+    meta = SeriesMeta.from_attributes(entity_id, attributes)
+    timestamps = parse_timestamps([record.get('last_changed') for record in raw_records])
+
+    if not is_numeric_series(attributes):
+        return CategoricalSeries(meta, timestamps, [str(record.get('state')) for record in raw_records])
+
+    states = [record.get('state') for record in raw_records]
+    try:
+        return NumericSeries(meta, timestamps, np.array(states, dtype=np.float64))
+    except (TypeError, ValueError):
+        pass
+
+    values = np.empty(len(states), dtype=np.float64)
+    for i, state in enumerate(states):
+        try:
+            values[i] = float(state)
+        except (TypeError, ValueError):
+            values[i] = np.nan
+    numeric = ~np.isnan(values)
+    logger.debug(f"Skipped {len(states) - int(numeric.sum())} non-numeric states in {entity_id} history")
+    return NumericSeries(meta, timestamps[numeric], values[numeric])
+
+
+def time_grid(start: int, end: int, step: int) -> np.ndarray:
+    """Bin edges from 'start' to 'end' (epoch microseconds), 'step' apart; the last bin may be shorter."""
+    edges = np.arange(start, end, step, dtype=np.int64)
+    return np.append(edges, np.int64(end)) if len(edges) else np.array([start, end], dtype=np.int64)
+
+
+def series_from_samples(meta: SeriesMeta, numeric: bool, samples: Iterable) -> Series:
+    """Builds a series from (epoch seconds, value) samples, e.g. the live history buffers."""
+    samples = list(samples)
+    timestamps = np.rint(np.array([sample[0] for sample in samples], dtype=np.float64) * 1_000_000).astype(np.int64)
+    if numeric:
+        return NumericSeries(meta, timestamps, np.array([sample[1] for sample in samples], dtype=np.float64))
+    return CategoricalSeries(meta, timestamps, [sample[1] for sample in samples])
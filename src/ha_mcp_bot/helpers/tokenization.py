@@ -1,41 +1,100 @@
 import re
+from collections import OrderedDict
 from ha_mcp_bot.schemas import Entity
-from typing import List
+from typing import Hashable, Optional, Tuple
 
 
-def tokenizer(entity: Entity) -> List[str]:
-    """
-    Tokenizes an entity's metadata for keyword matching.
+_DELIMITERS = re.compile(r'[;,| _-]+')
 
-    Flattens the entity's domain, ID, name, labels, and area into a list of 
-    lowercase strings. Strings are split using delimiters (semicolon, comma, 
-    pipe, space, underscore, or hyphen) and filtered to remove any tokens 
-    with 2 or fewer characters.
 
-    Args:
-        entity: The Entity object containing the metadata to be processed.
+def _fingerprint(entity: Entity) -> Hashable:
+    """Captures the entity fields that feed the token list (the id is the cache key)."""
+    labels = tuple((label.id, label.name, label.description) for label in entity.labels)
+    area = (entity.area.id, entity.area.name) if entity.area else None
+    return entity.name, labels, area
 
-    Returns:
-        A list of alphanumeric strings extracted from the entity's attributes.
-    """
-    delimiters = r'[;,| _-]+'
+
+def _tokenize(entity: Entity) -> Tuple[str, ...]:
+    split = _DELIMITERS.split
 
     tokens = [entity.domain]
-    tokens += re.split(delimiters, entity.id.lower())
+    tokens += split(entity.id.lower())
 
     if entity.name:
-        tokens += re.split(delimiters, entity.name.lower())
+        tokens += split(entity.name.lower())
 
     for label in entity.labels:
-        tokens += re.split(delimiters, label.id.lower()) 
-        tokens += re.split(delimiters, label.name.lower())
+        tokens += split(label.id.lower())
+        tokens += split(label.name.lower())
         if label.description:
-            tokens += re.split(delimiters, label.description.lower()) 
+            tokens += split(label.description.lower())
 
     if entity.area:
-        tokens += re.split(delimiters, entity.area.id.lower()) 
-        tokens += re.split(delimiters, entity.area.name.lower())
+        if entity.area.id:
+            tokens += split(entity.area.id.lower())
+        if entity.area.name:
+            tokens += split(entity.area.name.lower())
+
+    return tuple(term for term in tokens if len(term) > 1)
+
+
+class TokenCache:
+    """
+    Memoizes entity tokens by entity ID.
+
+    An entry is reused as long as the entity's name, labels and area are unchanged;
+    any difference in those fields rebuilds the tokens on the next lookup. At most
+    'max_entries' entities are kept, least recently used first out, so entities
+    removed from Home Assistant age out.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, Tuple[str, ...]]]" = OrderedDict()
+
+    def get(self, entity: Entity) -> Tuple[str, ...]:
+        fingerprint = _fingerprint(entity)
+        cached = self._entries.get(entity.id)
+        if cached is not None and cached[0] == fingerprint:
+            self._entries.move_to_end(entity.id)
+            return cached[1]
+        tokens = _tokenize(entity)
+        self._entries[entity.id] = (fingerprint, tokens)
+        self._entries.move_to_end(entity.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return tokens
 
-    tokens = list(filter(lambda term: len(term) > 1, tokens))
+    def invalidate(self, entity_id: Optional[str] = None) -> None:
+        """Drops one entity's tokens, or the whole cache when no ID is given."""
+        if entity_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(entity_id, None)
 
-    return tokens
\ No newline at end of file
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_TOKEN_CACHE = TokenCache()
+
+
+def tokenizer(entity: Entity) -> Tuple[str, ...]:
+    """
+    Tokenizes an entity's metadata for keyword matching.
+
+    Flattens the entity's domain, ID, name, labels, and area into a list of
+    lowercase strings. Strings are split using delimiters (semicolon, comma,
+    pipe, space, underscore, or hyphen) and filtered to remove single-character
+    tokens.
+
+    Tokens are computed once per entity and served from a shared cache until
+    the entity's name, labels or area change.
+
+    Args:
+        entity: The Entity object containing the metadata to be processed.
+
+    Returns:
+        A tuple of alphanumeric strings extracted from the entity's attributes.
+    """
+    return _TOKEN_CACHE.get(entity)
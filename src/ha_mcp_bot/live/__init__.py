@@ -0,0 +1,28 @@
+from .ring import TimeRing
+from .buffers import HistoryBuffers, EntityBuffer, BufferedWindow
+from .directory import EntityDirectory
+from .feed import ChangeFeed, ChangeRecord, parse_timestamp
+from .mirror import StateMirror
+from .query import StateQuery
+from .records import StateRecord
+from .rollups import EnergyRollups, Rollup
+from .hub import LiveHub, get_default_hub
+
+
+__all__ = [
+    "TimeRing",
+    "HistoryBuffers",
+    "EntityBuffer",
+    "BufferedWindow",
+    "EntityDirectory",
+    "ChangeFeed",
+    "ChangeRecord",
+    "parse_timestamp",
+    "StateMirror",
+    "StateQuery",
+    "StateRecord",
+    "EnergyRollups",
+    "Rollup",
+    "LiveHub",
+    "get_default_hub",
+]
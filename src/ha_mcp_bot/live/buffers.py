@@ -0,0 +1,223 @@
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+from ha_mcp_bot.helpers.series import is_numeric_series
+from .feed import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+Sample = Tuple[float, Union[float, str]]
+
+
+class BufferedWindow:
+    """Samples served from memory for one entity, with its series metadata."""
+
+    __slots__ = ("numeric", "samples", "unit_of_measurement", "device_class", "state_class")
+
+    def __init__(self, numeric: bool, samples: List[Sample], unit_of_measurement: Optional[str],
+                 device_class: Optional[str], state_class: Optional[str]):
+        self.numeric = numeric
+        self.samples = samples
+        self.unit_of_measurement = unit_of_measurement
+        self.device_class = device_class
+        self.state_class = state_class
+
+
+class EntityBuffer:
+    """
+    Fixed-size ring of recent samples for one entity.
+
+    Timestamps and numeric values live in 'd' arrays; categorical states are stored
+    as 'H' indexes into a small per-entity state dictionary.
+    """
+
+    __slots__ = (
+        "numeric", "capacity", "times", "values", "labels", "_label_ids",
+        "_start", "_size", "covered_since", "unit_of_measurement", "device_class", "state_class",
+    )
+
+    def __init__(self, capacity: int, numeric: bool, attributes: dict):
+        self.numeric = numeric
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity)) if numeric else array('H', bytes(2 * capacity))
+        self.labels: List[str] = []
+        self._label_ids: Dict[str, int] = {}
+        self._start = 0
+        self._size = 0
+        self.covered_since: Optional[float] = None
+        self.unit_of_measurement = attributes.get('unit_of_measurement')
+        self.device_class = attributes.get('device_class')
+        self.state_class = attributes.get('state_class')
+
+    @staticmethod
+    def sample_bytes(numeric: bool) -> int:
+        return 16 if numeric else 10
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * self.sample_bytes(self.numeric)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, state: str) -> bool:
+        """Adds a sample; returns False if the state does not fit the series type."""
+        if self.numeric:
+            try:
+                value = float(state)
+            except (TypeError, ValueError):
+                return False
+        else:
+            value = self._label_id(state)
+
+        if self._size and timestamp < self.times[(self._start + self._size - 1) % self.capacity]:
+            return False
+
+        if self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+            # The oldest kept sample now marks where the complete sequence begins.
+            self.covered_since = self.times[self._start]
+
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.covered_since is None:
+            self.covered_since = timestamp
+        return True
+
+    def window(self, start: float, end: float) -> Optional[List[Sample]]:
+        """
+        Returns samples in [start, end], led by the state in effect at 'start'
+        (re-stamped to 'start', as the HA history API does).
+
+        Returns None when 'start' precedes the buffered span.
+        """
+        if self.covered_since is None or start < self.covered_since:
+            return None
+
+        samples: List[Sample] = []
+        for i in range(self._size):
+            index = (self._start + i) % self.capacity
+            timestamp = self.times[index]
+            if timestamp > end:
+                break
+            value = self.values[index] if self.numeric else self.labels[self.values[index]]
+            if timestamp <= start:
+                samples = [(start, value)]
+            else:
+                samples.append((timestamp, value))
+        return samples
+
+    def _label_id(self, state: str) -> int:
+        label_id = self._label_ids.get(state)
+        if label_id is None:
+            if len(self.labels) >= min(2 * self.capacity, 0xFFFF):
+                self._compact_labels()
+            label_id = len(self.labels)
+            self.labels.append(state)
+            self._label_ids[state] = label_id
+        return label_id
+
+    def _compact_labels(self) -> None:
+        """Rebuilds the state dictionary from the samples still in the ring."""
+        labels: List[str] = []
+        label_ids: Dict[str, int] = {}
+        for i in range(self._size):
+            index = (self._start + i) % self.capacity
+            state = self.labels[self.values[index]]
+            if state not in label_ids:
+                label_ids[state] = len(labels)
+                labels.append(state)
+            self.values[index] = label_ids[state]
+        self.labels, self._label_ids = labels, label_ids
+
+
+class HistoryBuffers:
+    """
+    Per-entity sample rings fed from 'state_changed' events.
+
+    Buffers are allocated on an entity's first change. When the total allocation
+    would exceed 'max_bytes', the least recently updated buffers are dropped.
+    """
+
+    def __init__(self, samples_per_entity: int, max_bytes: int):
+        self.samples_per_entity = samples_per_entity
+        self.max_bytes = max_bytes
+        self._buffers: "OrderedDict[str, EntityBuffer]" = OrderedDict()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._buffers
+
+    def clear(self) -> None:
+        """Drops every buffer; called after a connection gap since events were missed."""
+        self._buffers.clear()
+        self.nbytes = 0
+
+    def update(self, event_data: dict) -> None:
+        entity_id = event_data.get("entity_id")
+        new = event_data.get("new_state")
+        if not entity_id:
+            return
+        if new is None:
+            self._drop(entity_id)
+            return
+
+        old = event_data.get("old_state") or {}
+        if old.get("state") == new.get("state"):
+            return
+        timestamp = parse_timestamp(new.get("last_changed"))
+        if timestamp is None:
+            return
+
+        buffer = self._buffers.get(entity_id)
+        if buffer is None:
+            buffer = self._allocate(entity_id, new.get("attributes") or {})
+            if buffer is None:
+                return
+            # The previous state is known from its own last_changed onwards.
+            old_timestamp = parse_timestamp(old.get("last_changed"))
+            if old_timestamp is not None and old_timestamp <= timestamp:
+                buffer.append(old_timestamp, old.get("state"))
+        else:
+            self._buffers.move_to_end(entity_id)
+
+        buffer.append(timestamp, new.get("state"))
+
+    def window(self, entity_id: str, start: float, end: float) -> Optional[BufferedWindow]:
+        buffer = self._buffers.get(entity_id)
+        if buffer is None:
+            return None
+        samples = buffer.window(start, end)
+        if samples is None:
+            return None
+        return BufferedWindow(
+            buffer.numeric, samples, buffer.unit_of_measurement, buffer.device_class, buffer.state_class
+        )
+
+    def _allocate(self, entity_id: str, attributes: dict) -> Optional[EntityBuffer]:
+        numeric = is_numeric_series(attributes)
+        size = self.samples_per_entity * EntityBuffer.sample_bytes(numeric)
+        if size > self.max_bytes:
+            return None
+        while self._buffers and self.nbytes + size > self.max_bytes:
+            _, evicted = self._buffers.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        buffer = EntityBuffer(self.samples_per_entity, numeric, attributes)
+        self._buffers[entity_id] = buffer
+        self.nbytes += buffer.nbytes
+        return buffer
+
+    def _drop(self, entity_id: str) -> None:
+        buffer = self._buffers.pop(entity_id, None)
+        if buffer is not None:
+            self.nbytes -= buffer.nbytes
@@ -0,0 +1,84 @@
+import logging
+import time
+import ha_mcp_bot.schemas as schemas
+from typing import Dict, Iterable, Optional
+from ha_mcp_bot.api.custom_api import HomeAssistantAPI
+from ha_mcp_bot.api.templates import HomeAssistantTemplates, build_payload
+from ha_mcp_bot.api.websocket import HAWebSocketClient, HAWebSocketError
+
+logger = logging.getLogger(__name__)
+
+
+class EntityDirectory:
+    """
+    Local index of entity metadata (name, area, labels and integration).
+
+    State events only carry states and attributes, so area and label filters on
+    live data are resolved against this index. It is refreshed on connect and
+    whenever Home Assistant reports a registry update.
+    """
+
+    def __init__(self, api: HomeAssistantAPI, ws: Optional[HAWebSocketClient] = None):
+        self.api = api
+        self.ws = ws
+        self._entities: Dict[str, schemas.Entity] = {}
+        self._integrations: Dict[str, str] = {}
+        self.refreshed_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._entities
+
+    def get(self, entity_id: str) -> Optional[schemas.Entity]:
+        return self._entities.get(entity_id)
+
+    def entities(self) -> Iterable[schemas.Entity]:
+        return self._entities.values()
+
+    async def refresh(self) -> None:
+        template_payload = build_payload(HomeAssistantTemplates.ALL_ENTITITES)
+        response = await self.api.get_HA_template_data(template_payload)
+        if not isinstance(response, list):
+            logger.warning("Entity directory refresh returned no data")
+            return
+
+        entities = {entity.id: entity for entity in schemas.parse_many(schemas.Entity, response)}
+        self._entities = entities
+        self.refreshed_at = time.time()
+        logger.info(f"Entity directory refreshed with {len(entities)} entities")
+        await self._refresh_integrations()
+
+    async def _refresh_integrations(self) -> None:
+        # Templates cannot map entities to their integration; the entity registry can.
+        if self.ws is None or not self.ws.connected:
+            return
+        try:
+            registry = await self.ws.send_command({"type": "config/entity_registry/list_for_display"})
+        except HAWebSocketError as e:
+            logger.warning(f"Could not load entity registry: {e}")
+            return
+        self._integrations = {
+            entry["ei"]: entry["pl"] for entry in (registry or {}).get("entities", []) if entry.get("ei") and entry.get("pl")
+        }
+
+    def integration(self, entity_id: str) -> str:
+        """Integration (platform) that provides the entity, falling back to its domain."""
+        return self._integrations.get(entity_id) or entity_id.split('.')[0]
+
+    def in_area(self, entity_id: str, area: str) -> bool:
+        """Matches an area by ID or name, case-insensitively."""
+        entity = self._entities.get(entity_id)
+        if entity is None or entity.area is None:
+            return False
+        area = area.lower()
+        return area in ((entity.area.id or "").lower(), (entity.area.name or "").lower())
+
+    def has_label(self, entity_id: str, label: str) -> bool:
+        """Matches a label by ID or name, case-insensitively."""
+        entity = self._entities.get(entity_id)
+        if entity is None:
+            return False
+        label = label.lower()
+        return any(label in (item.id.lower(), item.name.lower()) for item in entity.labels)
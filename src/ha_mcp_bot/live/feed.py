@@ -0,0 +1,69 @@
+import time
+from datetime import datetime
+from typing import Iterator, Optional
+from .ring import TimeRing
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Converts an ISO 8601 timestamp from a state object into epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ChangeRecord:
+    """A compact state transition taken from a 'state_changed' event."""
+
+    __slots__ = ("timestamp", "entity_id", "old_state", "new_state")
+
+    def __init__(self, timestamp: float, entity_id: str, old_state: Optional[str], new_state: Optional[str]):
+        self.timestamp = timestamp
+        self.entity_id = entity_id
+        self.old_state = old_state
+        self.new_state = new_state
+
+
+class ChangeFeed:
+    """
+    Bounded, time-indexed log of recent state transitions.
+
+    Attribute-only updates are ignored. Coverage starts when recording began (or
+    resumed after a connection gap) and moves forward as old records are evicted,
+    so callers can tell whether a query window is complete.
+    """
+
+    def __init__(self, capacity: int):
+        self._ring: TimeRing[ChangeRecord] = TimeRing(capacity)
+        self.covered_since: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def mark_gap(self) -> None:
+        """Restarts coverage; called whenever events may have been missed."""
+        self.covered_since = time.time()
+
+    def covers(self, timestamp: float) -> bool:
+        return self.covered_since is not None and timestamp >= self.covered_since
+
+    def record(self, event_data: dict) -> Optional[ChangeRecord]:
+        entity_id = event_data.get("entity_id")
+        old = event_data.get("old_state") or {}
+        new = event_data.get("new_state") or {}
+        old_state, new_state = old.get("state"), new.get("state")
+        if not entity_id or old_state == new_state:
+            return None
+
+        timestamp = parse_timestamp(new.get("last_changed")) or time.time()
+        record = ChangeRecord(timestamp, entity_id, old_state, new_state)
+        evicted = self._ring.append(timestamp, record)
+        if evicted is not None and (self.covered_since is None or evicted >= self.covered_since):
+            # Other changes may share the evicted timestamp, so coverage starts just after it.
+            self.covered_since = evicted + 1e-6
+        return record
+
+    def since(self, timestamp: float) -> Iterator[ChangeRecord]:
+        return self._ring.since(timestamp)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from ha_mcp_bot.api.custom_api import HomeAssistantAPI, get_default_api
+from ha_mcp_bot.api.websocket import HAWebSocketClient, get_default_ws
+from ha_mcp_bot.config import config
+from .buffers import HistoryBuffers
+from .directory import EntityDirectory
+from .feed import ChangeFeed
+from .mirror import StateMirror
+from .rollups import EnergyRollups
+
+logger = logging.getLogger(__name__)
+
+
+StateListener = Callable[[dict], None]
+
+REGISTRY_EVENTS = (
+    "entity_registry_updated",
+    "device_registry_updated",
+    "area_registry_updated",
+    "label_registry_updated",
+)
+
+
+class LiveHub:
+    """
+    Owns the 'state_changed' subscription and fans events out to local consumers.
+
+    The change feed, per-entity history buffers, state mirror, energy rollups and
+    entity directory are built in; other components attach through add_listener() and receive the
+    raw event data of every state change.
+    """
+
+    def __init__(
+        self,
+        ws: Optional[HAWebSocketClient] = None,
+        api: Optional[HomeAssistantAPI] = None,
+        feed_size: int = config.CHANGE_FEED_SIZE,
+        registry_refresh_delay: float = 2.0,
+    ):
+        self.ws = ws or get_default_ws()
+        self.api = api or get_default_api()
+        self.directory = EntityDirectory(self.api, self.ws)
+        self.feed = ChangeFeed(feed_size)
+        self.buffers = HistoryBuffers(config.HISTORY_BUFFER_SIZE, config.HISTORY_BUFFER_MAX_BYTES)
+        self.mirror = StateMirror()
+        self.rollups = EnergyRollups(config.ENERGY_ROLLUPS_PATH, config.ENERGY_ROLLUPS_FLUSH)
+        self.registry_refresh_delay = registry_refresh_delay
+        self._listeners: List[StateListener] = [self.buffers.update, self.mirror.update, self.rollups.update]
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._started = False
+
+    @property
+    def ready(self) -> bool:
+        """True while events are flowing; consumers should fall back to HA queries otherwise."""
+        return self._started and self.ws.connected
+
+    def add_listener(self, listener: StateListener) -> None:
+        self._listeners.append(listener)
+
+    def wait_for_change(self, entity_id: str) -> asyncio.Future:
+        """
+        Returns a future resolved with the new state dict of the entity's next state
+        transition. Register it before triggering the change, and release it with
+        discard_waiter() once done.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(entity_id, []).append(future)
+        return future
+
+    def discard_waiter(self, entity_id: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(entity_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self._waiters[entity_id]
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        self.ws.on_connect(self._on_connect)
+        await self.ws.subscribe({"type": "subscribe_events", "event_type": "state_changed"}, self._on_state_changed)
+        for event_type in REGISTRY_EVENTS:
+            await self.ws.subscribe({"type": "subscribe_events", "event_type": event_type}, self._on_registry_updated)
+        await self.ws.start()
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        await self.ws.close()
+        try:
+            self.rollups.close()
+        except Exception:
+            logger.exception("Error saving energy rollups")
+        self._started = False
+
+    async def _on_connect(self) -> None:
+        # Events are not replayed after a disconnect, so coverage restarts here.
+        self.feed.mark_gap()
+        self.buffers.clear()
+        self.rollups.mark_gap()
+        try:
+            await self.mirror.load(self.api)
+        except Exception:
+            logger.exception("Error loading state mirror")
+        await self.directory.refresh()
+
+    def _on_state_changed(self, event: dict) -> None:
+        data = event.get("data") or {}
+        self.feed.record(data)
+        self._resolve_waiters(data)
+        for listener in self._listeners:
+            try:
+                listener(data)
+            except Exception:
+                logger.exception("Error in state listener")
+
+    def _resolve_waiters(self, data: dict) -> None:
+        entity_id = data.get("entity_id")
+        if entity_id not in self._waiters:
+            return
+        old, new = data.get("old_state") or {}, data.get("new_state")
+        if new is None or old.get("state") == new.get("state"):
+            return
+        for future in self._waiters.pop(entity_id):
+            if not future.done():
+                future.set_result(new)
+
+    def _on_registry_updated(self, event: dict) -> None:
+        # Area, label and device templates do not re-render on registry edits by themselves.
+        self.api.invalidate_live_templates()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._deferred_refresh())
+
+    async def _deferred_refresh(self) -> None:
+        # Registry edits arrive in bursts; one refresh covers the whole burst.
+        await asyncio.sleep(self.registry_refresh_delay)
+        try:
+            await self.directory.refresh()
+        except Exception:
+            logger.exception("Error refreshing entity directory")
+
+
+_DEFAULT_HUB_INSTANCE: Optional['LiveHub'] = None
+
+def get_default_hub() -> LiveHub:
+    """Global access to the live event hub."""
+    global _DEFAULT_HUB_INSTANCE
+    if _DEFAULT_HUB_INSTANCE is None:
+        _DEFAULT_HUB_INSTANCE = LiveHub()
+    return _DEFAULT_HUB_INSTANCE
@@ -0,0 +1,143 @@
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from ha_mcp_bot.api.custom_api import HomeAssistantAPI
+from .records import StateRecord
+
+logger = logging.getLogger(__name__)
+
+
+class StateMirror:
+    """
+    Server-side copy of every entity state with a monotonically increasing change counter.
+
+    Each change (state or attribute update, addition, removal) bumps the counter and
+    stamps the entity with the new version. Entities are kept ordered by version so
+    a delta since any version only walks the entities that changed after it.
+    Removals are remembered as bounded tombstones; a version older than the oldest
+    forgotten tombstone can no longer be answered with a delta. States are kept
+    as compact StateRecord objects.
+    """
+
+    def __init__(self, tombstone_limit: int = 1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.floor = 0
+        self.loaded = False
+        self.tombstone_limit = tombstone_limit
+        self._states: Dict[str, StateRecord] = {}
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._removed: "OrderedDict[str, int]" = OrderedDict()
+        # Entities changed by events while a load() is waiting for its snapshot.
+        self._touched: Optional[Set[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._states
+
+    @property
+    def token(self) -> str:
+        """Opaque token for the current version, only valid for this server process."""
+        return f"{self.epoch}-{self.version}"
+
+    def parse_token(self, token: Optional[str]) -> Optional[int]:
+        """Returns the version encoded in a token, or None if it cannot be used for a delta."""
+        if not token:
+            return None
+        epoch, _, version = token.partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        if version < self.floor or version > self.version:
+            return None
+        return version
+
+    def get(self, entity_id: str) -> Optional[StateRecord]:
+        return self._states.get(entity_id)
+
+    def states(self) -> List[StateRecord]:
+        return list(self._states.values())
+
+    async def load(self, api: HomeAssistantAPI) -> None:
+        """
+        Reconciles the mirror with a full /states snapshot.
+
+        Differences against the current contents are recorded as regular changes,
+        so tokens issued before a reconnect stay valid. Events keep being applied
+        while the snapshot is fetched; entities they touched are left as the events
+        put them, since the snapshot may predate those events.
+        """
+        self._touched = set()
+        try:
+            response = await api.get("states")
+            response.raise_for_status()
+            snapshot = {state["entity_id"]: state for state in response.json() if state.get("entity_id")}
+            touched = self._touched
+        finally:
+            self._touched = None
+
+        for entity_id, data in snapshot.items():
+            if entity_id in touched:
+                continue
+            current = self._states.get(entity_id)
+            state = StateRecord.from_dict(data, current)
+            if current is not None and (current.last_updated or 0) > (state.last_updated or 0):
+                # An event newer than the snapshot already arrived for this entity.
+                continue
+            if current is None or current.differs(state):
+                self._set(entity_id, state)
+
+        for entity_id in [e for e in self._states if e not in snapshot and e not in touched]:
+            self._remove(entity_id)
+
+        self.loaded = True
+        logger.info(f"State mirror loaded with {len(self._states)} entities at version {self.version}")
+
+    def update(self, event_data: dict) -> None:
+        entity_id = event_data.get("entity_id")
+        if not entity_id:
+            return
+        if self._touched is not None:
+            self._touched.add(entity_id)
+        new = event_data.get("new_state")
+        if new is None:
+            self._remove(entity_id)
+            return
+        current = self._states.get(entity_id)
+        state = StateRecord.from_dict(new, current)
+        if current is None or current.differs(state):
+            self._set(entity_id, state)
+        else:
+            self._states[entity_id] = state
+
+    def changes_since(self, version: int) -> Tuple[List[StateRecord], List[str]]:
+        """Returns (changed or added states, removed entity IDs) after the given version."""
+        changed = []
+        for entity_id in reversed(self._versions):
+            if self._versions[entity_id] <= version:
+                break
+            changed.append(self._states[entity_id])
+        removed = [entity_id for entity_id, v in self._removed.items() if v > version]
+        changed.reverse()
+        return changed, removed
+
+    def _set(self, entity_id: str, state: StateRecord) -> None:
+        self.version += 1
+        self._states[entity_id] = state
+        self._versions[entity_id] = self.version
+        self._versions.move_to_end(entity_id)
+        self._removed.pop(entity_id, None)
+
+    def _remove(self, entity_id: str) -> None:
+        if self._states.pop(entity_id, None) is None:
+            return
+        self.version += 1
+        self._versions.pop(entity_id, None)
+        self._removed[entity_id] = self.version
+        self._removed.move_to_end(entity_id)
+        while len(self._removed) > self.tombstone_limit:
+            _, forgotten = self._removed.popitem(last=False)
+            self.floor = max(self.floor, forgotten)
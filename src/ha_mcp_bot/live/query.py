@@ -0,0 +1,108 @@
+import time
+from typing import Callable, Iterable, List, Optional
+from .directory import EntityDirectory
+from .records import StateRecord
+
+
+Predicate = Callable[[StateRecord], bool]
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StateQuery:
+    """
+    Filter over state records, compiled once into a list of predicates.
+
+    Predicates are ordered cheapest first (domain prefix, state set, device
+    class, numeric threshold, last_changed age, then area/label lookups), so most
+    rows are rejected after a string comparison. All given conditions must match.
+
+    Args:
+        states: Accepted state values (e.g., {'on', 'open'}).
+        domain: Entity domain (e.g., 'sensor').
+        device_class: Device class attribute (e.g., 'temperature').
+        area: Area name or ID; requires a directory.
+        label: Label name or ID; requires a directory.
+        attribute: Attribute compared by 'above'/'below' instead of the state.
+        above: Numeric value must be strictly greater than this.
+        below: Numeric value must be strictly lower than this.
+        changed_within: Only entities whose state changed in the last N seconds.
+        unchanged_for: Only entities whose state has not changed for N seconds.
+        directory: Entity directory used to resolve area and label filters.
+    """
+
+    def __init__(
+        self,
+        states: Optional[Iterable[str]] = None,
+        domain: Optional[str] = None,
+        device_class: Optional[str] = None,
+        area: Optional[str] = None,
+        label: Optional[str] = None,
+        attribute: Optional[str] = None,
+        above: Optional[float] = None,
+        below: Optional[float] = None,
+        changed_within: Optional[float] = None,
+        unchanged_for: Optional[float] = None,
+        directory: Optional[EntityDirectory] = None,
+    ):
+        if (area or label) and directory is None:
+            raise ValueError("Area and label filters need an entity directory")
+        self._predicates: List[Predicate] = []
+
+        if domain:
+            domain = domain.lower()
+            self._predicates.append(lambda s: s.domain == domain)
+
+        if states:
+            accepted = frozenset(states)
+            self._predicates.append(lambda s: s.state in accepted)
+
+        if device_class:
+            self._predicates.append(lambda s: s.attributes.get("device_class") == device_class)
+
+        if above is not None or below is not None:
+            if attribute:
+                read = lambda s: _as_float(s.attributes.get(attribute))
+            else:
+                read = lambda s: _as_float(s.state)
+            low = float("-inf") if above is None else above
+            high = float("inf") if below is None else below
+
+            def in_range(s: StateRecord) -> bool:
+                value = read(s)
+                return value is not None and low < value < high
+
+            self._predicates.append(in_range)
+
+        if changed_within is not None or unchanged_for is not None:
+            now = time.time()
+            newest = (now if unchanged_for is None else now - unchanged_for) * 1e6
+            oldest = float("-inf") if changed_within is None else (now - changed_within) * 1e6
+
+            def in_age(s: StateRecord) -> bool:
+                return s.last_changed is not None and oldest <= s.last_changed <= newest
+
+            self._predicates.append(in_age)
+
+        if area:
+            self._predicates.append(lambda s: directory.in_area(s.entity_id, area))
+        if label:
+            self._predicates.append(lambda s: directory.has_label(s.entity_id, label))
+
+    def matches(self, state: StateRecord) -> bool:
+        return all(predicate(state) for predicate in self._predicates)
+
+    def run(self, states: Iterable[StateRecord], limit: Optional[int] = None) -> List[StateRecord]:
+        """Single pass over the states; stops early once 'limit' matches are found."""
+        results = []
+        for state in states:
+            if self.matches(state):
+                results.append(state)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,117 @@
+import ha_mcp_bot.schemas as schemas
+from typing import Any, Dict, Optional, Tuple
+from ha_mcp_bot.helpers.series import from_micros, shared_string as _shared, to_micros
+
+# Attributes whose values come from a small vocabulary and are worth sharing.
+_SHARED_ATTRIBUTES = frozenset({
+    "device_class", "state_class", "unit_of_measurement", "icon", "friendly_name",
+})
+
+
+def _isoformat(value: Optional[int]) -> Optional[str]:
+    return None if value is None else from_micros(value).isoformat()
+
+
+def _compact_attributes(attributes: Optional[dict]) -> dict:
+    compact = {}
+    for key, value in (attributes or {}).items():
+        if key in _SHARED_ATTRIBUTES and isinstance(value, str):
+            value = _shared(value)
+        compact[_shared(key)] = value
+    return compact
+
+
+class StateRecord:
+    """
+    Compact copy of a Home Assistant state object.
+
+    Entity IDs, domains, attribute keys and common attribute values (units,
+    classes, names) are shared between records, timestamps are stored as integer
+    microseconds and the context as a tuple. Pydantic models are only built
+    when a record leaves the server (to_state_core() / to_state()).
+    """
+
+    __slots__ = ("entity_id", "domain", "state", "attributes", "last_changed", "last_updated", "last_reported", "context")
+
+    def __init__(
+        self,
+        entity_id: str,
+        state: str,
+        attributes: dict,
+        last_changed: Optional[int],
+        last_updated: Optional[int],
+        last_reported: Optional[int],
+        context: Optional[Tuple[Optional[str], Optional[str], Optional[str]]] = None,
+    ):
+        self.entity_id = entity_id
+        self.domain = _shared(entity_id.split('.')[0])
+        self.state = state
+        self.attributes = attributes
+        self.last_changed = last_changed
+        self.last_updated = last_updated
+        self.last_reported = last_reported
+        self.context = context
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], previous: Optional["StateRecord"] = None) -> "StateRecord":
+        """
+        Builds a record from a state dict (REST response or event payload).
+        The attributes of 'previous' are reused when they did not change.
+        """
+        attributes = data.get("attributes") or {}
+        if previous is not None and previous.attributes == attributes:
+            attributes = previous.attributes
+        else:
+            attributes = _compact_attributes(attributes)
+
+        last_changed = to_micros(data.get("last_changed"))
+        # The three timestamps are usually identical; keep a single int in that case.
+        last_updated = data.get("last_updated")
+        last_updated = last_changed if last_updated == data.get("last_changed") else to_micros(last_updated)
+        last_reported = data.get("last_reported")
+        last_reported = last_updated if last_reported in (None, data.get("last_updated")) else to_micros(last_reported)
+
+        context = data.get("context")
+        if isinstance(context, dict):
+            context = (context.get("id"), context.get("parent_id"), context.get("user_id"))
+        else:
+            context = None
+
+        state = data.get("state")
+        return cls(
+            entity_id=_shared(data["entity_id"]),
+            state=_shared(state) if isinstance(state, str) and len(state) <= 32 else state,
+            attributes=attributes,
+            last_changed=last_changed,
+            last_updated=last_updated,
+            last_reported=last_reported,
+            context=context,
+        )
+
+    def differs(self, other: "StateRecord") -> bool:
+        return self.state != other.state or self.attributes != other.attributes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record in Home Assistant's state object shape."""
+        data = {
+            "entity_id": self.entity_id,
+            "state": self.state,
+            "attributes": dict(self.attributes),
+            "last_changed": _isoformat(self.last_changed),
+            "last_updated": _isoformat(self.last_updated),
+            "last_reported": _isoformat(self.last_reported),
+        }
+        if self.context is not None:
+            data["context"] = dict(zip(("id", "parent_id", "user_id"), self.context))
+        return data
+
+    def to_state_core(self, area: Optional[schemas.Area] = None) -> schemas.StateCore:
+        return schemas.StateCore.model_construct(
+            entity_id=self.entity_id,
+            state=self.state,
+            last_changed=from_micros(self.last_changed),
+            area=area,
+        )
+
+    def to_state(self) -> schemas.State:
+        return schemas.State.model_validate(self.to_dict())
@@ -0,0 +1,85 @@
+from typing import Any, Generic, Iterator, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class TimeRing(Generic[T]):
+    """
+    Fixed-capacity ring buffer of items kept in non-decreasing timestamp order.
+
+    Appending to a full ring overwrites the oldest item. Timestamps are stored
+    in a parallel list so time-range lookups are a binary search instead of a scan.
+    """
+
+    __slots__ = ("capacity", "_times", "_items", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._times: List[float] = [0.0] * capacity
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[T]:
+        return self._iter_from(0)
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        return self._times[self._start] if self._size else None
+
+    @property
+    def newest_timestamp(self) -> Optional[float]:
+        return self._times[(self._start + self._size - 1) % self.capacity] if self._size else None
+
+    def append(self, timestamp: float, item: T) -> Optional[float]:
+        """
+        Adds an item, clamping its timestamp so ordering is preserved.
+
+        Returns:
+            Optional[float]: Timestamp of the evicted item when the ring was full.
+        """
+        newest = self.newest_timestamp
+        if newest is not None and timestamp < newest:
+            timestamp = newest
+
+        evicted = None
+        if self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._start
+            evicted = self._times[index]
+            self._start = (self._start + 1) % self.capacity
+
+        self._times[index] = timestamp
+        self._items[index] = item
+        return evicted
+
+    def since(self, timestamp: float) -> Iterator[T]:
+        """Yields items with a timestamp at or after the given one, oldest first."""
+        return self._iter_from(self._bisect(timestamp))
+
+    def clear(self) -> None:
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+
+    def _bisect(self, timestamp: float) -> int:
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[(self._start + mid) % self.capacity] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _iter_from(self, offset: int) -> Iterator[T]:
+        for i in range(offset, self._size):
+            yield self._items[(self._start + i) % self.capacity]
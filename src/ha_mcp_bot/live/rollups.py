@@ -0,0 +1,421 @@
+import asyncio
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from .feed import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+ROLLUP_DEVICE_CLASSES = frozenset({"energy", "power"})
+ROLLUP_STATE_CLASSES = frozenset({"measurement", "total", "total_increasing"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hourly (
+    entity_id TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    first REAL, last REAL, min REAL, max REAL, delta REAL, integral REAL, seconds REAL,
+    cum_delta REAL, cum_integral REAL, cum_seconds REAL,
+    PRIMARY KEY (entity_id, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily (
+    entity_id TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    first REAL, last REAL, min REAL, max REAL, delta REAL, integral REAL, seconds REAL,
+    PRIMARY KEY (entity_id, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    entity_id TEXT NOT NULL,
+    since REAL NOT NULL,
+    until REAL NOT NULL,
+    PRIMARY KEY (entity_id, since)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sensors (
+    entity_id TEXT PRIMARY KEY,
+    unit_of_measurement TEXT,
+    device_class TEXT,
+    state_class TEXT
+) WITHOUT ROWID;
+"""
+
+_HOURLY_COLUMNS = "period, first, last, min, max, delta, integral, seconds, cum_delta, cum_integral, cum_seconds"
+
+
+class Rollup:
+    """
+    Aggregates of one sensor over one hour: first/last/min/max value, the sum of
+    value increments ('delta'), the time integral of the value and the seconds it
+    covers. The cum_* fields run across all hours of the sensor, so the delta or
+    mean between any two hours is a difference of two rows.
+    """
+
+    __slots__ = ("period", "first", "last", "min", "max", "delta", "integral", "seconds",
+                 "cum_delta", "cum_integral", "cum_seconds")
+
+    def __init__(self, period: int, cum_delta: float = 0.0, cum_integral: float = 0.0, cum_seconds: float = 0.0):
+        self.period = period
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.delta = 0.0
+        self.integral = 0.0
+        self.seconds = 0.0
+        self.cum_delta = cum_delta
+        self.cum_integral = cum_integral
+        self.cum_seconds = cum_seconds
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Rollup":
+        rollup = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, row):
+            setattr(rollup, name, value)
+        return rollup
+
+    def following(self, period: int) -> "Rollup":
+        """An empty rollup for a later hour, continuing the running totals."""
+        return Rollup(period, self.cum_delta, self.cum_integral, self.cum_seconds)
+
+    def observe(self, value: float) -> None:
+        if self.first is None:
+            self.first = value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def add_delta(self, delta: float) -> None:
+        self.delta += delta
+        self.cum_delta += delta
+
+    def integrate(self, value: float, seconds: float) -> None:
+        self.integral += value * seconds
+        self.seconds += seconds
+        self.cum_integral += value * seconds
+        self.cum_seconds += seconds
+
+    def row(self, entity_id: str) -> tuple:
+        return (entity_id,) + tuple(getattr(self, name) for name in self.__slots__)
+
+
+class _Tracker:
+    __slots__ = ("entity_id", "resets", "value", "timestamp", "since", "rollup")
+
+    def __init__(self, entity_id: str, resets: bool, rollup: Rollup):
+        self.entity_id = entity_id
+        self.resets = resets
+        self.value: Optional[float] = None
+        # None until the value is known to hold continuously (after start or a gap).
+        self.timestamp: Optional[float] = None
+        # First event of the current run of uninterrupted events.
+        self.since: Optional[float] = None
+        self.rollup = rollup
+
+
+class EnergyRollups:
+    """
+    Hourly and daily rollups of energy and power sensors, maintained from state events.
+
+    Every state change of a sensor with an energy/power device class and a state class
+    updates the open hour of that sensor in memory; each value is held until the next
+    one for the time-weighted mean, and hours the value spans are filled in. Closed
+    and open hours are written to a local SQLite database every 'flush_interval'
+    seconds from a worker thread, daily rows are re-aggregated from their hours, and
+    a restarted server resumes from the stored rows.
+
+    Deltas add up value increments, so a 'total_increasing' meter that resets to zero
+    keeps counting. Events are only known to be complete between a (re)connect and
+    the next gap, so each such run is stored as a coverage span. The change across a
+    gap (or a restart) is not booked to any hour, and summary() only answers windows
+    that lie inside one span (the open span reaches up to now while events are
+    flowing); anything else falls back to the recorder.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 60.0, max_fill_hours: int = 7 * 24):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_fill_hours = max_fill_hours
+        self._db: Optional[sqlite3.Connection] = None
+        self._trackers: Dict[str, _Tracker] = {}
+        self._ignored: Set[str] = set()
+        self._closed: List[Tuple[str, Rollup]] = []
+        self._spans: List[Tuple[str, float, float]] = []
+        self._dirty: Set[str] = set()
+        self._flushed_at = time.monotonic()
+        # Batches collected on the event loop, written in order by whoever holds the lock.
+        self._pending: Deque[Tuple[list, list]] = deque()
+        self._lock = threading.RLock()
+        self._writers: Set[asyncio.Task] = set()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Opened on first use, so processes that never see an energy sensor create no file.
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._trackers
+
+    @staticmethod
+    def tracks(attributes: dict) -> bool:
+        return attributes.get("device_class") in ROLLUP_DEVICE_CLASSES and attributes.get("state_class") in ROLLUP_STATE_CLASSES
+
+    def update(self, event_data: dict) -> None:
+        entity_id = event_data.get("entity_id")
+        new = event_data.get("new_state")
+        if not entity_id or entity_id in self._ignored or new is None:
+            return
+        try:
+            value = float(new.get("state"))
+        except (TypeError, ValueError):
+            return
+        if not math.isfinite(value):
+            return
+        timestamp = parse_timestamp(new.get("last_changed"))
+        if timestamp is None:
+            return
+
+        tracker = self._trackers.get(entity_id)
+        if tracker is None:
+            attributes = new.get("attributes") or {}
+            if not self.tracks(attributes):
+                self._ignored.add(entity_id)
+                return
+            tracker = self._track(entity_id, attributes, timestamp)
+        self.record(tracker, timestamp, value)
+
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._collect()
+            self._write_later()
+
+    def record(self, tracker: _Tracker, timestamp: float, value: float) -> None:
+        if tracker.timestamp is not None:
+            if timestamp < tracker.timestamp:
+                return
+            if (int(timestamp) // HOUR * HOUR - tracker.rollup.period) // HOUR > self.max_fill_hours:
+                # Too long without an event to trust that none were missed.
+                self._end_span(tracker)
+        self._advance(tracker, timestamp)
+        rollup = tracker.rollup
+        if tracker.timestamp is not None:
+            delta = value - tracker.value
+            if delta < 0 and tracker.resets:
+                # Meter reset: everything since zero is new consumption.
+                delta = value
+            rollup.add_delta(delta)
+        else:
+            # First event after start or a gap: the change since the last known
+            # value happened at an unknown time, so it is not booked to this hour.
+            tracker.since = timestamp
+        rollup.observe(value)
+        tracker.value = value
+        tracker.timestamp = timestamp
+        self._dirty.add(tracker.entity_id)
+
+    def mark_gap(self) -> None:
+        """Ends the coverage spans; values are no longer held across the missed events."""
+        for tracker in self._trackers.values():
+            self._end_span(tracker)
+
+    def _end_span(self, tracker: _Tracker) -> None:
+        if tracker.since is not None:
+            self._spans.append((tracker.entity_id, tracker.since, tracker.timestamp))
+        tracker.since = None
+        tracker.timestamp = None
+
+    def _track(self, entity_id: str, attributes: dict, timestamp: float) -> _Tracker:
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sensors VALUES (?, ?, ?, ?)",
+                (entity_id, attributes.get("unit_of_measurement"), attributes.get("device_class"), attributes.get("state_class")),
+            )
+            row = self.db.execute(
+                f"SELECT {_HOURLY_COLUMNS} FROM hourly WHERE entity_id = ? ORDER BY period DESC LIMIT 1", (entity_id,)
+            ).fetchone()
+        period = int(timestamp) // HOUR * HOUR
+        if row is None:
+            rollup = Rollup(period)
+        else:
+            stored = Rollup.from_row(row)
+            rollup = stored if stored.period == period else stored.following(period)
+        tracker = _Tracker(entity_id, attributes.get("state_class") == "total_increasing", rollup)
+        self._trackers[entity_id] = tracker
+        return tracker
+
+    def _advance(self, tracker: _Tracker, timestamp: float) -> None:
+        """Moves the open hour up to 'timestamp', integrating the held value and closing finished hours."""
+        rollup = tracker.rollup
+        period = int(timestamp) // HOUR * HOUR
+        held = tracker.timestamp is not None
+
+        while rollup.period < period:
+            if held:
+                boundary = rollup.period + HOUR
+                rollup.integrate(tracker.value, boundary - tracker.timestamp)
+                tracker.timestamp = boundary
+            if rollup.first is not None:
+                self._closed.append((tracker.entity_id, rollup))
+            rollup = rollup.following(rollup.period + HOUR if held else period)
+            if held and timestamp > rollup.period:
+                # The held value opens the hour, unless the new sample lands right on its start.
+                rollup.observe(tracker.value)
+        if held:
+            rollup.integrate(tracker.value, timestamp - tracker.timestamp)
+        tracker.rollup = rollup
+
+    def flush(self) -> None:
+        """Writes closed and open hours and coverage spans, then re-aggregates the days the hours belong to."""
+        self._collect()
+        self._write()
+
+    def _collect(self) -> None:
+        """Snapshots what changed since the last flush into a pending batch."""
+        self._flushed_at = time.monotonic()
+        rows = [rollup.row(entity_id) for entity_id, rollup in self._closed]
+        rows += [self._trackers[entity_id].rollup.row(entity_id) for entity_id in self._dirty
+                 if self._trackers[entity_id].rollup.first is not None]
+        spans = self._spans + [(entity_id, self._trackers[entity_id].since, self._trackers[entity_id].timestamp)
+                               for entity_id in self._dirty if self._trackers[entity_id].since is not None]
+        self._closed.clear()
+        self._spans.clear()
+        self._dirty.clear()
+        if rows or spans:
+            self._pending.append((rows, spans))
+
+    def _write_later(self) -> None:
+        # Called from the state_changed callback: keep SQLite off the event loop.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write()
+            return
+        task = loop.create_task(asyncio.to_thread(self._write))
+        self._writers.add(task)
+        task.add_done_callback(self._on_written)
+
+    def _on_written(self, task: asyncio.Task) -> None:
+        self._writers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Error writing energy rollups", exc_info=task.exception())
+
+    def _write(self) -> None:
+        with self._lock:
+            while self._pending:
+                rows, spans = self._pending.popleft()
+                days = {(row[0], row[1] // DAY * DAY) for row in rows}
+                with self.db:
+                    self.db.executemany(f"INSERT OR REPLACE INTO hourly VALUES ({', '.join('?' * 12)})", rows)
+                    self.db.executemany("INSERT OR REPLACE INTO coverage VALUES (?, ?, ?)", spans)
+                    for entity_id, day in days:
+                        self.db.execute(
+                            "INSERT OR REPLACE INTO daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (entity_id, day) + self._aggregate(entity_id, day, day + DAY),
+                        )
+
+    def _aggregate(self, entity_id: str, start: int, end: int) -> tuple:
+        rows = self.db.execute(
+            "SELECT first, last, min, max, delta, integral, seconds FROM hourly "
+            "WHERE entity_id = ? AND period >= ? AND period < ? ORDER BY period",
+            (entity_id, start, end),
+        ).fetchall()
+        return (
+            rows[0][0], rows[-1][1], min(r[2] for r in rows), max(r[3] for r in rows),
+            sum(r[4] for r in rows), sum(r[5] for r in rows), sum(r[6] for r in rows),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                self.flush()
+            finally:
+                self._db.close()
+                self._db = None
+
+    def unit(self, entity_id: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT unit_of_measurement FROM sensors WHERE entity_id = ?", (entity_id,)).fetchone()
+        return row[0] if row else None
+
+    def summary(self, entity_id: str, start: float, end: float, live: bool = False) -> Optional[dict]:
+        """
+        Aggregates between two times (epoch seconds), widened to whole hours.
+
+        The delta and mean take two indexed row lookups whatever the length of the
+        range; min and max read daily rows for whole days and hourly rows for the rest.
+
+        Args:
+            live: Events are flowing right now, so the open span of the sensor runs
+                up to the current time rather than to its last event.
+
+        Returns:
+            Optional[dict]: start/end (the hour-aligned window, epoch seconds), delta,
+            mean, min, max, first and last; None unless a single coverage span runs
+            from the start of the window into its last hour (otherwise events were
+            missed, or have not arrived yet, for part of it).
+        """
+        with self._lock:
+            if self._dirty or self._closed or self._spans or self._pending:
+                self.flush()
+            return self._summary(entity_id, start, end, live)
+
+    def _summary(self, entity_id: str, start: float, end: float, live: bool) -> Optional[dict]:
+        low = int(start) // HOUR * HOUR
+        high = -(-int(end) // HOUR) * HOUR
+        db = self.db
+        tracker = self._trackers.get(entity_id)
+        if live and tracker is not None and tracker.since is not None and tracker.since <= low:
+            # No gap since the span opened: a quiet sensor still holds its value until now.
+            covered = high - HOUR <= time.time()
+        else:
+            covered = db.execute(
+                "SELECT 1 FROM coverage WHERE entity_id = ? AND since <= ? AND until >= ? LIMIT 1",
+                (entity_id, low, high - HOUR),
+            ).fetchone() is not None
+        if not covered:
+            return None
+
+        first = db.execute(
+            f"SELECT {_HOURLY_COLUMNS} FROM hourly WHERE entity_id = ? AND period >= ? AND period < ? ORDER BY period LIMIT 1",
+            (entity_id, low, high),
+        ).fetchone()
+        last = db.execute(
+            f"SELECT {_HOURLY_COLUMNS} FROM hourly WHERE entity_id = ? AND period < ? ORDER BY period DESC LIMIT 1",
+            (entity_id, high),
+        ).fetchone()
+        if first is None:
+            # No change inside the window: the value held since the last stored hour.
+            value = Rollup.from_row(last).last
+            return dict(start=low, end=high, delta=0.0, mean=value, min=value, max=value, first=value, last=value)
+
+        first, last = Rollup.from_row(first), Rollup.from_row(last)
+        seconds = last.cum_seconds - (first.cum_seconds - first.seconds)
+        integral = last.cum_integral - (first.cum_integral - first.integral)
+        low_day, high_day = -(-low // DAY) * DAY, high // DAY * DAY
+        if low_day < high_day:
+            ranges = [("hourly", low, low_day), ("daily", low_day, high_day), ("hourly", high_day, high)]
+        else:
+            ranges = [("hourly", low, high)]
+        union = " UNION ALL ".join(
+            f"SELECT min, max FROM {table} WHERE entity_id = ? AND period >= ? AND period < ?" for table, _, _ in ranges
+        )
+        params = [value for _, lower, upper in ranges for value in (entity_id, lower, upper)]
+        minimum, maximum = db.execute(f"SELECT MIN(min), MAX(max) FROM ({union})", params).fetchone()
+
+        return dict(
+            start=low,
+            end=high,
+            delta=last.cum_delta - (first.cum_delta - first.delta),
+            mean=integral / seconds if seconds else None,
+            min=minimum,
+            max=maximum,
+            first=first.first,
+            last=last.last,
+        )
@@ -2,8 +2,13 @@ import logging
 import sys
 from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 from ha_mcp_bot.api import get_default_api
 from ha_mcp_bot.config import config
+from ha_mcp_bot.live import get_default_hub
+from ha_mcp_bot.metrics import get_default_metrics
+from ha_mcp_bot.tracing import get_default_tracer
 import ha_mcp_bot.tools as tools
 
 
@@ -18,10 +23,17 @@ async def app_lifespan(server: FastMCP):
     Everything before 'yield' happens on startup.
     Everything after 'yield' happens on shutdown.
     """
+    if config.LIVE_EVENTS:
+        # Idempotent: the event stream is shared by every session of the process.
+        await get_default_hub().start()
     try:
         yield 
     finally:
         logger.info("Shutting down Home Assistant MCP Server...")
+        if config.LIVE_EVENTS:
+            # Persist the open hours; the stream itself stays up for other sessions.
+            get_default_hub().rollups.flush()
+        get_default_tracer().flush()
         api = get_default_api()
         await api.close()
 
@@ -37,6 +49,12 @@ app = FastMCP(
 tools.register_tools(app)
 
 
+@app.custom_route(config.METRICS_PATH, methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus text exposition of the tool and Home Assistant metrics."""
+    return PlainTextResponse(get_default_metrics().render(), media_type="text/plain; version=0.0.4")
+
+
 def main() -> int:
     try:
         logger.info("Starting %s on %s:%s", app.name, config.HOST, config.PORT)
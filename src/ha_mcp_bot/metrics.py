@@ -0,0 +1,219 @@
+import bisect
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import pydantic_core
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets ('+Inf' is implied).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(labels[name] for name in self.label_names), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    Observations counted into fixed buckets per label set, with their sum and count.
+    Buckets are stored non-cumulative and summed up when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.label_names)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0] * (len(self.buckets) + 2)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(tuple(labels[name] for name in self.label_names))
+        return int(sum(state[:-1])) if state else 0
+
+    def sum(self, **labels: str) -> float:
+        state = self._values.get(tuple(labels[name] for name in self.label_names))
+        return state[-1] if state else 0.0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                total += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = _labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {int(total)}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {int(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics for the MCP tools and the Home Assistant calls behind them,
+    rendered in the Prometheus text exposition format.
+
+    Everything runs on the event loop, so updates need no locking. Label values
+    are kept low-cardinality: tool names, normalized endpoints (see endpoint_label)
+    and template names.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self.tool_duration = self.histogram(
+            "ha_mcp_tool_duration_seconds", "MCP tool call latency.", ["tool"])
+        self.tool_errors = self.counter(
+            "ha_mcp_tool_errors_total", "MCP tool calls that raised or returned an error message.", ["tool"])
+        self.tool_response_bytes = self.histogram(
+            "ha_mcp_tool_response_bytes", "Size of MCP tool results as JSON.", ["tool"], SIZE_BUCKETS)
+        self.upstream_duration = self.histogram(
+            "ha_mcp_upstream_duration_seconds", "Home Assistant REST request latency.", ["method", "endpoint"])
+        self.upstream_errors = self.counter(
+            "ha_mcp_upstream_errors_total", "Home Assistant REST requests that failed.", ["method", "endpoint"])
+        self.upstream_response_bytes = self.counter(
+            "ha_mcp_upstream_response_bytes_total", "Bytes received from the Home Assistant REST API.", ["method", "endpoint"])
+        self.template_duration = self.histogram(
+            "ha_mcp_template_duration_seconds", "Template render latency, over REST or a live subscription.", ["template", "source"])
+        self.template_errors = self.counter(
+            "ha_mcp_template_errors_total", "Template renders that failed.", ["template"])
+        self.records_parsed = self.counter(
+            "ha_mcp_records_parsed_total", "Records parsed from Home Assistant responses.", ["kind"])
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Collapses a REST path to its route, so ids and timestamps do not become labels:
+    'states/light.kitchen' -> 'states', 'history/period/2024-01-01T00:00:00' -> 'history/period'.
+    """
+    parts = []
+    for part in endpoint.strip("/").split("/"):
+        if not part or "." in part or ":" in part or part[0].isdigit():
+            break
+        parts.append(part)
+    return "/".join(parts) or "/"
+
+
+# Tools report failures as a returned message rather than raising; these open every such message.
+TOOL_ERROR_PREFIXES = (
+    "Error",
+    "Could not find",
+    "Failed to retrieve",
+    "Invalid ",
+    "Unknown method",
+    "Provide ",
+    "resolution_minutes must be",
+    "Live change feed is not available",
+)
+
+
+def is_tool_error(result: Any) -> bool:
+    """True if a tool result is a failure message rather than data."""
+    if not isinstance(result, str):
+        return False
+    return result.startswith(TOOL_ERROR_PREFIXES) or (result.startswith("Entity ") and result.endswith(" not found."))
+
+
+def instrument_tool(name: str, func: Callable[..., Any], registry: Optional[MetricsRegistry] = None) -> Callable[..., Any]:
+    """
+    Wraps an async tool so each call records its latency, errors and result size.
+    The wrapper keeps the tool's signature and docstring, which FastMCP reads.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        metrics = registry or get_default_metrics()
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            metrics.tool_errors.inc(tool=name)
+            raise
+        finally:
+            metrics.tool_duration.observe(time.perf_counter() - started, tool=name)
+        if is_tool_error(result):
+            metrics.tool_errors.inc(tool=name)
+        try:
+            size = len(result.encode()) if isinstance(result, str) else len(pydantic_core.to_json(result, fallback=str))
+        except Exception:
+            logger.debug(f"Could not size the result of {name}", exc_info=True)
+        else:
+            metrics.tool_response_bytes.observe(size, tool=name)
+        return result
+
+    return wrapper
+
+
+_DEFAULT_METRICS_INSTANCE: Optional['MetricsRegistry'] = None
+
+def get_default_metrics() -> MetricsRegistry:
+    """Global access to the metrics registry."""
+    global _DEFAULT_METRICS_INSTANCE
+    if _DEFAULT_METRICS_INSTANCE is None:
+        _DEFAULT_METRICS_INSTANCE = MetricsRegistry()
+    return _DEFAULT_METRICS_INSTANCE
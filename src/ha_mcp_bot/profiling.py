@@ -0,0 +1,162 @@
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from ha_mcp_bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class _Recording:
+    """Stack samples collected for one profiled call."""
+
+    __slots__ = ("thread_id", "stacks", "samples")
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+
+def _collapse(frame) -> str:
+    """A frame's stack in collapsed form, outermost first: 'module.func;module.func'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    Statistical profiler for a sampled fraction of tool calls.
+
+    While a sampled call runs, a background thread reads the stack of the thread
+    running it (the event loop) every 'interval' seconds. Samples therefore also
+    include other tasks interleaved on the loop at the time; under light traffic
+    they are the call's own. Each call is written to 'directory' as collapsed
+    stacks ('<stem>.folded', the input format of flamegraph.pl, speedscope and
+    inferno) plus a '<stem>.json' with the tool name, arguments and duration.
+    Only the newest 'max_files' profiles are kept.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = config.PROFILE_SAMPLE_RATE,
+        directory: str = config.PROFILE_DIR,
+        interval: float = config.PROFILE_INTERVAL_MS / 1000,
+        max_files: int = config.PROFILE_MAX_FILES,
+    ):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.interval = interval
+        self.max_files = max_files
+        self._recordings: List[_Recording] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> _Recording:
+        """Starts sampling the calling thread until stop()."""
+        recording = _Recording(threading.get_ident())
+        with self._lock:
+            self._recordings.append(recording)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+                self._thread.start()
+        return recording
+
+    def stop(self, recording: _Recording) -> None:
+        with self._lock:
+            self._recordings.remove(recording)
+
+    def _sample(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._recordings:
+                    # Exit with the lock held so start() cannot hand work to a finishing thread.
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for recording in self._recordings:
+                    frame = frames.get(recording.thread_id)
+                    if frame is not None:
+                        recording.stacks[_collapse(frame)] += 1
+                        recording.samples += 1
+            del frames
+
+    def write(self, tool: str, arguments: Dict[str, Any], recording: _Recording, duration: float) -> Optional[str]:
+        """Saves a recording and prunes old profiles; returns the '.folded' path."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stem = os.path.join(
+                self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{tool}-{random.getrandbits(24):06x}"
+            )
+            with open(stem + ".folded", "w", encoding="utf-8") as file:
+                file.writelines(f"{tool};{stack} {count}\n" for stack, count in recording.stacks.most_common())
+            with open(stem + ".json", "w", encoding="utf-8") as file:
+                json.dump({
+                    "tool": tool,
+                    "arguments": arguments,
+                    "duration_ms": round(duration * 1000, 3),
+                    "interval_ms": self.interval * 1000,
+                    "samples": recording.samples,
+                }, file, default=str)
+            self._prune()
+            return stem + ".folded"
+        except OSError as e:
+            logger.warning(f"Could not write profile for {tool} to {self.directory}: {e}")
+            return None
+
+    def _prune(self) -> None:
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".folded")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in profiles[:max(len(profiles) - self.max_files, 0)]:
+            stem = entry.path[:-len(".folded")]
+            for path in (entry.path, stem + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+_DEFAULT_PROFILER_INSTANCE: Optional['Profiler'] = None
+
+def get_default_profiler() -> Profiler:
+    """Global access to the profiler."""
+    global _DEFAULT_PROFILER_INSTANCE
+    if _DEFAULT_PROFILER_INSTANCE is None:
+        _DEFAULT_PROFILER_INSTANCE = Profiler()
+    return _DEFAULT_PROFILER_INSTANCE
+
+
+def profiled(name: str, profiler: Optional[Profiler] = None) -> Callable:
+    """Decorator that profiles a sampled fraction of calls to an async tool (see Profiler)."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            active = profiler or get_default_profiler()
+            if not active.should_sample():
+                return await func(*args, **kwargs)
+            recording = active.start()
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                active.stop(recording)
+                active.write(name, kwargs, recording, time.perf_counter() - started)
+
+        return wrapper
+    return decorator
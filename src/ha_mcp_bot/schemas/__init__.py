@@ -1,7 +1,11 @@
-from .common import SwitchCommand, Area, Attributes, Context, Label
-from .state import State, StateCore
+from .common import SwitchCommand, Area, Attributes, Context, Label, parse_many
+from .state import State, StateCore, StateSnapshot, BulkCommandResult, StateChange, StateChangeLog
 from .entity import Entity, EntityCore, Device, SearchEntity
-from .history import HistoryState, HistoryNumericState, HistoryCategoricalState, HistorySeries, HistoryCategoricalSeries
+from .history import (
+    HistoryState, HistoryNumericState, HistoryCategoricalState, HistorySeries, HistoryCategoricalSeries,
+    AnomalyWindow, EntityAnomalies, CorrelationMatrix, EnergySummary,
+)
+from .pipeline import PipelineStep, PipelineResult
 
 
 
@@ -10,15 +14,26 @@ __all__ = [
     "Context",
     "State",
     "StateCore",
+    "StateSnapshot",
+    "BulkCommandResult",
+    "StateChange",
+    "StateChangeLog",
     "HistoryState",
     "HistoryNumericState",
     "HistoryCategoricalState",
     "HistorySeries",
     "HistoryCategoricalSeries",
+    "AnomalyWindow",
+    "EntityAnomalies",
+    "CorrelationMatrix",
+    "EnergySummary",
     "Entity",
     "SearchEntity",
     "EntityCore",
     "Device",
     "Area",
     "Label",
+    "PipelineStep",
+    "PipelineResult",
+    "parse_many",
 ]
\ No newline at end of file
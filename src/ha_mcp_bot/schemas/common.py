@@ -1,7 +1,13 @@
-from pydantic import BaseModel, Field, ConfigDict, model_validator
-from typing import Optional
+import logging
+from functools import lru_cache
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
+from typing import Any, Iterable, List, Optional, Type, TypeVar
 from enum import Enum
 
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 
 class SwitchCommand(str, Enum):
@@ -11,20 +17,40 @@ class SwitchCommand(str, Enum):
 
 
 class BaseSchema(BaseModel):
-    """Shared configuration to handle Home Assistant's flat data and aliases."""
+    """Shared configuration to handle Home Assistant's aliases."""
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
-    @model_validator(mode="before")
-    @classmethod
-    def map_flat_fields(cls, data: dict):
-        # Automatically bundles area_id/area_name into the nested 'area' object
-        if not isinstance(data, dict):
-            return data
-        area_id = data.get("area_id")
-        area_name = data.get("area_name")
-        if (area_id or area_name) and not data.get("area"):
-            data["area"] = {"id": area_id, "name": area_name}
-        return data
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def parse_many(schema: Type[ModelT], rows: Iterable[Any], key: str = "entity_id") -> List[ModelT]:
+    """
+    Validates raw rows into schema instances with a single pydantic-core call.
+
+    If the batch fails, rows are validated one by one so that only the invalid
+    ones are logged and skipped.
+
+    Args:
+        schema: The model class to build.
+        rows: Raw dicts (e.g., a template or REST response).
+        key: Field used to identify a row in error logs.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    try:
+        return _list_adapter(schema).validate_python(rows)
+    except ValidationError:
+        pass
+
+    items = []
+    for data in rows:
+        try:
+            items.append(schema.model_validate(data))
+        except Exception as e:
+            logger.exception(f"Error parsing {schema.__name__} {data.get(key) if isinstance(data, dict) else data!r}: {e}")
+    return items
 
 
 class Context(BaseSchema):
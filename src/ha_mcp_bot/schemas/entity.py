@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import Field, model_validator
+from pydantic import Field, computed_field
 from typing import List, Optional
 from .common import BaseSchema, Area, Label, Attributes
 import re
@@ -10,19 +10,12 @@ class EntityCore(BaseSchema):
     """Minimal entity reference used for lists or IDs."""
     id: str = Field(alias="entity_id", description="Unique entity ID")
     name: Optional[str] = Field(None, alias="entity_name", description="Entity name")
-    domain: str = Field('unknown', description="Entity domain")
     state: str = Field('unknown', alias="entity_state", description="Entity state")
 
-    @model_validator(mode='before')
-    @classmethod
-    def autofill(cls, data: dict) -> dict:
-        if data and isinstance(data, dict):
-            entity_id = data.get("entity_id") or data.get("id")
-            if entity_id and isinstance(entity_id, str):
-                data['domain'] = entity_id.split('.')[0]
-            else:
-                data['domain'] = "unknown"
-        return data
+    @computed_field(description="Entity domain")
+    @property
+    def domain(self) -> str:
+        return self.id.split('.')[0] if self.id else 'unknown'
 
 
 class Entity(EntityCore):
@@ -1,6 +1,6 @@
 from datetime import datetime
-from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import ClassVar, Optional, List
 from typing import List
 
 
@@ -38,4 +38,48 @@ class HistorySeries(BaseModel):
 
 class HistoryCategoricalSeries(BaseModel):
     entity_id: str
-    states: List[HistoryCategoricalState]
\ No newline at end of file
+    states: List[HistoryCategoricalState]
+
+### Analysis results
+
+
+class AnomalyWindow(BaseModel):
+    start: datetime = Field(description="Start of the anomalous period")
+    end: datetime = Field(description="End of the anomalous period")
+    value: float = Field(description="Value at the most anomalous point of the period")
+    expected: float = Field(description="Baseline (rolling mean or median) at that point")
+    score: float = Field(description="Deviation from the baseline in robust standard deviations (negative for drops)")
+
+
+class EntityAnomalies(BaseModel):
+    entity_id: str
+    unit_of_measurement: Optional[str] = None
+    score: float = Field(description="Largest absolute score among the windows")
+    windows: List[AnomalyWindow]
+
+
+class CorrelationMatrix(BaseModel):
+    """Pairwise comparison of several entities' histories; matrices are indexed like 'entity_ids'."""
+    # The matrices only make sense together; they are paged only if the whole result does not fit.
+    page_field: ClassVar[Optional[str]] = None
+    entity_ids: List[str]
+    bin_seconds: float = Field(description="Width of the common time bins the histories were resampled to")
+    correlation: List[List[Optional[float]]] = Field(description="Pearson correlation at lag 0 (-1 to 1; null if undefined)")
+    lag_seconds: Optional[List[List[Optional[float]]]] = Field(
+        default=None, description="Shift with the strongest correlation; positive if the column entity follows the row entity")
+    lag_correlation: Optional[List[List[Optional[float]]]] = Field(default=None, description="Correlation at that shift")
+    categorical_ids: Optional[List[str]] = Field(default=None, description="On/off style entities, indexing 'co_active_seconds'")
+    co_active_seconds: Optional[List[List[Optional[float]]]] = Field(
+        default=None, description="Seconds both entities were active (diagonal: each entity's active time)")
+
+
+class EnergySummary(BaseModel):
+    """Aggregates of an energy or power sensor over a window, answered from the local hourly rollups."""
+    entity_id: str
+    start: datetime = Field(description="Start of the window, widened to a whole hour")
+    end: datetime = Field(description="End of the window, widened to a whole hour")
+    delta: float = Field(description="Change over the window (consumption for energy meters, resets included)")
+    mean: Optional[float] = Field(default=None, description="Time-weighted mean value (average load for power sensors)")
+    min: Optional[float] = None
+    max: Optional[float] = None
+    unit_of_measurement: Optional[str] = None
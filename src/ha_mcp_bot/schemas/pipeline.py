@@ -0,0 +1,18 @@
+from pydantic import Field
+from typing import Any, Dict, List, Optional
+from .common import BaseSchema
+
+
+class PipelineStep(BaseSchema):
+    """One tool call of a pipeline; string arguments starting with '$' reference earlier results."""
+    id: str = Field(description="Name of the step, used to reference its result (e.g., 'search')")
+    tool: str = Field(description="Tool to call (e.g., 'search_HA_entities')")
+    args: Dict[str, Any] = Field(default_factory=dict, description="Tool arguments; '$step.path' inserts part of another step's result")
+    for_each: Optional[str] = Field(None, description="Reference to a list; the tool is called once per element, available as '$item'")
+    fields: Optional[List[str]] = Field(None, description="Dotted paths to keep from this step's result in the response")
+
+
+class PipelineResult(BaseSchema):
+    """Results of the requested pipeline steps and the reasons any step failed."""
+    results: Dict[str, Any] = Field(default_factory=dict, description="Result by step ID, for the output steps")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error by step ID for failed or skipped steps")
@@ -1,6 +1,6 @@
 from datetime import datetime
-from pydantic import Field, model_validator
-from typing import Optional
+from pydantic import Field, computed_field
+from typing import ClassVar, List, Optional
 from .common import BaseSchema, Attributes, Context, Area
 
 
@@ -14,16 +14,46 @@ class StateCore(BaseSchema):
 
 class State(StateCore):
     """A comprehensive state object including attributes and context."""
-    entity_name: Optional[str] = Field(None, description="Entity name given by friendly name attr")
     attributes: Optional[Attributes] = None
     last_reported: datetime
     last_updated: datetime
     context: Optional[Context] = Field(default=None)
 
-    @model_validator(mode='before')
-    @classmethod
-    def entity_name_fill(cls, data: dict) -> dict:
-        if data and isinstance(data, dict):
-            if data.get('attributes'):
-                data['entity_name'] = data['attributes'].get('friendly_name')
-        return data
\ No newline at end of file
+    @computed_field(description="Entity name given by friendly name attr")
+    @property
+    def entity_name(self) -> Optional[str]:
+        return self.attributes.friendly_name if self.attributes else None
+
+class StateSnapshot(BaseSchema):
+    """All entity states, or only the differences since a previously returned version."""
+    page_field: ClassVar[Optional[str]] = "states"
+    version: Optional[str] = Field(None, description="Token to pass back to receive only later changes")
+    full: bool = Field(True, description="True if 'states' holds every entity rather than a delta")
+    states: List[StateCore] = Field(default_factory=list, description="Entity states (all, or changed/added since the version)")
+    removed: List[str] = Field(default_factory=list, description="Entity IDs removed since the version")
+
+
+class BulkCommandResult(BaseSchema):
+    """Outcome of one command applied to many entities."""
+    page_field: ClassVar[Optional[str]] = "states"
+    command: str = Field(description="Command that was sent (e.g., 'off')")
+    states: List[State] = Field(default_factory=list, description="Confirmed states of the targeted entities")
+    failed: List[str] = Field(default_factory=list, description="Entity IDs whose command or confirmation failed")
+
+
+class StateChange(BaseSchema):
+    """A single state transition observed on the live event stream."""
+    entity_id: str = Field(description="Full entity ID string")
+    name: Optional[str] = Field(None, description="Entity friendly name")
+    old_state: Optional[str] = Field(None, description="State before the change (None if the entity was added)")
+    new_state: Optional[str] = Field(None, description="State after the change (None if the entity was removed)")
+    last_changed: datetime = Field(description="Timestamp of the change")
+    area: Optional[Area] = None
+
+
+class StateChangeLog(BaseSchema):
+    """Changes recorded since a point in time."""
+    page_field: ClassVar[Optional[str]] = "changes"
+    since: datetime = Field(description="Start of the requested window")
+    complete: bool = Field(description="False if the window starts before the server began recording changes")
+    changes: List[StateChange] = Field(default_factory=list)
@@ -0,0 +1,366 @@
+import functools
+import inspect
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from ha_mcp_bot.config import config
+
+logger = logging.getLogger(__name__)
+
+_DROP = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _field_plan(model: type) -> Tuple[Tuple[str, Any], ...]:
+    """(field, default to drop) per model field; _DROP only drops None for fields without an empty default."""
+    plan = []
+    for name, field in model.model_fields.items():
+        default = _DROP
+        if not field.is_required():
+            value = field.get_default(call_default_factory=True)
+            # Only empty defaults are dropped: a missing 'full' or 'state' would read differently.
+            if not value and value is not None:
+                default = value
+        plan.append((name, default))
+    plan.extend((name, _DROP) for name in model.model_computed_fields)
+    return tuple(plan)
+
+
+def compact(value: Any) -> Any:
+    """
+    JSON-ready copy of a tool result without None values and without fields left
+    at an empty default (False, 0, '', []), e.g. the unset Attributes flags.
+    """
+    if isinstance(value, BaseModel):
+        result = {}
+        for name, default in _field_plan(type(value)):
+            item = getattr(value, name)
+            if item is None or (default is not _DROP and item == default and type(item) is type(default)):
+                continue
+            result[name] = compact(item)
+        return result
+    if isinstance(value, dict):
+        return {str(key): compact(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [compact(item) for item in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _projection_tree(fields: List[str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def project(value: Any, tree: Dict[str, Any]) -> Any:
+    """Keeps only the dotted paths in 'tree'; lists are projected item by item."""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def select(value: Any, fields: Optional[List[str]]) -> Any:
+    """project() with a list of dotted paths; no fields keeps everything."""
+    return project(value, _projection_tree(fields or []))
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+# Stands in for the page in a serialized envelope; json.dumps always escapes the NULs.
+_SLOT = "\x00page\x00"
+_SLOT_JSON = _dumps(_SLOT)
+
+
+def _nested_lists(value: Dict[str, Any], path: Tuple[str, ...] = ()) -> List[Tuple[Tuple[str, ...], List[Any]]]:
+    """(path, list) of every list reached through dicts only."""
+    found = []
+    for key, item in value.items():
+        if isinstance(item, list):
+            found.append((path + (key,), item))
+        elif isinstance(item, dict):
+            found.extend(_nested_lists(item, path + (key,)))
+    return found
+
+
+def _pop_path(value: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for part in path[:-1]:
+        value = value[part]
+    return value.pop(path[-1])
+
+
+class Paged:
+    """
+    A tool result to send 'page_size' items at a time. 'items' (in a stable order)
+    replace the 'key' list of 'envelope', or form the result when there is no
+    envelope; 'build', if given, turns an item into its model only when its page is sent.
+    """
+
+    __slots__ = ("envelope", "key", "items", "page_size", "build")
+
+    def __init__(
+        self,
+        items: List[Any],
+        page_size: int,
+        envelope: Optional[BaseModel] = None,
+        key: str = "items",
+        build: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.items = items
+        self.page_size = page_size
+        self.envelope = envelope
+        self.key = key
+        self.build = build
+
+
+class _Pages:
+    """A held result, served a page at a time; 'path' locates the paged list in 'envelope'."""
+
+    __slots__ = ("envelope", "path", "items", "tree", "page_size", "build", "created")
+
+    def __init__(
+        self,
+        envelope: Optional[Dict[str, Any]],
+        path: Tuple[str, ...],
+        items: List[Any],
+        tree: Dict[str, Any],
+        page_size: Optional[int] = None,
+        build: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.envelope = envelope
+        self.path = path
+        self.items = items
+        self.tree = tree
+        self.page_size = page_size
+        self.build = build
+        self.created = time.monotonic()
+
+
+class ResultPages:
+    """
+    Serializes tool results compactly within a byte budget.
+
+    A result whose main list (the result itself, the field its schema names in
+    'page_field', such as StateSnapshot.states, or else its longest list field)
+    does not fit in 'max_bytes' is returned a page at a time: the response carries
+    'total' and a 'next_cursor' for get_more_results(). Items are compacted and
+    serialized only when their page is built. Results whose lists are nested
+    deeper (e.g., PipelineResult), or whose schema sets 'page_field' to None, are
+    paged by their largest list once they do not fit, named in 'paged'. Lists that
+    still crowd out the page, also inside an item too large for a page of its own,
+    are replaced by {'total', 'next_cursor'} for paging separately; an item that
+    still does not fit becomes {'truncated': true, 'bytes'}.
+
+    Cursors point to a fixed offset of a held result, so asking twice for the same
+    cursor returns the same page; result IDs are random tokens, and held results
+    expire after 'ttl' seconds. Tools can also ask for fixed-size pages by
+    returning a Paged result.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = config.RESPONSE_MAX_BYTES,
+        ttl: float = config.RESPONSE_CURSOR_TTL,
+        max_results: int = config.RESPONSE_CURSORS,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_results = max_results
+        self._results: "OrderedDict[str, _Pages]" = OrderedDict()
+
+    def render(self, result: Any, fields: Optional[List[str]] = None) -> str:
+        """The first page of a tool result as compact JSON."""
+        tree = _projection_tree(fields or [])
+        if isinstance(result, Paged):
+            envelope = compact(result.envelope) if result.envelope is not None else None
+            if envelope is not None:
+                envelope.pop(result.key, None)
+            pages = _Pages(envelope, (result.key,), result.items, tree, max(result.page_size, 1), result.build)
+            return self._page(pages, 0)
+        if isinstance(result, (list, tuple)):
+            return self._page(_Pages(None, ("items",), list(result), tree), 0)
+
+        envelope = compact(result)
+        if not isinstance(envelope, dict):
+            return _dumps(envelope)
+        if isinstance(result, BaseModel) and hasattr(type(result), "page_field"):
+            key = type(result).page_field
+        else:
+            lists = [(len(value), key) for key, value in envelope.items() if isinstance(value, list)]
+            key = max(lists)[1] if lists else None
+        if key is not None and isinstance(envelope.get(key), list):
+            raw = getattr(result, key, None) if isinstance(result, BaseModel) else None
+            items = list(raw) if isinstance(raw, (list, tuple)) else envelope[key]
+            del envelope[key]
+            self._stub_lists(envelope, self.max_bytes // 2)
+            return self._page(_Pages(envelope, (key,), items, tree), 0)
+
+        envelope = project(envelope, tree)
+        text = _dumps(envelope)
+        nested = _nested_lists(envelope)
+        if len(text.encode()) <= self.max_bytes or not nested:
+            return text
+        path, _ = max(nested, key=lambda found: len(_dumps(found[1])))
+        items = _pop_path(envelope, path)
+        self._stub_lists(envelope, self.max_bytes // 2)
+        # The projection already applied to the whole result.
+        return self._page(_Pages(envelope, path, items, {}), 0)
+
+    def next(self, cursor: str, page_size: Optional[int] = None) -> str:
+        """The page a 'next_cursor' points to, optionally with a new page size."""
+        self._expire()
+        result_id, _, offset = cursor.partition(".")
+        pages = self._results.get(result_id)
+        if pages is None or not offset.isdigit():
+            return "Error: this cursor has expired or is invalid; call the original tool again."
+        self._results.move_to_end(result_id)
+        if page_size is not None:
+            page_size = max(page_size, 1)
+        return self._page(pages, int(offset), result_id, page_size)
+
+    def _stub_lists(self, envelope: Dict[str, Any], limit: int) -> None:
+        """Holds the largest lists left in an envelope separately until it takes at most 'limit' bytes."""
+        while len(_dumps(envelope).encode()) > limit:
+            nested = _nested_lists(envelope)
+            if not nested:
+                return
+            path, items = max(nested, key=lambda found: len(_dumps(found[1])))
+            parent = envelope
+            for part in path[:-1]:
+                parent = parent[part]
+            result_id = self._hold(_Pages(None, ("items",), items, {}))
+            parent[path[-1]] = {"total": len(items), "next_cursor": f"{result_id}.0"}
+
+    def _shrink(self, item: Any, size: int, limit: int) -> str:
+        """An item too large for a page of its own, serialized within 'limit' bytes."""
+        if isinstance(item, dict):
+            self._stub_lists(item, limit)
+            chunk = _dumps(item)
+            if len(chunk.encode()) <= limit:
+                return chunk
+        return _dumps({"truncated": True, "bytes": size})
+
+    def _page(self, pages: _Pages, offset: int, result_id: Optional[str] = None, page_size: Optional[int] = None) -> str:
+        head = self._frame(pages, {})
+        budget = self.max_bytes - len(head.encode()) + len(_SLOT_JSON) - 96
+        chunks, used, end = [], 0, offset
+        page_size = page_size or pages.page_size
+        limit = offset + page_size if page_size else len(pages.items)
+        for item in pages.items[offset:limit]:
+            if pages.build is not None:
+                item = pages.build(item)
+            item = project(compact(item), pages.tree)
+            chunk = _dumps(item)
+            size = len(chunk.encode()) + 1
+            if chunks and used + size > budget:
+                break
+            if size > budget:
+                chunk = self._shrink(item, size - 1, budget - 1)
+                size = len(chunk.encode()) + 1
+            chunks.append(chunk)
+            used += size
+            end += 1
+
+        body = "[" + ",".join(chunks) + "]"
+        if offset == 0 and end == len(pages.items) and not pages.page_size and len(pages.path) == 1:
+            if pages.envelope is None:
+                return body
+            return head.replace(_SLOT_JSON, body, 1)
+
+        extras: Dict[str, Any] = {"total": len(pages.items), "offset": offset}
+        if len(pages.path) > 1:
+            extras["paged"] = ".".join(pages.path)
+        if end < len(pages.items):
+            if result_id is None:
+                result_id = self._hold(pages)
+            extras["next_cursor"] = f"{result_id}.{end}"
+        return self._frame(pages, extras).replace(_SLOT_JSON, body, 1)
+
+    @staticmethod
+    def _frame(pages: _Pages, extras: Dict[str, Any]) -> str:
+        """The envelope with 'extras' and a placeholder for the page, serialized."""
+        frame = {**(pages.envelope or {}), **extras}
+        node = frame
+        for part in pages.path[:-1]:
+            node[part] = dict(node[part])
+            node = node[part]
+        node[pages.path[-1]] = _SLOT
+        return _dumps(frame)
+
+    def _hold(self, pages: _Pages) -> str:
+        self._expire()
+        result_id = secrets.token_urlsafe(12)
+        self._results[result_id] = pages
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return result_id
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._results:
+            result_id, oldest = next(iter(self._results.items()))
+            if oldest.created >= cutoff:
+                break
+            del self._results[result_id]
+
+
+_DEFAULT_PAGES_INSTANCE: Optional['ResultPages'] = None
+
+def get_default_pages() -> ResultPages:
+    """Global access to the held result pages."""
+    global _DEFAULT_PAGES_INSTANCE
+    if _DEFAULT_PAGES_INSTANCE is None:
+        _DEFAULT_PAGES_INSTANCE = ResultPages()
+    return _DEFAULT_PAGES_INSTANCE
+
+
+FieldsParameter = Annotated[Optional[List[str]], Field(
+    None,
+    description="(Optional) Only return these fields of each result item, as dotted paths "
+                "(e.g., ['entity_id', 'state', 'attributes.friendly_name']).",
+)]
+
+
+def shaped(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wraps an async tool so its result is returned as compact, size-capped JSON
+    (see ResultPages). Tools returning structured data also get an optional
+    'fields' argument for projections. Text results (messages, errors) pass through.
+    """
+    signature = inspect.signature(func)
+    projects = signature.return_annotation is not str and "fields" not in signature.parameters
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        fields = kwargs.pop("fields", None) if projects else None
+        result = await func(*args, **kwargs)
+        if isinstance(result, str):
+            return result
+        return get_default_pages().render(result, fields)
+
+    if projects:
+        parameter = inspect.Parameter("fields", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=FieldsParameter)
+        wrapper.__signature__ = signature.replace(
+            parameters=[*signature.parameters.values(), parameter], return_annotation=str
+        )
+    else:
+        wrapper.__signature__ = signature.replace(return_annotation=str)
+    return wrapper
@@ -0,0 +1,149 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from ha_mcp_bot.api import ActionService, CommandScheduler, HomeAssistantAPI, HAWebSocketClient
+from ha_mcp_bot.live import LiveHub
+from ha_mcp_bot import schemas
+
+
+def ha_state(entity_id, state):
+    return {
+        "entity_id": entity_id,
+        "state": state,
+        "attributes": {},
+        "last_changed": "2026-01-10T10:00:00+00:00",
+        "last_updated": "2026-01-10T10:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def mock_api():
+    return AsyncMock(spec=HomeAssistantAPI)
+
+
+@pytest.fixture
+def hub(mock_api):
+    ws = MagicMock(spec=HAWebSocketClient)
+    ws.connected = True
+    hub = LiveHub(ws=ws, api=mock_api)
+    hub._started = True
+    return hub
+
+
+@pytest.mark.asyncio
+async def test_trigger_service_confirms_from_service_response(mock_api, hub):
+    mock_api.post.return_value = httpx.Response(200, json=[ha_state("light.desk", "on")])
+    service = ActionService(api=mock_api, hub=hub, confirm_timeout=1)
+
+    state = await service.trigger_service("light.desk", schemas.SwitchCommand.ON)
+
+    assert state.state == "on"
+    mock_api.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_trigger_service_confirms_from_state_event(mock_api, hub):
+    mock_api.post.return_value = httpx.Response(200, json=[])
+    service = ActionService(api=mock_api, hub=hub, confirm_timeout=1)
+
+    async def push_event():
+        await asyncio.sleep(0.01)
+        hub._on_state_changed({"data": {
+            "entity_id": "light.desk",
+            "old_state": ha_state("light.desk", "off"),
+            "new_state": ha_state("light.desk", "on"),
+        }})
+
+    pusher = asyncio.create_task(push_event())
+    state = await service.trigger_service("light.desk", schemas.SwitchCommand.ON)
+    await pusher
+
+    assert state.state == "on"
+    mock_api.get.assert_not_called()
+    assert not hub._waiters
+
+
+@pytest.mark.asyncio
+async def test_trigger_service_reads_back_after_timeout(mock_api, hub):
+    mock_api.post.return_value = httpx.Response(200, json=[])
+    mock_api.get.return_value = httpx.Response(200, json=ha_state("light.desk", "off"))
+    service = ActionService(api=mock_api, hub=hub, confirm_timeout=0.01)
+
+    state = await service.trigger_service("light.desk", schemas.SwitchCommand.ON)
+
+    assert state.state == "off"
+    mock_api.get.assert_awaited_once_with("states/light.desk")
+
+
+@pytest.mark.asyncio
+async def test_trigger_service_confirms_running_climate_without_waiting(mock_api, hub):
+    mock_api.post.return_value = httpx.Response(200, json=[])
+    hub.mirror.loaded = True
+    hub.mirror.update({"entity_id": "climate.office", "new_state": ha_state("climate.office", "heat")})
+    service = ActionService(api=mock_api, hub=hub, confirm_timeout=5)
+
+    state = await asyncio.wait_for(service.trigger_service("climate.office", schemas.SwitchCommand.ON), 1)
+
+    assert state.state == "heat"
+    mock_api.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_trigger_bulk_sends_one_call_per_domain(mock_api, hub):
+    async def post(endpoint, json_data=None):
+        ids = json_data["entity_id"]
+        ids = ids if isinstance(ids, list) else [ids]
+        return httpx.Response(200, json=[ha_state(e, "off") for e in ids])
+
+    mock_api.post.side_effect = post
+    service = ActionService(api=mock_api, hub=hub, confirm_timeout=1)
+
+    states = await service.trigger_bulk(["light.a", "switch.fan", "light.b"], schemas.SwitchCommand.OFF)
+
+    assert set(states) == {"light.a", "light.b", "switch.fan"}
+    endpoints = sorted(call.args[0] for call in mock_api.post.await_args_list)
+    assert endpoints == ["services/light/turn_off", "services/switch/turn_off"]
+    assert not hub._waiters
+
+
+@pytest.mark.asyncio
+async def test_scheduler_collapses_burst_into_final_command(mock_api, hub):
+    mock_api.post.return_value = httpx.Response(200, json=[ha_state("light.desk", "on")])
+    scheduler = CommandScheduler(ActionService(api=mock_api, hub=hub, confirm_timeout=1), window=0.01)
+
+    futures = [
+        scheduler.submit("light.desk", schemas.SwitchCommand.ON),
+        scheduler.submit("light.desk", schemas.SwitchCommand.OFF),
+        scheduler.submit("light.desk", schemas.SwitchCommand.ON),
+    ]
+    states = await asyncio.gather(*futures)
+
+    assert [s.state for s in states] == ["on", "on", "on"]
+    mock_api.post.assert_awaited_once()
+    assert mock_api.post.await_args.args[0] == "services/light/turn_on"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rate_limits_bulk_calls_and_drops_idle_locks(mock_api, hub):
+    mock_api.post.side_effect = lambda endpoint, json_data=None: httpx.Response(
+        200, json=[ha_state(e, "off") for e in json_data["entity_id"]])
+    scheduler = CommandScheduler(ActionService(api=mock_api, hub=hub, confirm_timeout=1), window=0.01, rate_limit=20)
+
+    started = asyncio.get_running_loop().time()
+    results = await asyncio.gather(*(
+        scheduler.run_bulk(["light.a", "light.b"], schemas.SwitchCommand.OFF) for _ in range(3)
+    ))
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert all(set(states) == {"light.a", "light.b"} for states in results)
+    assert mock_api.post.await_count == 3
+    # Three calls to one integration at 20/s are spaced 50 ms apart.
+    assert elapsed >= 0.09
+    assert not scheduler._locks
+
+
+def test_scheduler_toggle_pairs_cancel_out():
+    combine = CommandScheduler._combine
+    assert combine(schemas.SwitchCommand.TOGGLE, schemas.SwitchCommand.TOGGLE) is None
+    assert combine(schemas.SwitchCommand.ON, schemas.SwitchCommand.TOGGLE) == schemas.SwitchCommand.OFF
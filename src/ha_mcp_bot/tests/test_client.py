@@ -1,8 +1,11 @@
+import asyncio
 import pytest
 import json
 import httpx
-from unittest.mock import AsyncMock
-from ha_mcp_bot.api import HomeAssistantAPI, HAClient
+from unittest.mock import AsyncMock, MagicMock
+from ha_mcp_bot.api import HomeAssistantAPI, HAClient, HAWebSocketError
+from ha_mcp_bot.config import config
+from ha_mcp_bot.live import LiveHub
 
 
 @pytest.fixture
@@ -33,4 +36,69 @@ async def test_api_handles_httpx_error(mock_client):
     mock_client.post.side_effect = httpx.RequestError("Connection failed")
     api = HomeAssistantAPI(client=mock_client)
     result = await api.get_HA_template_data(payload={})
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+@pytest.mark.asyncio
+async def test_api_live_template_reuses_subscription(mock_client, monkeypatch):
+    """Live templates are rendered once over the WebSocket and evicted least recently used first."""
+    monkeypatch.setattr(config, "TEMPLATE_SUBSCRIPTIONS", 1)
+    ws = MagicMock(connected=True)
+    handles = iter(range(1, 10))
+
+    async def subscribe(message, callback):
+        callback({"result": json.dumps([message["template"]])})
+        return next(handles)
+
+    ws.subscribe = AsyncMock(side_effect=subscribe)
+    ws.unsubscribe = AsyncMock()
+    api = HomeAssistantAPI(client=mock_client, ws=ws)
+
+    assert await api.get_HA_template_data({"template": "a"}, live=True) == ["a"]
+    assert await api.get_HA_template_data({"template": "a"}, live=True) == ["a"]
+    assert ws.subscribe.await_count == 1
+
+    assert await api.get_HA_template_data({"template": "b"}, live=True) == ["b"]
+    ws.unsubscribe.assert_awaited_once_with(1)
+    mock_client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_registry_update_rerenders_live_templates(mock_client):
+    """Registry-only templates (areas, labels) are subscribed afresh after a registry event."""
+    ws = MagicMock(connected=True)
+    renders = iter([["Kitchen"], ["Kitchen", "Office"]])
+    handles = iter(range(1, 10))
+
+    async def subscribe(message, callback):
+        if message.get("type") == "render_template":
+            callback({"result": json.dumps(next(renders))})
+        return next(handles)
+
+    ws.subscribe = AsyncMock(side_effect=subscribe)
+    ws.unsubscribe = AsyncMock()
+    api = HomeAssistantAPI(client=mock_client, ws=ws)
+    hub = LiveHub(ws=ws, api=api, registry_refresh_delay=60)
+
+    assert await api.get_HA_template_data({"template": "areas"}, live=True) == ["Kitchen"]
+    assert await api.get_HA_template_data({"template": "areas"}, live=True) == ["Kitchen"]
+
+    hub._on_registry_updated({"event_type": "area_registry_updated"})
+    hub._refresh_task.cancel()
+    assert await api.get_HA_template_data({"template": "areas"}, live=True) == ["Kitchen", "Office"]
+    await asyncio.sleep(0)
+    ws.unsubscribe.assert_awaited_once_with(1)
+    assert ws.subscribe.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_live_template_falls_back_to_rest_at_once(mock_client, monkeypatch):
+    monkeypatch.setattr(config, "TEMPLATE_RENDER_TIMEOUT", 5)
+    ws = MagicMock(connected=True)
+    ws.subscribe = AsyncMock(side_effect=HAWebSocketError("Subscription 'render_template' failed: bad template"))
+    mock_client.post.return_value = httpx.Response(200, json=json.dumps(["a"]))
+    api = HomeAssistantAPI(client=mock_client, ws=ws)
+
+    result = await asyncio.wait_for(api.get_HA_template_data({"template": "a"}, live=True), 1)
+
+    assert result == ["a"]
+    assert not api._live_templates
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from ha_mcp_bot.api import AnalyticsExecutor
+from ha_mcp_bot.helpers import accumulate, anomaly_windows, build_anomalies, find_anomalies
+from ha_mcp_bot.helpers.series import CategoricalSeries, NumericSeries, SeriesMeta
+
+
+def test_executor_picks_pool_by_size():
+    executor = AnalyticsExecutor(thread_above=100, process_above=1000, max_workers=1)
+    try:
+        assert executor.pool_for(99) is None
+        assert isinstance(executor.pool_for(100), ThreadPoolExecutor)
+        assert isinstance(executor.pool_for(1000), ProcessPoolExecutor)
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_offload_matches_inline_results():
+    minute = 60_000_000
+    timestamps = np.arange(0, 240 * minute, minute)
+    values = np.full(len(timestamps), 20.0) + np.sin(np.arange(len(timestamps)))
+    values[120:125] += 50
+    series = [NumericSeries(SeriesMeta("sensor.power", unit_of_measurement="W"), timestamps, values)]
+    door = CategoricalSeries(SeriesMeta("binary_sensor.door"), timestamps[:4], ["off", "on", "off", "on"])
+
+    executor = AnalyticsExecutor(thread_above=1, process_above=100, max_workers=1)
+    try:
+        windows = await executor.run(len(timestamps), anomaly_windows, series, 0, 240 * minute, 5 * minute)
+        stats = await executor.run(len(timestamps), accumulate, door)
+        threaded = await executor.run(len(door), accumulate, door)
+    finally:
+        executor.shutdown()
+
+    assert build_anomalies([series[0].meta], windows) == find_anomalies(series, 0, 240 * minute, 5 * minute)
+    assert windows.size == 1
+    assert stats.summary() == threaded.summary() == accumulate(door).summary()
@@ -0,0 +1,275 @@
+import asyncio
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from ha_mcp_bot.api import HomeAssistantAPI
+from ha_mcp_bot.live import ChangeFeed, EnergyRollups, HistoryBuffers, StateMirror, StateQuery, StateRecord, TimeRing
+
+
+def state_event(entity_id, old, new, last_changed, attributes=None, old_changed=None):
+    return {
+        "entity_id": entity_id,
+        "old_state": {"state": old, "last_changed": old_changed} if old is not None else None,
+        "new_state": {"entity_id": entity_id, "state": new, "last_changed": last_changed,
+                      "attributes": attributes or {}} if new is not None else None,
+    }
+
+
+def parse(value):
+    return datetime.fromisoformat(value).timestamp()
+
+
+def test_time_ring_overwrites_oldest_and_bisects():
+    ring = TimeRing(3)
+    for ts in (1.0, 2.0, 3.0):
+        assert ring.append(ts, ts) is None
+
+    assert ring.append(4.0, 4.0) == 1.0
+    assert list(ring) == [2.0, 3.0, 4.0]
+    assert list(ring.since(3.0)) == [3.0, 4.0]
+    assert list(ring.since(10.0)) == []
+
+
+def test_time_ring_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        TimeRing(0)
+
+
+def test_change_feed_skips_attribute_only_updates():
+    feed = ChangeFeed(10)
+    feed.mark_gap()
+
+    assert feed.record(state_event("light.desk", "off", "on", "2026-01-10T10:00:00+00:00")) is not None
+    assert feed.record(state_event("light.desk", "on", "on", "2026-01-10T10:00:05+00:00")) is None
+    assert len(feed) == 1
+
+
+def test_change_feed_coverage_moves_with_eviction():
+    feed = ChangeFeed(2)
+    feed.covered_since = 0.0
+    for minute in range(3):
+        feed.record(state_event("switch.pump", "off", "on", f"2026-01-10T10:0{minute}:00+00:00"))
+
+    records = list(feed.since(0.0))
+    assert [r.timestamp for r in records] == sorted(r.timestamp for r in records)
+    assert not feed.covers(records[0].timestamp - 60)
+    assert feed.covers(records[0].timestamp + 1)
+
+
+def test_history_buffers_serve_window_inside_span():
+    buffers = HistoryBuffers(samples_per_entity=10, max_bytes=1024)
+    watts = {"unit_of_measurement": "W", "state_class": "measurement"}
+    buffers.update(state_event("sensor.power", "100", "150", "2026-01-10T10:01:00+00:00", watts,
+                               old_changed="2026-01-10T10:00:00+00:00"))
+    buffers.update(state_event("sensor.power", "150", "120", "2026-01-10T10:02:00+00:00", watts))
+
+    start = parse("2026-01-10T10:00:30+00:00")
+    window = buffers.window("sensor.power", start, parse("2026-01-10T10:05:00+00:00"))
+
+    assert window.numeric and window.unit_of_measurement == "W"
+    assert window.samples == [(start, 100.0), (parse("2026-01-10T10:01:00+00:00"), 150.0),
+                              (parse("2026-01-10T10:02:00+00:00"), 120.0)]
+    assert buffers.window("sensor.power", parse("2026-01-10T09:00:00+00:00"), start) is None
+
+
+def test_history_buffers_respect_memory_cap():
+    buffers = HistoryBuffers(samples_per_entity=4, max_bytes=80)
+    for name in ("light.a", "light.b", "light.c"):
+        buffers.update(state_event(name, "off", "on", "2026-01-10T10:00:00+00:00"))
+
+    assert buffers.nbytes <= 80
+    assert "light.a" not in buffers and "light.c" in buffers
+
+
+@pytest.mark.asyncio
+async def test_state_mirror_returns_deltas_since_token():
+    api = AsyncMock(spec=HomeAssistantAPI)
+    api.get.return_value = httpx.Response(200, json=[
+        {"entity_id": "light.a", "state": "off", "attributes": {}, "last_updated": "2026-01-10T10:00:00+00:00"},
+        {"entity_id": "light.b", "state": "on", "attributes": {}, "last_updated": "2026-01-10T10:00:00+00:00"},
+    ], request=httpx.Request("GET", "http://ha/api/states"))
+    mirror = StateMirror()
+    await mirror.load(api)
+    token = mirror.token
+
+    mirror.update(state_event("light.a", "off", "on", "2026-01-10T10:01:00+00:00"))
+    mirror.update({"entity_id": "light.b", "old_state": {"state": "on"}, "new_state": None})
+
+    changed, removed = mirror.changes_since(mirror.parse_token(token))
+    assert [s.entity_id for s in changed] == ["light.a"]
+    assert removed == ["light.b"]
+    assert mirror.parse_token("stale-1") is None
+
+
+@pytest.mark.asyncio
+async def test_state_mirror_keeps_events_that_arrive_during_the_first_load():
+    mirror = StateMirror()
+
+    async def get(endpoint):
+        # The snapshot predates both events, which arrive while it is in flight.
+        mirror.update(state_event("light.a", "off", "on", "2026-01-10T10:01:00+00:00"))
+        mirror.update(state_event("light.c", None, "on", "2026-01-10T10:01:00+00:00"))
+        return httpx.Response(200, json=[
+            {"entity_id": "light.a", "state": "off", "attributes": {}, "last_updated": "2026-01-10T10:00:00+00:00"},
+        ], request=httpx.Request("GET", "http://ha/api/states"))
+
+    api = AsyncMock(spec=HomeAssistantAPI)
+    api.get.side_effect = get
+    await mirror.load(api)
+
+    assert mirror.loaded
+    assert mirror.get("light.a").state == "on"
+    assert "light.c" in mirror
+
+
+def test_state_query_combines_numeric_and_class_filters():
+    rows = [StateRecord.from_dict(data) for data in (
+        {"entity_id": "sensor.office_temp", "state": "26.5", "attributes": {"device_class": "temperature"}},
+        {"entity_id": "sensor.kitchen_temp", "state": "21.0", "attributes": {"device_class": "temperature"}},
+        {"entity_id": "sensor.office_power", "state": "300", "attributes": {"device_class": "power"}},
+        {"entity_id": "sensor.broken_temp", "state": "unavailable", "attributes": {"device_class": "temperature"}},
+    )]
+    query = StateQuery(domain="sensor", device_class="temperature", above=25)
+
+    assert [r.entity_id for r in query.run(rows)] == ["sensor.office_temp"]
+
+
+def test_state_record_round_trip_shares_strings():
+    data = {
+        "entity_id": "sensor.office_temp", "state": "21.5",
+        "attributes": {"unit_of_measurement": "°C", "device_class": "temperature", "friendly_name": "Office"},
+        "last_changed": "2026-01-10T10:00:00.123456+00:00", "last_updated": "2026-01-10T10:00:00.123456+00:00",
+        "last_reported": "2026-01-10T10:05:00+00:00", "context": {"id": "01H", "parent_id": None, "user_id": None},
+    }
+    record = StateRecord.from_dict(data)
+    other = StateRecord.from_dict({**data, "entity_id": "sensor.kitchen_temp", "attributes": dict(data["attributes"])})
+
+    assert record.to_dict() == data
+    assert record.last_updated is record.last_changed
+    assert other.attributes["unit_of_measurement"] is record.attributes["unit_of_measurement"]
+    assert record.to_state().entity_name == "Office"
+    assert record.to_state_core().last_changed == datetime.fromisoformat(data["last_changed"])
+
+
+def test_state_mirror_fits_5k_entities_in_a_few_megabytes():
+    import tracemalloc
+    rows = [{
+        "entity_id": f"sensor.room_{i}_temperature", "state": f"{20 + i % 50 / 10}",
+        "attributes": {"state_class": "measurement", "unit_of_measurement": "°C",
+                       "device_class": "temperature", "friendly_name": f"Room {i} Temperature"},
+        "last_changed": "2026-01-10T10:00:00.123456+00:00", "last_updated": "2026-01-10T10:00:00.123456+00:00",
+        "last_reported": "2026-01-10T10:00:00.123456+00:00",
+        "context": {"id": f"01HMZ{i:021d}", "parent_id": None, "user_id": None},
+    } for i in range(5000)]
+
+    tracemalloc.start()
+    records = [StateRecord.from_dict(row) for row in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(records) == 5000
+    assert size < 5 * 1024 * 1024
+
+
+def test_state_query_requires_directory_for_area():
+    with pytest.raises(ValueError):
+        StateQuery(area="office")
+
+
+def test_energy_rollups_survive_restart_and_resets(tmp_path):
+    path = str(tmp_path / "rollups.sqlite3")
+    meter = {"device_class": "energy", "state_class": "total_increasing", "unit_of_measurement": "kWh"}
+    rollups = EnergyRollups(path)
+    for old, new, at in [(None, "10", "00:00"), ("10", "11", "01:15"), ("11", "12.5", "02:45"), ("12.5", "0.5", "03:10")]:
+        rollups.update(state_event("sensor.meter", old, new, f"2026-01-10T{at}:00+00:00", meter))
+    rollups.update(state_event("light.sofa", "off", "on", "2026-01-10T01:00:00+00:00"))
+    rollups.close()
+    assert "light.sofa" not in rollups
+
+    # A new process resumes from the stored rows and coverage.
+    rollups = EnergyRollups(path)
+    rollups.update(state_event("sensor.meter", "0.5", "1.5", "2026-01-10T05:00:00+00:00", meter))
+    rollups.update(state_event("sensor.meter", "1.5", "2", "2026-01-10T05:30:00+00:00", meter))
+    summary = rollups.summary("sensor.meter", parse("2026-01-10T00:00:00+00:00"), parse("2026-01-10T04:00:00+00:00"))
+    # 10 -> 12.5, reset, 0 -> 0.5
+    assert summary["delta"] == 3.0
+    assert (summary["min"], summary["max"]) == (0.5, 12.5)
+    assert rollups.summary("sensor.meter", parse("2026-01-10T01:00:00+00:00"), parse("2026-01-10T03:00:00+00:00"))["delta"] == 2.5
+    # The change while the server was down (0.5 -> 1.5) is not booked to 05:00.
+    assert rollups.summary("sensor.meter", parse("2026-01-10T05:00:00+00:00"), parse("2026-01-10T06:00:00+00:00"))["delta"] == 0.5
+    assert rollups.summary("sensor.meter", parse("2026-01-10T00:00:00+00:00"), parse("2026-01-10T06:00:00+00:00")) is None
+    assert rollups.summary("sensor.meter", parse("2026-01-09T00:00:00+00:00"), parse("2026-01-10T03:00:00+00:00")) is None
+    assert rollups.unit("sensor.meter") == "kWh"
+    rollups.close()
+
+
+def test_energy_rollups_time_weighted_mean_over_days():
+    rollups = EnergyRollups(":memory:")
+    power = {"device_class": "power", "state_class": "measurement", "unit_of_measurement": "W"}
+    rollups.update(state_event("sensor.load", None, "100", "2026-01-10T00:00:00+00:00", power))
+    rollups.update(state_event("sensor.load", "100", "400", "2026-01-11T18:00:00+00:00", power))
+    rollups.update(state_event("sensor.load", "400", "100", "2026-01-12T00:00:00+00:00", power))
+
+    summary = rollups.summary("sensor.load", parse("2026-01-10T00:00:00+00:00"), parse("2026-01-12T00:00:00+00:00"))
+    assert summary["mean"] == (42 * 100 + 6 * 400) / 48
+    assert (summary["min"], summary["max"]) == (100, 400)
+    rollups.mark_gap()
+    rollups.update(state_event("sensor.load", "100", "200", "2026-01-12T05:00:00+00:00", power))
+    rollups.update(state_event("sensor.load", "200", "300", "2026-01-12T05:30:00+00:00", power))
+    summary = rollups.summary("sensor.load", parse("2026-01-12T05:00:00+00:00"), parse("2026-01-12T06:00:00+00:00"))
+    assert summary["mean"] == 200 and summary["max"] == 300
+    # The five hours without events are not answered at all.
+    assert rollups.summary("sensor.load", parse("2026-01-12T00:00:00+00:00"), parse("2026-01-12T06:00:00+00:00")) is None
+
+
+def test_energy_rollups_do_not_answer_for_gaps_or_the_future():
+    rollups = EnergyRollups(":memory:")
+    meter = {"device_class": "energy", "state_class": "total_increasing", "unit_of_measurement": "kWh"}
+    for old, new, hour in [(None, "100", 0), ("100", "101", 1), ("101", "102", 2)]:
+        rollups.update(state_event("sensor.meter", old, new, f"2026-01-10T{hour:02d}:00:00+00:00", meter))
+    rollups.mark_gap()
+    rollups.update(state_event("sensor.meter", "102", "112", "2026-01-10T12:00:00+00:00", meter))
+    rollups.update(state_event("sensor.meter", "112", "113", "2026-01-10T12:30:00+00:00", meter))
+
+    def window(low, high):
+        return rollups.summary("sensor.meter", parse(f"2026-01-10T{low}:00:00+00:00"), parse(f"2026-01-10T{high}:00:00+00:00"))
+
+    assert window("00", "02")["delta"] == 1.0
+    assert window("05", "07") is None
+    assert window("02", "13") is None
+    # The 10 kWh used during the gap is not booked to hour 12.
+    assert window("12", "13")["delta"] == 1.0
+    assert window("14", "15") is None
+
+
+@pytest.mark.asyncio
+async def test_energy_rollups_write_off_the_loop_and_cover_quiet_sensors_while_live(tmp_path):
+    rollups = EnergyRollups(str(tmp_path / "rollups.sqlite3"), flush_interval=0)
+    meter = {"device_class": "energy", "state_class": "total_increasing", "unit_of_measurement": "kWh"}
+    rollups.update(state_event("sensor.meter", None, "100", "2026-01-10T00:00:00+00:00", meter))
+    rollups.update(state_event("sensor.meter", "100", "101", "2026-01-10T00:30:00+00:00", meter))
+    await asyncio.gather(*rollups._writers)
+    assert not rollups._pending
+
+    low, high = parse("2026-01-10T02:00:00+00:00"), parse("2026-01-10T04:00:00+00:00")
+    # Nothing reported after 00:30; that only proves no use while no event was missed.
+    assert rollups.summary("sensor.meter", low, high) is None
+    assert rollups.summary("sensor.meter", low, high, live=True)["delta"] == 0.0
+    assert rollups.summary("sensor.meter", parse("2026-01-10T00:00:00+00:00"), high, live=True)["delta"] == 1.0
+    rollups.mark_gap()
+    assert rollups.summary("sensor.meter", low, high, live=True) is None
+    rollups.close()
+
+
+@pytest.mark.asyncio
+async def test_change_feed_tool_does_not_build_the_hub_when_disabled(monkeypatch):
+    import ha_mcp_bot.live.hub as hub_module
+    from ha_mcp_bot.config import config
+    from ha_mcp_bot.tools.changes import get_changes_since
+
+    monkeypatch.setattr(config, "LIVE_EVENTS", False)
+    monkeypatch.setattr(hub_module, "_DEFAULT_HUB_INSTANCE", None)
+    result = await get_changes_since("2026-01-10T17:30:00Z")
+    assert result.startswith("Live change feed is not available")
+    assert hub_module._DEFAULT_HUB_INSTANCE is None
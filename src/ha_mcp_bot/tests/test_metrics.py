@@ -0,0 +1,86 @@
+import httpx
+import pytest
+from mcp.server.fastmcp import FastMCP
+import ha_mcp_bot.metrics as metrics_module
+from ha_mcp_bot.api import HAClient, HomeAssistantAPI, HomeAssistantTemplates, build_payload
+from ha_mcp_bot.metrics import MetricsRegistry, endpoint_label, instrument_tool
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, "_DEFAULT_METRICS_INSTANCE", registry)
+    return registry
+
+
+def test_render_prometheus_text():
+    """Histogram buckets render cumulative, with sum and count."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("job_seconds", "Job latency.", ["job"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, job='a"b')
+    registry.counter("jobs_total", "Jobs.").inc(3)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE job_seconds histogram" in lines
+    assert 'job_seconds_bucket{job="a\\"b",le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{job="a\\"b",le="1"} 2' in lines
+    assert 'job_seconds_bucket{job="a\\"b",le="+Inf"} 3' in lines
+    assert 'job_seconds_sum{job="a\\"b"} 2.55' in lines
+    assert 'job_seconds_count{job="a\\"b"} 3' in lines
+    assert "jobs_total 3" in lines
+
+
+def test_endpoint_label_drops_ids():
+    assert endpoint_label("states/light.kitchen") == "states"
+    assert endpoint_label("/history/period/2026-01-27T00:00:00+00:00") == "history/period"
+    assert endpoint_label("services/light/turn_on") == "services/light/turn_on"
+    assert endpoint_label("template") == "template"
+
+
+@pytest.mark.asyncio
+async def test_instrumented_tool_keeps_schema_and_records_calls(registry):
+    async def lookup(entity_id: str, limit: int = 5) -> str:
+        """Looks an entity up."""
+        if entity_id == "bad":
+            return "Error: unknown entity"
+        if entity_id == "gone":
+            return "Could not find state for gone."
+        return entity_id * limit
+
+    app = FastMCP(name="test")
+    app.tool(name="lookup")(instrument_tool("lookup", lookup))
+    tool = app._tool_manager.get_tool("lookup")
+    assert tool.description == "Looks an entity up."
+    assert set(tool.parameters["properties"]) == {"entity_id", "limit"}
+
+    await app.call_tool("lookup", {"entity_id": "ab", "limit": 2})
+    await app.call_tool("lookup", {"entity_id": "bad"})
+    await app.call_tool("lookup", {"entity_id": "gone"})
+    assert registry.tool_duration.count(tool="lookup") == 3
+    assert registry.tool_errors.value(tool="lookup") == 2
+    # Text results are sent as-is, so they are sized without JSON quoting.
+    assert registry.tool_response_bytes.sum(tool="lookup") == len("abab") + len("Error: unknown entity") + len("Could not find state for gone.")
+
+
+@pytest.mark.asyncio
+async def test_client_and_templates_record_upstream_metrics(registry):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("template"):
+            return httpx.Response(200, json='[{"area_id": "kitchen"}]')
+        return httpx.Response(404, text="missing")
+
+    client = HAClient("http://ha.local/api", "token")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    api = HomeAssistantAPI(client=client, ws=None)
+
+    assert await api.get_HA_template_data(build_payload(HomeAssistantTemplates.LIST_AREAS)) == [{"area_id": "kitchen"}]
+    with pytest.raises(httpx.HTTPStatusError):
+        await api.get("states/light.kitchen")
+    await client.close()
+
+    assert registry.template_duration.count(template="LIST_AREAS", source="rest") == 1
+    assert registry.records_parsed.value(kind="template") == 1
+    assert registry.upstream_duration.count(method="POST", endpoint="template") == 1
+    assert registry.upstream_response_bytes.value(method="POST", endpoint="template") > 0
+    assert registry.upstream_errors.value(method="GET", endpoint="states") == 1
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import pytest
+import ha_mcp_bot.tools as tools
+from ha_mcp_bot import schemas
+from ha_mcp_bot.tools.pipeline import run_pipeline
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    async def search(description: str):
+        await asyncio.sleep(0.05)
+        return [
+            schemas.SearchEntity(entity=schemas.Entity(entity_id=f"light.{description}_{i}"), score=3 - i)
+            for i in range(2)
+        ]
+
+    async def areas():
+        await asyncio.sleep(0.05)
+        return [schemas.Area(area_id="office", area_name="Office")]
+
+    async def info(entity_id: str, verbose: bool = False):
+        await asyncio.sleep(0.05)
+        if entity_id.endswith("_1"):
+            return f"Error fetching entity {entity_id} info: boom"
+        if entity_id == "light.gone":
+            return "Could not find state for light.gone."
+        return {"entity_id": entity_id, "manufacturer": "Acme", "verbose": verbose}
+
+    for name, func in {"search": search, "areas": areas, "info": info}.items():
+        monkeypatch.setitem(tools.HANDLERS, name, func)
+
+
+def _steps(*steps):
+    return [schemas.PipelineStep(**step) for step in steps]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_feeds_results_forward_and_runs_independent_steps_together(handlers):
+    started = time.perf_counter()
+    result = await run_pipeline(_steps(
+        {"id": "found", "tool": "search", "args": {"description": "lamp"}},
+        {"id": "rooms", "tool": "areas"},
+        {"id": "first", "tool": "info", "args": {"entity_id": "$found.0.entity.id", "verbose": True},
+         "fields": ["manufacturer", "verbose"]},
+        {"id": "ids", "tool": "info", "args": {"entity_id": "$$literal"}},
+    ))
+    elapsed = time.perf_counter() - started
+
+    assert result.errors == {}
+    assert result.results == {
+        "rooms": [{"id": "office", "name": "Office"}],
+        "first": {"manufacturer": "Acme", "verbose": True},
+        "ids": {"entity_id": "$literal", "manufacturer": "Acme", "verbose": False},
+    }
+    # search -> info is two calls deep; the other steps run alongside.
+    assert elapsed < 0.18
+
+
+@pytest.mark.asyncio
+async def test_pipeline_for_each_errors_and_skips(handlers):
+    result = await run_pipeline(_steps(
+        {"id": "found", "tool": "search", "args": {"description": "lamp"}},
+        {"id": "each", "tool": "info", "for_each": "$found.*.entity.id", "args": {"entity_id": "$item"}},
+        {"id": "after", "tool": "info", "args": {"entity_id": "$each.0.entity_id"}},
+        {"id": "best", "tool": "info", "args": {"entity_id": "$found.0.entity.id"}, "fields": ["entity_id"]},
+    ), outputs=["best", "found"])
+
+    assert result.results["best"] == {"entity_id": "light.lamp_0"}
+    assert [match["entity"]["id"] for match in result.results["found"]] == ["light.lamp_0", "light.lamp_1"]
+    assert result.errors["each"].startswith("Error fetching entity light.lamp_1")
+    assert result.errors["after"] == "Skipped: uses failed step(s) each."
+
+
+@pytest.mark.asyncio
+async def test_pipeline_treats_any_tool_failure_message_as_an_error(handlers):
+    result = await run_pipeline(_steps(
+        {"id": "gone", "tool": "info", "args": {"entity_id": "light.gone"}},
+        {"id": "after", "tool": "info", "args": {"entity_id": "$gone.entity_id"}},
+    ))
+    assert result.errors == {
+        "gone": "Could not find state for light.gone.",
+        "after": "Skipped: uses failed step(s) gone.",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_rejects_invalid_plans(handlers):
+    cycle = await run_pipeline(_steps(
+        {"id": "a", "tool": "info", "args": {"entity_id": "$b.entity_id"}},
+        {"id": "b", "tool": "info", "args": {"entity_id": "$a.entity_id"}},
+    ))
+    assert cycle.startswith("Error: Steps reference each other in a cycle")
+    assert "unknown tool" in await run_pipeline(_steps({"id": "a", "tool": "run_HA_pipeline"}))
+    assert "unknown step" in await run_pipeline(_steps({"id": "a", "tool": "info", "args": {"entity_id": "$x"}}))
+
+    result = await run_pipeline(_steps({"id": "a", "tool": "info", "args": {"entity": "light.x"}}))
+    assert result.errors["a"].startswith("Invalid arguments for info")
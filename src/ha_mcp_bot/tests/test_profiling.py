@@ -0,0 +1,55 @@
+import asyncio
+import json
+import os
+import time
+import pytest
+from ha_mcp_bot.profiling import Profiler, profiled
+
+
+def _busy_parse(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+@pytest.mark.asyncio
+async def test_profiled_call_writes_collapsed_stacks(tmp_path):
+    profiler = Profiler(sample_rate=1.0, directory=str(tmp_path), interval=0.001, max_files=10)
+
+    @profiled("get_HA_entity_state_history", profiler)
+    async def tool(entity_id: str):
+        await asyncio.sleep(0)
+        return _busy_parse(0.1)
+
+    await tool(entity_id="sensor.power")
+
+    (folded,) = tmp_path.glob("*.folded")
+    lines = folded.read_text().splitlines()
+    assert lines and all(line.startswith("get_HA_entity_state_history;") for line in lines)
+    hot_stack, hot_count = lines[0].rsplit(" ", 1)
+    assert hot_stack.split(";")[-1].endswith("_busy_parse") and int(hot_count) > 10
+
+    meta = json.loads(folded.with_suffix(".json").read_text())
+    assert meta["tool"] == "get_HA_entity_state_history"
+    assert meta["arguments"] == {"entity_id": "sensor.power"}
+    assert meta["samples"] >= int(hot_count)
+
+
+@pytest.mark.asyncio
+async def test_profiles_are_sampled_and_pruned(tmp_path):
+    profiler = Profiler(sample_rate=0.0, directory=str(tmp_path), interval=0.001, max_files=2)
+
+    @profiled("search_HA_entities", profiler)
+    async def tool():
+        return _busy_parse(0.005)
+
+    await tool()
+    assert not os.listdir(tmp_path)
+
+    profiler.sample_rate = 1.0
+    for _ in range(4):
+        await tool()
+    assert len(list(tmp_path.glob("*.folded"))) == 2
+    assert len(list(tmp_path.glob("*.json"))) == 2
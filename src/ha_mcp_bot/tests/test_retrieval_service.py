@@ -1,5 +1,7 @@
+import httpx
 import pytest
-from unittest.mock import AsyncMock
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
 from ha_mcp_bot.api import HomeAssistantAPI, RetrievalService
 from ha_mcp_bot import schemas
 
@@ -41,4 +43,100 @@ async def test_get_labels_partial_failure(mock_api):
     service = RetrievalService(api=mock_api)
     labels = await service.get_labels()
     assert len(labels) == 1
-    assert labels[0].id == "outlet"
\ No newline at end of file
+    assert labels[0].id == "outlet"
+
+@pytest.mark.asyncio
+async def test_get_area_entities_nested_area(mock_api):
+    """Template areas arrive nested and validate through the Area aliases alone."""
+    fake_ha_response = [
+        {"entity_id": "light.desk", "entity_state": "on", "area": {"area_id": "office", "area_name": "Office"}},
+        {"entity_id": "switch.fan", "entity_state": "off", "area": None},
+    ]
+    mock_api.get_HA_template_data.return_value = fake_ha_response
+    service = RetrievalService(api=mock_api)
+    entities = await service.get_area_entities("office")
+
+    assert [e.area.name if e.area else None for e in entities] == ["Office", None]
+    assert [e.domain for e in entities] == ["light", "switch"]
+
+
+@pytest.mark.asyncio
+async def test_get_history_builds_compact_series(mock_api):
+    """History metadata is kept once per series and non-numeric samples are skipped."""
+    mock_api.get.return_value = httpx.Response(200, json=[[
+        {"state": "215.8", "last_changed": "2026-01-03T21:31:11.936891+00:00",
+         "attributes": {"unit_of_measurement": "W", "device_class": "power", "state_class": "measurement"}},
+        {"state": "unavailable", "last_changed": "2026-01-03T21:31:15+00:00"},
+        {"state": "213.1", "last_changed": "2026-01-03T21:31:20.928893+00:00"},
+    ]], request=httpx.Request("GET", "http://ha/api/history/period"))
+    service = RetrievalService(api=mock_api, hub=MagicMock(ready=False))
+
+    series = await service.get_history_series("sensor.power")
+    assert list(series.values) == [215.8, 213.1]
+    assert series.meta.unit_of_measurement == "W"
+
+    records = await service.get_history("sensor.power", limit=1)
+    assert [r.state for r in records] == [213.1]
+    assert records[0].last_changed == datetime.fromisoformat("2026-01-03T21:31:20.928893+00:00")
+    assert records[0].device_class == "power"
+
+
+@pytest.mark.asyncio
+async def test_accumulate_history_merges_chunks_in_order(mock_api):
+    """Chunks are fetched concurrently, but a run spanning a chunk boundary is counted once."""
+    def history(url, params=None):
+        start = url.rsplit("/", 1)[1]
+        rows = {
+            "2026-01-10T00:00:00Z": [("off", "00:00"), ("on", "05:00")],
+            "2026-01-10T06:00:00Z": [("on", "06:00"), ("off", "07:00")],
+        }[start]
+        return httpx.Response(200, json=[[
+            {"state": s, "last_changed": f"2026-01-10T{t}:00+00:00"} for s, t in rows
+        ]], request=httpx.Request("GET", "http://ha/api/history/period"))
+
+    mock_api.get.side_effect = history
+    service = RetrievalService(api=mock_api, hub=MagicMock(ready=False))
+
+    stats = await service.accumulate_history("light.kitchen", "2026-01-10T00:00:00Z", "2026-01-10T12:00:00Z")
+    summary = stats.summary()
+    assert summary["total_changes"] == 2
+    assert summary["durations"] == {"off": 5 * 3600.0, "on": 2 * 3600.0}
+    assert mock_api.get.await_count == 2
+
+
+def test_parse_window_accepts_fractional_seconds_and_rejects_garbage():
+    start, end = RetrievalService.parse_window("2026-01-10T00:00:00.000Z", "2026-01-10T12:00:00+00:00")
+    assert (end - start).total_seconds() == 12 * 3600
+    assert RetrievalService.parse_window("yesterday", None) is None
+    assert RetrievalService.parse_window("2026-01-10T00:00:00", None) is None
+
+
+@pytest.mark.asyncio
+async def test_trends_report_invalid_timestamps(monkeypatch):
+    from ha_mcp_bot.tools import trends
+
+    accumulate = AsyncMock()
+    monkeypatch.setattr(trends._retrival, "accumulate_history", accumulate)
+    result = await trends.analyze_entity_trends("sensor.power", start_time="2026-01-10 noon")
+    assert result.startswith("Invalid start_time or end_time")
+    accumulate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_history_series_many_batches_requests(mock_api):
+    def history(url, params=None):
+        ids = params["filter_entity_id"].split(",")
+        return httpx.Response(200, json=[
+            [{"entity_id": entity_id, "state": "1.5", "last_changed": "2026-01-10T10:00:00+00:00",
+              "attributes": {"unit_of_measurement": "W"}}]
+            for entity_id in ids if entity_id != "sensor.p3"
+        ], request=httpx.Request("GET", "http://ha/api/history/period"))
+
+    mock_api.get.side_effect = history
+    service = RetrievalService(api=mock_api, hub=MagicMock(ready=False))
+
+    ids = [f"sensor.p{i}" for i in range(5)]
+    series = await service.get_history_series_many(ids, batch_size=2)
+    assert sorted(series) == ["sensor.p0", "sensor.p1", "sensor.p2", "sensor.p4"]
+    assert series["sensor.p4"].values.tolist() == [1.5]
+    assert mock_api.get.await_count == 3
@@ -0,0 +1,144 @@
+import time
+import numpy as np
+from datetime import datetime
+from ha_mcp_bot.helpers import QuantileDigest, accumulate, correlate, get_history_analytics
+from ha_mcp_bot.helpers.anomalies import find_anomalies
+from ha_mcp_bot.helpers.series import (
+    CategoricalSeries, NumericSeries, SeriesMeta, build_series, parse_timestamps, time_grid, to_micros,
+)
+
+
+def test_parse_timestamps_matches_fromisoformat():
+    values = [
+        "2026-01-03T21:31:11.936891+00:00",
+        "2026-01-03T21:31:15+00:00",
+        "2024-02-29T23:59:59.000001-05:30",
+        "1969-12-31 23:59:59+00:00",
+        "2026-01-03T21:31:11.9Z",
+        "not a timestamp",
+    ]
+    assert parse_timestamps(values).tolist() == [to_micros(v) or 0 for v in values]
+
+
+def test_history_analytics_on_series():
+    series = build_series("binary_sensor.door", [
+        {"state": "off", "last_changed": "2026-01-10T10:00:00+00:00", "attributes": {"device_class": "door"}},
+        {"state": "on", "last_changed": "2026-01-10T10:00:30+00:00"},
+        {"state": "off", "last_changed": "2026-01-10T10:01:00+00:00"},
+        {"state": "off", "last_changed": "2026-01-10T10:05:00+00:00"},
+    ])
+    stats = get_history_analytics(series)
+
+    assert stats["durations"] == {"off": 270.0, "on": 30.0}
+    assert stats["last_state_change"] == {"state": "on", "timestamp": datetime.fromisoformat("2026-01-10T10:00:30+00:00")}
+    assert stats["current_state"]["state"] == "off"
+    assert stats["transitions"] == {"off -> on": 1, "on -> off": 1}
+    assert stats["distribution"] == {"off": 2, "on": 1}
+
+
+def test_categorical_series_is_run_length_encoded():
+    timestamps = parse_timestamps([f"2026-01-10T10:0{m}:00+00:00" for m in range(6)])
+    series = CategoricalSeries(SeriesMeta("light.desk"), timestamps, ["off", "off", "on", "on", "on", "off"])
+
+    assert len(series) == 3
+    assert series.states == ["off", "on", "off"]
+    assert series.state_durations() == {"off": 120.0, "on": 180.0}
+    assert series.state_at(int(timestamps[3])) == "on"
+    assert series.state_at(int(timestamps[0]) - 1) is None
+    assert series.tail(2).states == ["on", "off"]
+    assert [r.state for r in series.records()] == ["off", "on", "off"]
+
+
+def _split(entity_id, rows, at):
+    """Splits rows the way chunked fetches see them: the second chunk starts with the carried state."""
+    return build_series(entity_id, rows[:at]), build_series(entity_id, rows[at - 1:])
+
+
+def test_accumulators_merge_like_a_single_pass():
+    rows = [
+        {"state": str(v), "last_changed": f"2026-01-10T10:{i:02d}:00+00:00", "attributes": {"unit_of_measurement": "W"}}
+        for i, v in enumerate([5, 7, 3, 9, 11, 2, 8, 6])
+    ]
+    numeric = build_series("sensor.power", rows)
+    first, second = _split("sensor.power", rows, 4)
+    merged = accumulate(first).merge(accumulate(second, start=int(second.timestamps[0]))).summary()
+    whole = accumulate(numeric).summary()
+    for key in ("avg", "min", "max", "std", "current_state", "last_state_change"):
+        assert merged[key] == whole[key], key
+
+    rows = [
+        {"state": s, "last_changed": f"2026-01-10T10:{i:02d}:00+00:00"}
+        for i, s in enumerate(["off", "on", "on", "off", "on", "off"])
+    ]
+    categorical = build_series("light.kitchen", rows)
+    first, second = _split("light.kitchen", rows, 3)
+    merged = accumulate(first).merge(accumulate(second, start=int(second.timestamps[0]))).summary()
+    assert merged == accumulate(categorical).summary()
+
+
+def test_quantile_digest_merge():
+    values = np.random.default_rng(7).normal(50.0, 10.0, 20_000)
+    left, right = QuantileDigest(), QuantileDigest()
+    left.add(values[:12_000])
+    right.add(values[12_000:])
+    digest = left.merge(right)
+
+    assert digest.count == len(values)
+    assert abs(digest.quantile(0.5) - np.median(values)) < 0.5
+    assert abs(digest.quantile(0.95) - np.quantile(values, 0.95)) < 1.0
+    assert digest.quantile(1.0) == values.max()
+
+
+def test_numeric_resample_is_time_weighted():
+    minute = 60_000_000
+    series = NumericSeries(SeriesMeta("sensor.power"), np.array([0, 5 * minute, 6 * minute]), np.array([100.0, 1100.0, 100.0]))
+    bins = series.resample(time_grid(-10 * minute, 20 * minute, 10 * minute))
+    # The one-minute spike lifts the mean of its bin; the bin before the first sample is empty.
+    assert np.isnan(bins[0])
+    assert bins[1:].tolist() == [200.0, 100.0]
+
+
+def test_anomaly_scan_flags_spikes_only():
+    rng = np.random.default_rng(3)
+    hour = 3_600_000_000
+    start, end = 1_767_225_600_000_000, 1_767_225_600_000_000 + 24 * hour
+    series = []
+    for i in range(500):
+        timestamps = np.sort(rng.integers(start, end, 1500))
+        timestamps[0] = start
+        values = 20 + rng.normal(0, 0.1, len(timestamps))
+        if i % 100 == 7:
+            values[(timestamps > start + 12 * hour) & (timestamps < start + 12 * hour + 600_000_000)] += 10
+        series.append(NumericSeries(SeriesMeta(f"sensor.t{i}", unit_of_measurement="°C"), timestamps, values))
+
+    for method in ("ewma", "mad"):
+        began = time.perf_counter()
+        anomalies = find_anomalies(series, start, end, 300_000_000, method=method, threshold=8)
+        assert time.perf_counter() - began < 1.0
+        assert sorted(a.entity_id for a in anomalies) == [f"sensor.t{i}" for i in (107, 207, 307, 407, 7)]
+        window = anomalies[0].windows[0]
+        assert window.start.hour == 12 and window.score > 8 and abs(window.expected - 20) < 0.5
+
+
+def test_correlate_numeric_lag_and_co_activity():
+    minute = 60_000_000
+    timestamps = np.arange(0, 600 * minute, minute)
+    temperature = np.sin(timestamps / (60 * minute))
+    # Power reacts to the temperature ten minutes later.
+    power = -np.concatenate((np.zeros(10), temperature[:-10]))
+    tv = CategoricalSeries(SeriesMeta("media_player.tv"), np.array([0, 100, 200, 300, 400]) * minute,
+                           ["off", "playing", "off", "playing", "off"])
+    light = CategoricalSeries(SeriesMeta("light.sofa"), np.array([0, 110, 190, 320]) * minute, ["off", "on", "off", "on"])
+    series = [
+        NumericSeries(SeriesMeta("sensor.temperature"), timestamps, temperature),
+        NumericSeries(SeriesMeta("sensor.power"), timestamps, power),
+        tv,
+        light,
+    ]
+
+    result = correlate(series, 0, 600 * minute, 5 * minute, max_lag=6)
+    assert result.correlation[0][1] < -0.9
+    assert result.lag_seconds[0][1] == 600 and result.lag_seconds[1][0] == -600
+    assert result.lag_correlation[0][1] == -1.0
+    assert result.categorical_ids == ["media_player.tv", "light.sofa"]
+    assert result.co_active_seconds == [[12000.0, 9600.0], [9600.0, 21600.0]]
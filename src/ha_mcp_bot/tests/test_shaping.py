@@ -0,0 +1,189 @@
+import json
+from datetime import datetime, timezone
+from typing import List, Union
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from mcp.server.fastmcp import FastMCP
+import ha_mcp_bot.shaping as shaping
+from ha_mcp_bot import schemas
+from ha_mcp_bot.api import HomeAssistantAPI, RetrievalService
+from ha_mcp_bot.live.records import StateRecord
+from ha_mcp_bot.shaping import ResultPages, _dumps, compact, shaped
+
+
+def _state(i: int) -> schemas.StateCore:
+    return schemas.StateCore(
+        entity_id=f"light.lamp_{i:03d}", state="on", last_changed=datetime(2026, 1, 27, tzinfo=timezone.utc)
+    )
+
+
+def test_compact_drops_nulls_and_empty_defaults():
+    entity = schemas.Entity(
+        entity_id="sensor.power", attributes=schemas.Attributes(friendly_name="Power", unit_of_measurement="W")
+    )
+    assert compact(entity) == {
+        "id": "sensor.power",
+        "state": "unknown",
+        "attributes": {"friendly_name": "Power", "unit_of_measurement": "W"},
+        "domain": "sensor",
+    }
+    # A non-empty default ('full') is meaningful and kept.
+    assert compact(schemas.StateSnapshot(version="v1")) == {"version": "v1", "full": True}
+
+
+def test_large_results_continue_through_stable_cursors():
+    pages = ResultPages(max_bytes=1000)
+    snapshot = schemas.StateSnapshot(version="v1", states=[_state(i) for i in range(40)])
+
+    first = json.loads(pages.render(snapshot, fields=["entity_id"]))
+    assert first["version"] == "v1" and first["total"] == 40 and first["offset"] == 0
+    assert first["states"][0] == {"entity_id": "light.lamp_000"}
+
+    seen, cursor = [s["entity_id"] for s in first["states"]], first["next_cursor"]
+    assert pages.next(cursor) == pages.next(cursor)
+    while cursor:
+        page = pages.next(cursor)
+        assert len(page.encode()) <= 1000
+        page = json.loads(page)
+        seen += [s["entity_id"] for s in page["states"]]
+        cursor = page.get("next_cursor")
+    assert seen == [f"light.lamp_{i:03d}" for i in range(40)]
+
+    assert pages.next("missing.3").startswith("Error")
+    # Results that fit are returned whole, in their own shape.
+    assert json.loads(ResultPages().render([_state(1)])) == [compact(_state(1))]
+
+
+def test_nested_lists_are_paged_within_the_budget():
+    pages = ResultPages(max_bytes=2000)
+    states = [compact(_state(i)) for i in range(500)]
+    result = schemas.PipelineResult(
+        results={"all": {"version": "v1", "states": states}, "few": states[:200]},
+        errors={"bad": "Error: boom"},
+    )
+
+    first = pages.render(result)
+    assert len(first.encode()) <= 2000
+    first = json.loads(first)
+    assert first["paged"] == "results.all.states" and first["total"] == 500
+    assert first["results"]["all"]["version"] == "v1" and first["errors"] == {"bad": "Error: boom"}
+    # The second list would crowd out the page, so it is held for paging on its own.
+    assert first["results"]["few"]["total"] == 200
+
+    seen, cursor = first["results"]["all"]["states"], first["next_cursor"]
+    while cursor:
+        page = pages.next(cursor)
+        assert len(page.encode()) <= 2000
+        page = json.loads(page)
+        seen += page["results"]["all"]["states"]
+        cursor = page.get("next_cursor")
+    assert seen == states
+
+    few = json.loads(pages.next(first["results"]["few"]["next_cursor"]))
+    assert few["total"] == 200 and few["items"] == states[:len(few["items"])]
+
+
+def test_oversized_items_and_declared_page_fields_stay_within_the_budget():
+    pages = ResultPages(max_bytes=600)
+    states = [compact(_state(i)) for i in range(40)]
+    text = pages.render([{"id": "small"}, {"id": "lists", "states": states}, {"id": "text", "note": "x" * 2000}])
+    assert len(text.encode()) <= 600
+    first = json.loads(text)
+    assert first["items"] == [{"id": "small"}]
+
+    second = pages.next(first["next_cursor"])
+    assert len(second.encode()) <= 600
+    second = json.loads(second)
+    held = second["items"][0]["states"]
+    assert second["items"][0]["id"] == "lists" and held["total"] == 40
+    assert json.loads(pages.next(held["next_cursor"]))["items"][0] == states[0]
+
+    third = json.loads(pages.next(second["next_cursor"]))
+    assert third["items"] == [{"truncated": True, "bytes": len(_dumps({"id": "text", "note": "x" * 2000}))}]
+    # Cursors carry a random token rather than a short counter or 48-bit number.
+    assert len(first["next_cursor"].partition(".")[0]) >= 16
+
+    # The lists share one length, so the schema rather than the key name decides what is paged.
+    ids = [f"sensor.s{i}" for i in range(10)]
+    matrix = schemas.CorrelationMatrix(
+        entity_ids=ids, bin_seconds=60.0, correlation=[[0.123456789] * 10 for _ in ids], lag_seconds=[[0.0] * 10 for _ in ids],
+    )
+    assert json.loads(ResultPages().render(matrix)) == compact(matrix)
+    first = json.loads(ResultPages(max_bytes=1200).render(matrix))
+    assert len(first["correlation"]) < first["total"] == 10 and first["entity_ids"] == ids
+    assert first["lag_seconds"] == matrix.lag_seconds
+
+
+@pytest.mark.asyncio
+async def test_shaped_tool_projects_fields(monkeypatch):
+    monkeypatch.setattr(shaping, "_DEFAULT_PAGES_INSTANCE", ResultPages(max_bytes=10_000))
+
+    async def list_states(area_name: str) -> Union[List[schemas.StateCore], str]:
+        """Lists states."""
+        if area_name == "nowhere":
+            return "No devices found in nowhere."
+        return [_state(1), _state(2)]
+
+    app = FastMCP(name="test")
+    app.tool(name="list_states", structured_output=False)(shaped(list_states))
+    tool = app._tool_manager.get_tool("list_states")
+    assert set(tool.parameters["properties"]) == {"area_name", "fields"}
+
+    content = await app.call_tool("list_states", {"area_name": "kitchen", "fields": ["entity_id", "state"]})
+    assert json.loads(content[0].text) == [
+        {"entity_id": "light.lamp_001", "state": "on"},
+        {"entity_id": "light.lamp_002", "state": "on"},
+    ]
+    content = await app.call_tool("list_states", {"area_name": "nowhere"})
+    assert content[0].text == "No devices found in nowhere."
+
+
+@pytest.mark.asyncio
+async def test_state_pages_build_one_page_from_the_held_snapshot():
+    """Pages are built from the records held at the first call, in entity ID order."""
+    def record(entity_id, state):
+        return StateRecord.from_dict({
+            "entity_id": entity_id, "state": state, "attributes": {},
+            "last_changed": "2026-01-27T00:00:00+00:00", "last_updated": "2026-01-27T00:00:00+00:00",
+        })
+
+    mirror = MagicMock(loaded=True, token="v7")
+    mirror.states.return_value = [record(f"light.lamp_{i}", "on") for i in (3, 1, 2, 0)]
+    mirror.parse_token.return_value = None
+    hub = MagicMock(ready=True, mirror=mirror)
+    hub.directory.get.return_value = None
+    api = AsyncMock(spec=HomeAssistantAPI)
+    retrieval = RetrievalService(api=api, hub=hub)
+
+    built = []
+
+    def build(state):
+        built.append(state.entity_id)
+        return retrieval.state_core(state)
+
+    snapshot, states = await retrieval.get_state_records()
+    pages = ResultPages()
+    first = json.loads(pages.render(shaping.Paged(states, 3, snapshot, key="states", build=build), ["entity_id"]))
+    assert first["version"] == "v7" and first["full"] and first["total"] == 4
+    assert [s["entity_id"] for s in first["states"]] == ["light.lamp_0", "light.lamp_1", "light.lamp_2"]
+    assert built == ["light.lamp_0", "light.lamp_1", "light.lamp_2"]
+
+    mirror.states.return_value = []
+    # A page size below one is read as one, so the cursor still moves forward.
+    clamped = json.loads(pages.next(first["next_cursor"], page_size=0))
+    assert clamped["states"] == [{"entity_id": "light.lamp_3"}]
+    second = json.loads(pages.next(first["next_cursor"], page_size=-2))
+    assert second["states"] == [{"entity_id": "light.lamp_3"}] and "next_cursor" not in second
+    api.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_paged_tools_reject_non_positive_page_sizes():
+    from ha_mcp_bot.tools import groups, lookup, search
+
+    for result in (
+        await lookup.get_all_entities_state(page_size=0),
+        await groups.get_area_devices("kitchen", page_size=-1, cursor="abc.3"),
+        await search.search_entities("lamp", page_size=0),
+    ):
+        assert result == "Error: page_size must be a positive number."
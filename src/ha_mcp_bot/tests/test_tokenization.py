@@ -0,0 +1,57 @@
+import pytest
+from ha_mcp_bot import schemas
+from ha_mcp_bot.helpers import TokenCache, search_entities_by_keywords
+
+
+@pytest.fixture
+def entity():
+    return schemas.Entity(
+        entity_id="light.desk_lamp",
+        entity_name="Desk Lamp",
+        area={"area_id": "office", "area_name": "Home Office"},
+        labels=[{"label_id": "lights", "label_name": "Lights", "label_description": None}],
+    )
+
+
+def test_tokens_are_cached_per_entity(entity):
+    """Repeated lookups for an unchanged entity reuse the same token tuple."""
+    cache = TokenCache()
+    first = cache.get(entity)
+
+    assert "desk" in first and "office" in first and "lights" in first
+    assert cache.get(entity) is first
+    assert len(cache) == 1
+
+
+def test_tokens_rebuilt_when_area_changes(entity):
+    """Moving the entity to another area invalidates its cached tokens."""
+    cache = TokenCache()
+    first = cache.get(entity)
+
+    moved = entity.model_copy(update={"area": schemas.Area(area_id="kitchen", area_name="Kitchen")})
+    second = cache.get(moved)
+
+    assert second is not first
+    assert "kitchen" in second and "office" not in second
+
+
+def test_token_cache_evicts_least_recently_used(entity):
+    cache = TokenCache(max_entries=2)
+    other = schemas.Entity(entity_id="sensor.desk_temperature", entity_name="Desk Temperature")
+    removed = schemas.Entity(entity_id="switch.old_heater", entity_name="Old Heater")
+
+    cache.get(entity)
+    cache.get(removed)
+    cache.get(entity)
+    cache.get(other)
+
+    assert len(cache) == 2
+    assert "switch.old_heater" not in cache._entries
+
+
+def test_search_scores_exact_matches_higher(entity):
+    other = schemas.Entity(entity_id="sensor.desk_temperature", entity_name="Desk Temperature")
+    results = search_entities_by_keywords([other, entity], "desk lamp")
+
+    assert results[0].entity.id == "light.desk_lamp"
+    assert results[0].score > results[1].score
@@ -0,0 +1,92 @@
+import json
+import httpx
+import pytest
+import ha_mcp_bot.tracing as tracing
+from ha_mcp_bot.api import HAClient, HomeAssistantAPI, RetrievalService
+from ha_mcp_bot.tracing import JsonlExporter, OtlpExporter, Tracer, span, traced
+
+
+class _Collector:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(list(spans))
+
+
+def _use_tracer(monkeypatch, tracer):
+    monkeypatch.setattr(tracing, "_DEFAULT_TRACER_INSTANCE", tracer)
+    return tracer
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_from_tool_to_http(monkeypatch, tmp_path):
+    """A traced tool exports one trace: tool -> service method -> template -> HTTP, plus parsing."""
+    path = tmp_path / "traces.jsonl"
+    tracer = _use_tracer(monkeypatch, Tracer(1.0, JsonlExporter(str(path))))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json='[{"area_id": "kitchen", "area_name": "Kitchen"}]')
+
+    client = HAClient("http://ha.local/api", "token")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    retrieval = RetrievalService(api=HomeAssistantAPI(client=client, ws=None))
+
+    @traced("tool get_HA_areas", record_args=True)
+    async def get_areas(verbose: bool = False):
+        return await retrieval.get_areas()
+
+    areas = await get_areas(verbose=True)
+    await client.close()
+    assert [area.id for area in areas] == ["kitchen"]
+    # Written from a worker thread; nothing touches the file on the event loop.
+    assert tracer.exporter._writer is not None
+    tracer.flush()
+
+    spans = {row["name"]: row for row in map(json.loads, path.read_text().splitlines())}
+    assert set(spans) == {"tool get_HA_areas", "RetrievalService.get_areas", "ha.template", "http POST", "parse"}
+    assert len({row["trace_id"] for row in spans.values()}) == 1
+
+    def parent(name):
+        return next(row["name"] for row in spans.values() if row["span_id"] == spans[name]["parent_id"])
+
+    assert spans["tool get_HA_areas"]["parent_id"] is None
+    assert spans["tool get_HA_areas"]["attributes"] == {"arg.verbose": True}
+    assert parent("RetrievalService.get_areas") == "tool get_HA_areas"
+    assert parent("ha.template") == "RetrievalService.get_areas"
+    assert parent("http POST") == "ha.template"
+    assert parent("parse") == "RetrievalService.get_areas"
+    assert spans["ha.template"]["attributes"] == {"template": "LIST_AREAS", "source": "rest", "records": 1}
+    assert spans["http POST"]["attributes"]["bytes"] > 0
+    assert spans["parse"]["attributes"] == {"schema": "Area", "records": 1}
+
+
+def test_sampling_is_decided_at_the_root(monkeypatch):
+    collector = _Collector()
+    tracer = _use_tracer(monkeypatch, Tracer(0.0, collector))
+    with span("root"):
+        with span("child"):
+            pass
+    assert collector.traces == []
+
+    tracer.sample_rate = 1.0
+    with pytest.raises(ValueError):
+        with span("root"):
+            with span("child", entity_id="x" * 500) as child:
+                raise ValueError("boom")
+    (trace,) = collector.traces
+    assert [s.name for s in trace] == ["child", "root"]
+    assert trace[1].error == "ValueError: boom"
+    assert child.attributes["entity_id"].endswith("...") and len(child.attributes["entity_id"]) < 250
+
+
+def test_otlp_payload_shape():
+    tracer = Tracer(1.0, _Collector())
+    with tracer.span("root", records=3, template="LIST_AREAS"):
+        pass
+    (root,) = tracer.exporter.traces[0]
+    payload = OtlpExporter("http://collector/v1/traces").payload([root])
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == root.trace_id and len(otlp_span["traceId"]) == 32
+    assert {"key": "records", "value": {"intValue": "3"}} in otlp_span["attributes"]
+    assert otlp_span["status"] == {"code": 1}
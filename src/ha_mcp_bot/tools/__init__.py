@@ -1,11 +1,19 @@
 import logging
-from .action import run_entity_command
+from ha_mcp_bot.metrics import instrument_tool
+from ha_mcp_bot.profiling import profiled
+from ha_mcp_bot.shaping import shaped
+from ha_mcp_bot.tracing import traced
+from .action import run_entity_command, run_bulk_entity_command
+from .anomalies import scan_anomalies
+from .changes import get_changes_since
+from .correlation import correlate_entities
 from .groups import (
     get_areas, 
     get_area_devices, 
     get_labels,
     get_label_devices,
     get_states_by_condition,
+    query_states,
     get_device_entities
 )
 from .lookup import (
@@ -13,8 +21,10 @@ from .lookup import (
     get_entity_information,
     get_entity_state,
 )
+from .pages import get_more_results
+from .pipeline import run_pipeline
 from .search import search_entities
-from .trends import analyze_entity_trends, calculate_electrical_delta, get_entity_state_history
+from .trends import analyze_entity_trends, calculate_electrical_delta, get_energy_usage, get_entity_state_history
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +35,7 @@ HANDLERS = {
     'get_HA_devices_per_area': get_area_devices,
     'get_HA_all_entities_state': get_all_entities_state,
     'get_HA_states_by_condition': get_states_by_condition,
+    'query_HA_states': query_states,
     'get_HA_entity_state_history': get_entity_state_history,
     'analyze_HA_entity_trends': analyze_entity_trends,
     'get_HA_entity_info': get_entity_information,
@@ -33,12 +44,21 @@ HANDLERS = {
     'get_HA_entities_per_device': get_device_entities,
     'get_HA_entity_state': get_entity_state,
     'trigger_HA_service': run_entity_command,
+    'trigger_HA_bulk_service': run_bulk_entity_command,
     'search_HA_entities': search_entities,
     'calculate_HA_electrical_delta': calculate_electrical_delta,
+    'get_HA_energy_usage': get_energy_usage,
+    'get_HA_changes_since': get_changes_since,
+    'scan_HA_anomalies': scan_anomalies,
+    'correlate_HA_entities': correlate_entities,
+    'get_HA_more_results': get_more_results,
+    'run_HA_pipeline': run_pipeline,
 }
 
 
 def register_tools(mcp):
     for name, func in HANDLERS.items():
-        mcp.tool(name=name)(func)
+        handler = profiled(name)(traced(f"tool {name}", record_args=True)(func))
+        # Results are already compact JSON text (see shaping.ResultPages).
+        mcp.tool(name=name, structured_output=False)(instrument_tool(name, shaped(handler)))
         logger.info(f"Registered tool: {name}")
\ No newline at end of file
@@ -1,11 +1,16 @@
 import logging
 import ha_mcp_bot.schemas as schemas
-from typing import Union
-from ha_mcp_bot.api import ActionService
+from typing import List, Optional, Union
+from ha_mcp_bot.api import ActionService, CommandScheduler, RetrievalService
 
 logger = logging.getLogger(__name__)
 
 _action = ActionService()
+_scheduler = CommandScheduler(_action)
+_retrieval = RetrievalService()
+
+# Domains resolved from an area or label; anything else must be listed explicitly.
+SWITCHABLE_DOMAINS = {"light", "switch", "fan", "input_boolean", "media_player", "climate", "humidifier", "siren"}
 
 
 async def run_entity_command(entity_id: str, command: str) -> Union[schemas.State, str]:
@@ -24,9 +29,60 @@ async def run_entity_command(entity_id: str, command: str) -> Union[schemas.Stat
         return "Error: Command must be 'on' or 'off'."
         
     try:
-        result = await _action.trigger_service(entity_id, action)
+        result = await _scheduler.run(entity_id, action)
         return result or f"Command '{command}' sent to {entity_id}."
     except Exception as e:
         return f"Error triggering service: {e}"
+
+
+async def run_bulk_entity_command(
+    command: str,
+    entity_ids: Optional[List[str]] = None,
+    area: Optional[str] = None,
+    label: Optional[str] = None,
+    domain: Optional[str] = None,
+) -> Union[schemas.BulkCommandResult, str]:
+    """
+    Performs the same action (on/off) on many devices at once, with one service call
+    per domain instead of one tool call per entity.
+
+    Use this for group commands:
+    - 'Turn off all lights on the ground floor' -> command='off', area='ground_floor', domain='light'
+    - 'Switch on every Christmas decoration' -> command='on', label='Christmas'
+    - 'Turn off the fan and both desk lamps' -> command='off', entity_ids=[...]
+
+    Args:
+        command: Action to perform. Must be strictly 'on' or 'off'.
+        entity_ids: (Optional) Explicit list of entity IDs to control.
+        area: (Optional) Area name or ID; targets its lights, switches, fans and other toggles.
+        label: (Optional) Label name or ID; combined with area, only entities matching both.
+        domain: (Optional) Restrict area/label targets to one domain (e.g., 'light').
+
+    Returns:
+        A BulkCommandResult with the confirmed state of each entity and the IDs that failed.
+    """
+    cmd_map = {"on": schemas.SwitchCommand.ON, "off": schemas.SwitchCommand.OFF}
+    action = cmd_map.get(command.lower())
+    if not action:
+        return "Error: Command must be 'on' or 'off'."
+
+    targets = list(entity_ids or [])
+    if area or label:
+        allowed = {domain.lower()} if domain else SWITCHABLE_DOMAINS
+        resolved = await _retrieval.resolve_entity_ids(area=area, label=label)
+        targets += [e for e in resolved if e.split('.')[0] in allowed]
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        return "No controllable entities matched the given targets."
+
+    try:
+        states = await _scheduler.run_bulk(targets, action)
+        return schemas.BulkCommandResult(
+            command=command.lower(),
+            states=list(states.values()),
+            failed=[e for e in targets if e not in states],
+        )
+    except Exception as e:
+        return f"Error triggering service: {e}"
     
 
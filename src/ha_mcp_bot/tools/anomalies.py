@@ -0,0 +1,89 @@
+import logging
+import ha_mcp_bot.helpers as helpers
+import ha_mcp_bot.schemas as schemas
+from typing import List, Optional, Union
+from ha_mcp_bot.api import RetrievalService, get_default_executor
+
+logger = logging.getLogger(__name__)
+
+_retrieval = RetrievalService()
+_executor = get_default_executor()
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+async def scan_anomalies(
+    area: Optional[str] = None,
+    label: Optional[str] = None,
+    device_class: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    method: str = "ewma",
+    threshold: float = 5.0,
+    resolution_minutes: float = 5,
+    limit: int = 20,
+) -> Union[List[schemas.EntityAnomalies], str]:
+    """
+    Scans every numeric sensor in an area, a label or the whole house for unusual
+    readings in one pass, and returns only the sensors and periods that stand out.
+
+    Use this to 'report on anomalies' instead of analyzing sensors one by one:
+    - 'Did anything unusual happen today?'
+    - 'Any odd power readings in the garage overnight?' -> area='garage', device_class='power'
+    - 'Check the Energy sensors for spikes this week' -> label='Energy', resolution_minutes=30
+
+    Args:
+        area: (Optional) Area name or ID. Scans the whole house if no area or label is given.
+        label: (Optional) Label name or ID.
+        device_class: (Optional) Only sensors of this device class (e.g., 'temperature', 'power').
+        start_time: (Optional) ISO 8601 UTC timestamp (e.g., '2026-01-27T00:00:00Z'). Defaults to 24 hours ago.
+        end_time: (Optional) ISO 8601 UTC timestamp. Defaults to now.
+        method: 'ewma' (deviation from a rolling mean, reacts fast) or 'mad' (deviation
+                from a rolling median, robust to earlier spikes).
+        threshold: Minimum deviation, in standard deviations, to flag a reading (default 5).
+        resolution_minutes: Width of the time bins readings are averaged into.
+        limit: Max number of sensors returned, most anomalous first.
+
+    Returns:
+        A list of EntityAnomalies: for each flagged sensor, the periods with the value,
+        the expected baseline and the deviation score at the peak.
+    """
+    if method not in helpers.ANOMALY_METHODS:
+        return f"Unknown method '{method}'. Use one of: {', '.join(helpers.ANOMALY_METHODS)}."
+    if resolution_minutes <= 0:
+        return "resolution_minutes must be positive."
+    window = _retrieval.parse_window(start_time, end_time)
+    if window is None:
+        return "Invalid start_time or end_time; use ISO 8601 UTC timestamps (e.g., '2026-01-27T00:00:00Z')."
+    start, end = window
+
+    try:
+        states = await _retrieval.query_states(domain="sensor", device_class=device_class, area=area, label=label)
+        entity_ids = [state.entity_id for state in states if _is_number(state.state)]
+        if not entity_ids:
+            return "No numeric sensors match the given area, label or device class."
+
+        history = await _retrieval.get_history_series_many(entity_ids, start_time, end_time)
+        series = [s for s in history.values() if s.numeric]
+        windows = await _executor.run(
+            sum(len(s) for s in series),
+            helpers.anomaly_windows,
+            series,
+            start=int(start.timestamp() * 1_000_000),
+            end=int(end.timestamp() * 1_000_000),
+            step=int(resolution_minutes * 60 * 1_000_000),
+            method=method,
+            threshold=threshold,
+        )
+        anomalies = helpers.build_anomalies([s.meta for s in series], windows)
+    except Exception as e:
+        logger.exception(f"Error scanning for anomalies: {e}")
+        return f"Error scanning for anomalies: {e}"
+
+    return anomalies[:limit] or f"No anomalies found in {len(series)} sensors."
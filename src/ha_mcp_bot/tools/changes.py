@@ -0,0 +1,81 @@
+import logging
+import ha_mcp_bot.schemas as schemas
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, Union
+from ha_mcp_bot.config import config
+from ha_mcp_bot.live import get_default_hub
+
+logger = logging.getLogger(__name__)
+
+
+async def get_changes_since(
+    since: str,
+    area: Optional[str] = None,
+    domain: Optional[str] = None,
+    label: Optional[str] = None,
+    limit: int = 500,
+) -> Union[schemas.StateChangeLog, str]:
+    """
+    Lists every state change in the house since a point in time, served from the
+    server's live event log without querying Home Assistant.
+
+    Use this for 'what happened' questions instead of snapshotting all states and
+    pulling history entity by entity:
+    - 'What happened in the house in the last 10 minutes?'
+    - 'Did anything change in the garage since 8pm?' -> area='garage'
+    - 'Which lights were switched since noon?' -> domain='light'
+
+    Args:
+        since: ISO 8601 UTC timestamp (e.g., '2026-01-10T17:30:00Z').
+        area: (Optional) Area name or ID to filter by.
+        domain: (Optional) Entity domain to filter by (e.g., 'light', 'binary_sensor').
+        label: (Optional) Label name or ID to filter by.
+        limit: Max number of changes to return; the most recent ones are kept.
+
+    Returns:
+        A StateChangeLog with the matching changes in chronological order. 'complete'
+        is False when the window starts before the server began recording; use
+        get_entity_state_history for the missing part.
+    """
+    # The hub is only built when live events are enabled.
+    hub = get_default_hub() if config.LIVE_EVENTS else None
+    if hub is None or not hub.ready:
+        return "Live change feed is not available; use get_entity_state_history instead."
+
+    try:
+        since_dt = datetime.fromisoformat(since)
+    except (TypeError, ValueError):
+        return f"Invalid timestamp '{since}'. Use ISO 8601 format (e.g., '2026-01-10T17:30:00Z')."
+    if since_dt.tzinfo is None:
+        since_dt = since_dt.replace(tzinfo=timezone.utc)
+
+    directory = hub.directory
+    domain_prefix = f"{domain.lower()}." if domain else None
+    records = deque(maxlen=max(limit, 1))
+    for record in hub.feed.since(since_dt.timestamp()):
+        if domain_prefix and not record.entity_id.startswith(domain_prefix):
+            continue
+        if area and not directory.in_area(record.entity_id, area):
+            continue
+        if label and not directory.has_label(record.entity_id, label):
+            continue
+        records.append(record)
+
+    changes = []
+    for record in records:
+        entity = directory.get(record.entity_id)
+        changes.append(schemas.StateChange.model_construct(
+            entity_id=record.entity_id,
+            name=entity.name if entity else None,
+            old_state=record.old_state,
+            new_state=record.new_state,
+            last_changed=datetime.fromtimestamp(record.timestamp, tz=timezone.utc),
+            area=entity.area if entity else None,
+        ))
+
+    return schemas.StateChangeLog(
+        since=since_dt,
+        complete=hub.feed.covers(since_dt.timestamp()),
+        changes=changes,
+    )
@@ -0,0 +1,75 @@
+import logging
+import ha_mcp_bot.helpers as helpers
+import ha_mcp_bot.schemas as schemas
+from typing import List, Optional, Union
+from ha_mcp_bot.api import RetrievalService, get_default_executor
+
+logger = logging.getLogger(__name__)
+
+_retrieval = RetrievalService()
+_executor = get_default_executor()
+
+MAX_ENTITIES = 24
+
+
+async def correlate_entities(
+    entity_ids: List[str],
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    resolution_minutes: float = 5,
+    max_lag_minutes: float = 0,
+) -> Union[schemas.CorrelationMatrix, str]:
+    """
+    Compares the histories of several entities to find out what moves together,
+    without pulling raw histories.
+
+    Use this for relationship questions:
+    - 'Does the heat pump power spike when the outdoor temperature drops?'
+      -> ['sensor.heat_pump_power', 'sensor.outdoor_temperature'], max_lag_minutes=60
+    - 'Which lights are on when the TV is on?' -> ['media_player.tv', 'light.sofa', 'light.kitchen']
+
+    Numeric sensors are compared by Pearson correlation (1 = rise together, -1 = one
+    rises as the other drops, 0 = unrelated). On/off style entities (lights, doors,
+    media players) are compared by how long both were active at the same time.
+
+    Args:
+        entity_ids: The entities to compare (2 to 24).
+        start_time: (Optional) ISO 8601 UTC timestamp (e.g., '2026-01-27T00:00:00Z'). Defaults to 24 hours ago.
+        end_time: (Optional) ISO 8601 UTC timestamp. Defaults to now.
+        resolution_minutes: Width of the common time bins the histories are aligned on.
+        max_lag_minutes: (Optional) Also search for delayed relationships up to this shift
+                         (e.g., power reacting 20 minutes after the temperature drops).
+
+    Returns:
+        A CorrelationMatrix: matrices indexed like its 'entity_ids'.
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    if not 2 <= len(entity_ids) <= MAX_ENTITIES:
+        return f"Provide between 2 and {MAX_ENTITIES} entity IDs to compare."
+    if resolution_minutes <= 0 or max_lag_minutes < 0:
+        return "resolution_minutes must be positive and max_lag_minutes not negative."
+    window = _retrieval.parse_window(start_time, end_time)
+    if window is None:
+        return "Invalid start_time or end_time; use ISO 8601 UTC timestamps (e.g., '2026-01-27T00:00:00Z')."
+    start, end = window
+
+    try:
+        history = await _retrieval.get_history_series_many(entity_ids, start_time, end_time)
+        series = [history[entity_id] for entity_id in entity_ids if entity_id in history]
+        if len(series) < 2:
+            return f"Not enough history to compare; found data for: {', '.join(history) or 'none'}."
+        step = int(resolution_minutes * 60 * 1_000_000)
+        max_lag = int(max_lag_minutes // resolution_minutes)
+        arrays = await _executor.run(
+            sum(len(s) for s in series),
+            helpers.correlation_arrays,
+            series,
+            start=int(start.timestamp() * 1_000_000),
+            end=int(end.timestamp() * 1_000_000),
+            step=step,
+            max_lag=max_lag,
+        )
+        return helpers.build_correlation([s.meta for s in series], step, max_lag, arrays)
+    except Exception as e:
+        logger.exception(f"Error correlating {entity_ids}: {e}")
+        return f"Error correlating entities: {e}"
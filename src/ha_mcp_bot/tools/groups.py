@@ -1,7 +1,8 @@
 import logging
 import ha_mcp_bot.schemas as schemas
-from typing import List, Union
+from typing import List, Optional, Union
 from ha_mcp_bot.api import RetrievalService
+from ha_mcp_bot.shaping import Paged, get_default_pages
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,11 @@ async def get_areas() -> Union[List[schemas.Area], str]:
         return f"Error querying areas: {e}"
 
 
-async def get_area_devices(area_name: str) -> Union[List[schemas.Device], str]:
+async def get_area_devices(
+    area_name: str,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[List[schemas.Device], str]:
     """
     Lists all hardware devices and their current entity states within a specific room/area.
 
@@ -39,12 +44,25 @@ async def get_area_devices(area_name: str) -> Union[List[schemas.Device], str]:
     Args:
         area_name: The exact name or ID of the area (e.g., 'kitchen', 'living_room'). 
                   Always call get_areas first to verify the correct name.
+        page_size: (Optional) Return the devices this many at a time, ordered by name.
+                   The response is then {'items', 'total', 'next_cursor'}.
+        cursor: (Optional) The 'next_cursor' of a previous page; the next page is served
+                from the same result without querying Home Assistant again.
     
     Returns:
         A list of Device objects including their current states and attributes.
     """
+    if page_size is not None and page_size <= 0:
+        return "Error: page_size must be a positive number."
+    if cursor:
+        return get_default_pages().next(cursor, page_size)
     try:
-        return await _retrieval.get_area_devices(area_name) or f"No devices found in {area_name}."
+        devices = await _retrieval.get_area_devices(area_name)
+        if not devices:
+            return f"No devices found in {area_name}."
+        if page_size:
+            return Paged(sorted(devices, key=lambda device: (device.name.lower(), device.id)), page_size)
+        return devices
     except Exception as e:
         return f"Error querying area {area_name} devices: {e}"
     
@@ -96,6 +114,61 @@ async def get_states_by_condition(condition: str) -> Union[List[schemas.StateCor
         return await _retrieval.get_states_by_condition(condition) or f"No entities are currently in the '{condition}' state."
     except Exception as e:
         return f"Error filtering states by condition: {e}"
+
+
+async def query_states(
+    states: Optional[List[str]] = None,
+    domain: Optional[str] = None,
+    device_class: Optional[str] = None,
+    area: Optional[str] = None,
+    label: Optional[str] = None,
+    attribute: Optional[str] = None,
+    above: Optional[float] = None,
+    below: Optional[float] = None,
+    changed_within_minutes: Optional[float] = None,
+    unchanged_for_minutes: Optional[float] = None,
+    limit: int = 200,
+) -> Union[List[schemas.StateCore], str]:
+    """
+    Finds entities whose current state matches several conditions at once, answered
+    locally in one pass. All given conditions must match.
+
+    Use this for filtered cross-house questions:
+    - 'Which temperature sensors are above 25?' -> device_class='temperature', above=25
+    - 'Which doors or windows are open in the garage?' -> states=['on', 'open'], area='garage'
+    - 'Which lights have been on for more than 2 hours?' -> domain='light', states=['on'], unchanged_for_minutes=120
+    - 'What changed state in the last 5 minutes?' -> changed_within_minutes=5
+
+    Args:
+        states: (Optional) Accepted state values (e.g., ['on', 'open']).
+        domain: (Optional) Entity domain (e.g., 'sensor', 'light').
+        device_class: (Optional) Device class attribute (e.g., 'temperature', 'door', 'power').
+        area: (Optional) Area name or ID.
+        label: (Optional) Label name or ID.
+        attribute: (Optional) Attribute compared by above/below instead of the state (e.g., 'brightness').
+        above: (Optional) Numeric value must be strictly greater than this.
+        below: (Optional) Numeric value must be strictly lower than this.
+        changed_within_minutes: (Optional) Only entities whose state changed in the last N minutes.
+        unchanged_for_minutes: (Optional) Only entities whose state has not changed for N minutes.
+        limit: Max number of results.
+    """
+    to_seconds = lambda minutes: minutes * 60 if minutes is not None else None
+    try:
+        return await _retrieval.query_states(
+            states=states,
+            domain=domain,
+            device_class=device_class,
+            area=area,
+            label=label,
+            attribute=attribute,
+            above=above,
+            below=below,
+            changed_within=to_seconds(changed_within_minutes),
+            unchanged_for=to_seconds(unchanged_for_minutes),
+            limit=limit,
+        ) or "No entities match the given conditions."
+    except Exception as e:
+        return f"Error querying states: {e}"
     
 
 async def get_device_entities(device_id: str) -> Union[List[schemas.Entity], str]:
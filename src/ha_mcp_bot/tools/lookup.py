@@ -1,7 +1,8 @@
 import logging
 import ha_mcp_bot.schemas as schemas
-from typing import List, Union
+from typing import Optional, Union
 from ha_mcp_bot.api import RetrievalService
+from ha_mcp_bot.shaping import Paged, get_default_pages
 
 logger = logging.getLogger(__name__)
 
@@ -9,21 +10,44 @@ _retrieval = RetrievalService()
 
 
 
-async def get_all_entities_state() -> Union[List[schemas.State], List[schemas.StateCore], str]:
+async def get_all_entities_state(
+    version: Optional[str] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[schemas.StateSnapshot, str]:
     """
-    Snapshots the current real-time state and attributes of every entity in the house.
+    Snapshots the current real-time state of every entity in the house.
     
     Use this for global status checks like 'Is anything on?' or 'Is the house secure?'
     or when you cannot find a device in a specific area. 
     
     WARNING: In large installations, this returns a high volume of data. Use 
     get_states_by_condition if you only need entities in a specific state (e.g., 'on').
+
+    Args:
+        version: (Optional) The 'version' token from a previous call. When given, only
+                 entities that changed, were added ('states') or were removed ('removed')
+                 since then are returned. Check 'full' to know if a delta was possible.
+        page_size: (Optional) Return the states this many at a time, ordered by entity ID.
+                   The response then includes 'total' and, if more remain, a 'next_cursor'.
+        cursor: (Optional) The 'next_cursor' of a previous page. The next page is served
+                from the same snapshot; other arguments except page_size are ignored.
     """
+    if page_size is not None and page_size <= 0:
+        return "Error: page_size must be a positive number."
+    if cursor:
+        return get_default_pages().next(cursor, page_size)
     try:
-        states = await _retrieval.get_states(cheaper=True) 
-        if not states:
+        if page_size:
+            snapshot, states = await _retrieval.get_state_records(version)
+            if snapshot.full and not states:
+                return "No entities found or unable to communicate with Home Assistant."
+            return Paged(states, page_size, snapshot, key="states", build=_retrieval.state_core)
+
+        snapshot = await _retrieval.get_state_snapshot(version)
+        if snapshot.full and not snapshot.states:
             return "No entities found or unable to communicate with Home Assistant."
-        return states
+        return snapshot
     except Exception as e:
         return f"Error fetching all entities states: {e}"
 
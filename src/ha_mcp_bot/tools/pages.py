@@ -0,0 +1,21 @@
+import logging
+from ha_mcp_bot.shaping import get_default_pages
+
+logger = logging.getLogger(__name__)
+
+
+async def get_more_results(cursor: str) -> str:
+    """
+    Continues a result that was too large for one response.
+
+    When a tool response contains 'next_cursor', pass it here to receive the next
+    page of the same result, in the same format. Keep calling with each new
+    'next_cursor' until a page comes back without one. A list nested inside a result
+    may also be replaced by {'total', 'next_cursor'} when it does not fit alongside
+    the rest; its pages list the items under 'items'. Cursors expire after a while;
+    if that happens, call the original tool again.
+
+    Args:
+        cursor: The 'next_cursor' value from the previous page.
+    """
+    return get_default_pages().next(cursor)
@@ -0,0 +1,201 @@
+import asyncio
+import inspect
+import logging
+import ha_mcp_bot.schemas as schemas
+from typing import Any, Dict, List, Optional, Set, Union
+from ha_mcp_bot.metrics import is_tool_error
+from ha_mcp_bot.shaping import Paged, compact, select
+from ha_mcp_bot.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MAX_STEPS = 12
+MAX_FOR_EACH = 25
+# Tools a pipeline cannot call: itself, and paging that only makes sense between turns.
+EXCLUDED_TOOLS = {"run_HA_pipeline", "get_HA_more_results"}
+
+
+class PipelineError(Exception):
+    """A step that cannot run: bad reference, failed tool, invalid arguments."""
+
+
+def _references(value: Any) -> Set[str]:
+    """Step IDs referenced anywhere in an argument value."""
+    if isinstance(value, str):
+        if value.startswith("$") and not value.startswith("$$"):
+            return {value[1:].split(".", 1)[0]}
+        return set()
+    if isinstance(value, dict):
+        return set().union(*(_references(item) for item in value.values()))
+    if isinstance(value, list):
+        return set().union(*(_references(item) for item in value))
+    return set()
+
+
+def _lookup(value: Any, path: List[str], reference: str) -> Any:
+    for i, part in enumerate(path):
+        if part == "*":
+            if not isinstance(value, list):
+                raise PipelineError(f"'{reference}': '*' needs a list")
+            return [_lookup(item, path[i + 1:], reference) for item in value]
+        try:
+            value = value[int(part)] if isinstance(value, list) else value[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise PipelineError(f"'{reference}' does not match the result (no '{part}')") from None
+    return value
+
+
+def _resolve(value: Any, results: Dict[str, Any], item: Any = None) -> Any:
+    """Copy of an argument value with its references replaced by the data they point to."""
+    if isinstance(value, str):
+        if value.startswith("$$"):
+            return value[1:]
+        if not value.startswith("$"):
+            return value
+        root, *path = value[1:].split(".")
+        return _lookup(item if root == "item" else results[root], path, value)
+    if isinstance(value, dict):
+        return {key: _resolve(entry, results, item) for key, entry in value.items()}
+    if isinstance(value, list):
+        return [_resolve(entry, results, item) for entry in value]
+    return value
+
+
+def _data(result: Any) -> Any:
+    """A tool result as the compact JSON data the agent would see, paging undone."""
+    if isinstance(result, Paged):
+        items = [compact(result.build(item) if result.build else item) for item in result.items]
+        if result.envelope is None:
+            return items
+        return {**compact(result.envelope), result.key: items}
+    return compact(result)
+
+
+def _plan(steps: List[schemas.PipelineStep], handlers: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Checks a plan and returns the dependencies of each step."""
+    if not steps or len(steps) > MAX_STEPS:
+        raise PipelineError(f"Provide between 1 and {MAX_STEPS} steps.")
+    ids = [step.id for step in steps]
+    if len(set(ids)) != len(ids) or "item" in ids:
+        raise PipelineError("Step IDs must be unique and cannot be 'item'.")
+
+    dependencies = {}
+    for step in steps:
+        if step.tool not in handlers or step.tool in EXCLUDED_TOOLS:
+            raise PipelineError(f"Step '{step.id}': unknown tool '{step.tool}'.")
+        needs = (_references(step.args) | _references(step.for_each)) - {"item"}
+        unknown = needs - set(ids)
+        if unknown:
+            raise PipelineError(f"Step '{step.id}' references unknown step(s): {', '.join(sorted(unknown))}.")
+        if "item" in _references(step.args) and not step.for_each:
+            raise PipelineError(f"Step '{step.id}' uses '$item' without 'for_each'.")
+        dependencies[step.id] = needs
+
+    # Kahn's algorithm, only to reject cycles; steps are scheduled by their dependencies.
+    remaining = {step_id: set(needs) for step_id, needs in dependencies.items()}
+    while remaining:
+        ready = [step_id for step_id, needs in remaining.items() if not needs]
+        if not ready:
+            raise PipelineError(f"Steps reference each other in a cycle: {', '.join(sorted(remaining))}.")
+        for step_id in ready:
+            del remaining[step_id]
+        for needs in remaining.values():
+            needs.difference_update(ready)
+    return dependencies
+
+
+async def _call(name: str, handler: Any, args: Dict[str, Any]) -> Any:
+    try:
+        inspect.signature(handler).bind(**args)
+    except TypeError as e:
+        raise PipelineError(f"Invalid arguments for {name}: {e}") from None
+    result = await handler(**args)
+    if is_tool_error(result):
+        raise PipelineError(result)
+    return _data(result)
+
+
+async def run_pipeline(
+    steps: List[schemas.PipelineStep],
+    outputs: Optional[List[str]] = None,
+) -> Union[schemas.PipelineResult, str]:
+    """
+    Runs several tools in one request, feeding results of earlier steps into later
+    ones. Steps that do not depend on each other run at the same time.
+
+    Use this when the next calls follow mechanically from earlier results, to save
+    round trips. For example, to find the desk lamp and analyze its trends:
+    [{"id": "search", "tool": "search_HA_entities", "args": {"description": "desk lamp"}},
+     {"id": "trends", "tool": "analyze_HA_entity_trends", "args": {"entity_id": "$search.0.entity.id"}}]
+
+    References: a string argument '$<step>.<path>' is replaced by that part of the
+    step's result (as the tool would return it). Path parts are field names and list
+    indexes, and '*' takes the rest of the path from every element of a list (e.g.,
+    '$search.*.entity.id'). With 'for_each' set to a reference to a list, the tool is
+    called once per element, available as '$item' (e.g., '$item.entity.id'). Write
+    '$$' for a literal leading '$'.
+
+    Args:
+        steps: Tool calls, each with an 'id', a 'tool' name, 'args' and optionally
+               'for_each' and 'fields' (dotted paths to keep from its result).
+        outputs: (Optional) Step IDs whose results to return. Defaults to the steps
+                 no other step uses.
+
+    Returns:
+        A PipelineResult: 'results' by step ID, and 'errors' for steps that failed
+        or were skipped because a step they use failed.
+    """
+    # The tool registry imports this module, so it is looked up on use.
+    from ha_mcp_bot.tools import HANDLERS
+
+    try:
+        dependencies = _plan(steps, HANDLERS)
+    except PipelineError as e:
+        return f"Error: {e}"
+    if outputs is None:
+        used = set().union(*dependencies.values())
+        outputs = [step.id for step in steps if step.id not in used]
+    elif set(outputs) - set(dependencies):
+        return f"Error: unknown output step(s): {', '.join(sorted(set(outputs) - set(dependencies)))}."
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(step: schemas.PipelineStep) -> None:
+        needs = dependencies[step.id]
+        await asyncio.gather(*(tasks[step_id] for step_id in needs))
+        failed = sorted(needs & errors.keys())
+        if failed:
+            errors[step.id] = f"Skipped: uses failed step(s) {', '.join(failed)}."
+            return
+
+        handler = HANDLERS[step.tool]
+        with span(f"pipeline.step {step.id}", tool=step.tool):
+            try:
+                if step.for_each is None:
+                    results[step.id] = await _call(step.tool, handler, _resolve(step.args, results))
+                    return
+                items = _resolve(step.for_each, results)
+                if not isinstance(items, list):
+                    raise PipelineError(f"'for_each' of step '{step.id}' is not a list.")
+                if len(items) > MAX_FOR_EACH:
+                    raise PipelineError(f"'for_each' of step '{step.id}' has {len(items)} items; the limit is {MAX_FOR_EACH}.")
+                results[step.id] = list(await asyncio.gather(*(
+                    _call(step.tool, handler, _resolve(step.args, results, item)) for item in items
+                )))
+            except PipelineError as e:
+                errors[step.id] = str(e)
+            except Exception as e:
+                logger.exception(f"Pipeline step {step.id} ({step.tool}) failed: {e}")
+                errors[step.id] = f"Error in {step.tool}: {e}"
+
+    for step in steps:
+        tasks[step.id] = asyncio.create_task(run(step))
+    await asyncio.gather(*tasks.values())
+
+    fields = {step.id: step.fields for step in steps}
+    return schemas.PipelineResult(
+        results={step_id: select(results[step_id], fields[step_id]) for step_id in outputs if step_id in results},
+        errors=errors,
+    )
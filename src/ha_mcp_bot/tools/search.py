@@ -3,6 +3,8 @@ import ha_mcp_bot.helpers as helpers
 import ha_mcp_bot.schemas as schemas
 from typing import List, Union, Optional
 from ha_mcp_bot.api import RetrievalService
+from ha_mcp_bot.shaping import Paged, get_default_pages
+from ha_mcp_bot.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +12,13 @@ _retrieval = RetrievalService()
 
 
     
-async def search_entities(description: str, area: Optional[str] = None, label: Optional[str] = None) -> Union[List[schemas.SearchEntity], str]:
+async def search_entities(
+    description: str,
+    area: Optional[str] = None,
+    label: Optional[str] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[List[schemas.SearchEntity], str]:
     """
     Search for Home Assistant entities using natural language descriptions.
     
@@ -22,11 +30,20 @@ async def search_entities(description: str, area: Optional[str] = None, label: O
         description: Natural language search term (e.g., "desk lamp").
         area: (Optional) The room or location to narrow results.
         label: (Optional) The category or type of entity to filter by.
+        page_size: (Optional) Return the matches this many at a time, best first.
+                   The response is then {'items', 'total', 'next_cursor'}.
+        cursor: (Optional) The 'next_cursor' of a previous page; the next page is served
+                from the same search without querying Home Assistant again.
     
     Returns:
         A list of schemas.SearchEntity objects ordered by a matching relevant score. Each
         object contains a integer score and the correspondent entity information (ID, name, state, attrs)
     """
+    if page_size is not None and page_size <= 0:
+        return "Error: page_size must be a positive number."
+    if cursor:
+        return get_default_pages().next(cursor, page_size)
+
     area_entities = label_entities = []
     if area:
         area_entities = await _retrieval.get_area_entities(area)
@@ -42,6 +59,10 @@ async def search_entities(description: str, area: Optional[str] = None, label: O
         return "Failed to retrieve entities from Home Assistant."
     
     try:
-        return helpers.search_entities_by_keywords(entities, description)
+        with span("search.score", entities=len(entities)):
+            matches = helpers.search_entities_by_keywords(entities, description)
+        if page_size:
+            return Paged(sorted(matches, key=lambda match: (-match.score, match.entity.id)), page_size)
+        return matches
     except Exception as e:
         return f"Error during search: {str(e)}"
\ No newline at end of file
@@ -22,7 +22,7 @@ async def analyze_entity_trends(
     Args:
         entity_id: The full entity ID (e.g., 'sensor.main_power', 'light.kitchen', 'binary_sensor.door').
         start_time: ISO 8601 UTC timestamp (e.g., '2026-01-27T00:00:00Z'). 
-                    Defaults to the start of the available history.
+                    Defaults to 24 hours ago.
         end_time: ISO 8601 UTC timestamp (e.g., '2026-01-27T23:59:59Z').
                   Defaults to current time.
 
@@ -36,10 +36,12 @@ async def analyze_entity_trends(
     Returns:
         A dictionary summarizing the behavior of the entity over the requested period.
     """
-    history = await _retrival.get_history(entity_id, start_time, end_time, limit=100)
-    if not history:
+    if _retrival.parse_window(start_time, end_time) is None:
+        return "Invalid start_time or end_time; use ISO 8601 UTC timestamps (e.g., '2026-01-27T00:00:00Z')."
+    summary = await _retrival.accumulate_history(entity_id, start_time, end_time)
+    stats = summary.summary() if summary is not None else {}
+    if not stats:
         return f"Could not find enough data to analyze {entity_id}."
-    stats = helpers.get_history_analytics(history)
     return stats
 
 
@@ -47,6 +49,8 @@ async def calculate_electrical_delta(entity_id: str, start_time: str, end_time:
     """
     Calculates the change (delta) for electrical sensors (Energy, Power, or Voltage) between two points in time.
     Use this to measure consumption increases (kWh) or fluctuations in tension (V) and load (kW).
+    Whole-hour periods of energy and power sensors are answered instantly from local rollups,
+    however long the period.
 
     Args:
         entity_id: The Home Assistant entity ID (e.g., 'sensor.fridge_energy', 'sensor.main_voltage').
@@ -58,8 +62,14 @@ async def calculate_electrical_delta(entity_id: str, start_time: str, end_time:
     """
     time_format = '%Y-%m-%dT%H:%M:%S%z'
 
-    # Fetching Start State
     start_dt = datetime.strptime(start_time, time_format) 
+    end_dt = datetime.strptime(end_time, time_format) 
+    if start_dt.timestamp() % 3600 == 0 and end_dt.timestamp() % 3600 == 0:
+        summary = _retrival.get_energy_summary(entity_id, start_time, end_time)
+        if summary is not None:
+            return f"{round(summary.delta, 6)} {summary.unit_of_measurement}"
+
+    # Fetching Start State
     next_to_start = start_dt + timedelta(seconds=1)
     start_history = await _retrival.get_history(
         entity_id,
@@ -69,7 +79,6 @@ async def calculate_electrical_delta(entity_id: str, start_time: str, end_time:
     )
 
     # Fetching End State
-    end_dt = datetime.strptime(end_time, time_format) 
     next_to_end = end_dt + timedelta(seconds=1)
     end_history = await _retrival.get_history(
         entity_id,
@@ -113,4 +122,45 @@ async def get_entity_state_history(
             return f"No history records found for {entity_id} in that range."
         return result
     except Exception as e:
-        return f"Error fetching history: {e}"
\ No newline at end of file
+        return f"Error fetching history: {e}"
+
+async def get_energy_usage(
+    entity_ids: Optional[List[str]] = None,
+    area: Optional[str] = None,
+    label: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+) -> Union[List[schemas.EnergySummary], str]:
+    """
+    Summarizes energy consumption (and average load) of one or many sensors over any period,
+    answered from hourly/daily rollups kept locally, in constant time whatever the period length.
+
+    Use this for consumption questions:
+    - 'How much energy did the dishwasher use this month?' -> entity_ids=['sensor.dishwasher_energy']
+    - 'What did the kitchen consume yesterday?' -> area='kitchen' (all energy sensors in the area)
+    - 'Average load of the heat pump this week?' -> entity_ids=['sensor.heat_pump_power'] (see 'mean')
+
+    Args:
+        entity_ids: (Optional) Energy or power sensors. If omitted, every energy sensor in the area/label.
+        area: (Optional) Area name or ID.
+        label: (Optional) Label name or ID.
+        start_time: (Optional) ISO 8601 UTC timestamp (e.g., '2026-01-01T00:00:00Z'). Defaults to 24 hours ago.
+        end_time: (Optional) ISO 8601 UTC timestamp. Defaults to now.
+
+    Returns:
+        A list of EnergySummary (delta = consumption, mean = time-weighted average, min, max);
+        periods are widened to whole hours. Sensors whose rollups do not cover the whole
+        period (e.g., it started before the server or spans a disconnect) are left out;
+        use calculate_electrical_delta for those.
+    """
+    if not entity_ids:
+        if not area and not label:
+            return "Provide entity_ids, an area or a label."
+        states = await _retrival.query_states(domain="sensor", device_class="energy", area=area, label=label)
+        entity_ids = [state.entity_id for state in states]
+
+    summaries = [_retrival.get_energy_summary(entity_id, start_time, end_time) for entity_id in entity_ids]
+    summaries = [summary for summary in summaries if summary is not None]
+    if not summaries:
+        return "No rollups cover that period for these sensors; use calculate_electrical_delta instead."
+    return summaries
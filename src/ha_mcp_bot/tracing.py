@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import httpx
+from ha_mcp_bot.config import config
+
+logger = logging.getLogger(__name__)
+
+# Longest string kept for a span attribute (tool arguments can be long lists).
+MAX_ATTRIBUTE_LENGTH = 200
+
+
+class Span:
+    """One timed operation; spans of a trace share 'trace' and are exported together."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "trace")
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.trace: List['Span'] = parent.trace if parent else []
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _UnsampledSpan:
+    """Stands in for every span of a trace that was not sampled."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_UNSAMPLED = _UnsampledSpan()
+_CURRENT_SPAN: ContextVar[Any] = ContextVar("ha_mcp_current_span", default=None)
+
+
+def _attribute(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_ATTRIBUTE_LENGTH else text[:MAX_ATTRIBUTE_LENGTH] + "..."
+
+
+class JsonlExporter:
+    """
+    Appends finished traces to a local file, one span per line. Spans are buffered
+    and written from a worker thread, so file I/O never runs on the event loop;
+    call flush() before exiting to write what is still buffered.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._writer: Optional[asyncio.Task] = None
+
+    def export(self, spans: List[Span]) -> None:
+        self._buffer.extend(span.to_dict() for span in spans)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        # One write in flight at a time; spans exported meanwhile go out with the next.
+        if self._writer is None:
+            self._writer = loop.create_task(asyncio.to_thread(self.flush))
+            self._writer.add_done_callback(self._on_written)
+
+    def _on_written(self, task: asyncio.Task) -> None:
+        self._writer = None
+        if self._buffer:
+            self.export([])
+
+    def flush(self) -> None:
+        """Writes the buffered spans (blocking)."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(lines)
+            except OSError as e:
+                logger.warning(f"Could not write traces to {self.path}: {e}")
+
+
+class OtlpExporter:
+    """
+    Posts finished traces to an OTLP/HTTP collector as JSON ('/v1/traces').
+    Sends run as background tasks so a slow collector never delays a tool call.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "ha-mcp"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending = set()
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "ha_mcp_bot"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [
+                        {"key": key, "value": self._value(value)}
+                        for key, value in span.attributes.items() if value is not None
+                    ],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug("No event loop to export traces from; dropping them")
+            return
+        task = loop.create_task(self._send(self.payload(spans)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _send(self, payload: Dict[str, Any]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(5.0))
+        try:
+            response = await self._client.post(self.endpoint, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not export traces to {self.endpoint}: {e}")
+
+
+class Tracer:
+    """
+    Minimal span tracer: nested spans follow the asyncio task context (so spans
+    opened by gathered tasks nest under the caller), and a whole trace is kept
+    or dropped by one sampling decision at its root.
+    """
+
+    def __init__(self, sample_rate: float = config.TRACE_SAMPLE_RATE, exporter: Any = None):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Times the enclosed block as a child of the current span, or as a new trace."""
+        parent = _CURRENT_SPAN.get()
+        if parent is _UNSAMPLED or (parent is None and self.sample_rate <= 0):
+            yield _UNSAMPLED
+            return
+        if parent is None and random.random() >= self.sample_rate:
+            token = _CURRENT_SPAN.set(_UNSAMPLED)
+            try:
+                yield _UNSAMPLED
+            finally:
+                _CURRENT_SPAN.reset(token)
+            return
+
+        span = Span(name, parent, {key: _attribute(value) for key, value in attributes.items()})
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            span.end_ns = time.time_ns()
+            span.trace.append(span)
+            if parent is None and self.exporter is not None:
+                self.exporter.export(span.trace)
+
+    def flush(self) -> None:
+        """Writes spans the exporter still buffers, if it buffers any."""
+        flush = getattr(self.exporter, "flush", None)
+        if flush is not None:
+            flush()
+
+
+def _build_exporter() -> Any:
+    if config.TRACE_EXPORTER == "otlp":
+        return OtlpExporter(config.TRACE_OTLP_ENDPOINT)
+    return JsonlExporter(config.TRACE_PATH)
+
+
+_DEFAULT_TRACER_INSTANCE: Optional['Tracer'] = None
+
+def get_default_tracer() -> Tracer:
+    """Global access to the tracer."""
+    global _DEFAULT_TRACER_INSTANCE
+    if _DEFAULT_TRACER_INSTANCE is None:
+        _DEFAULT_TRACER_INSTANCE = Tracer(config.TRACE_SAMPLE_RATE, _build_exporter())
+    return _DEFAULT_TRACER_INSTANCE
+
+
+def span(name: str, **attributes: Any):
+    """Shorthand for get_default_tracer().span()."""
+    return get_default_tracer().span(name, **attributes)
+
+
+def traced(name: Optional[str] = None, record_args: bool = False) -> Callable:
+    """
+    Decorator that runs an async function inside a span named 'name' (default:
+    its qualified name). With record_args, keyword arguments become attributes.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            attributes = {f"arg.{key}": value for key, value in kwargs.items()} if record_args else {}
+            with span(span_name, **attributes):
+                return await func(*args, **kwargs)
+
+        return wrapper
+    return decorator